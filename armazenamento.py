@@ -0,0 +1,1168 @@
+"""Camada de acesso aos dados do ranking (jogadores.json / historico.json)
+
+Os arquivos são lidos uma única vez e mantidos em memória. Antes de cada
+acesso é feita uma verificação barata (os.stat) de mtime/tamanho/inode, de
+modo que alterações feitas por outros workers do gunicorn continuam sendo
+percebidas sem reler o arquivo a cada requisição.
+
+Gravações são atômicas (arquivo temporário + os.replace) e cada operação
+sobre partidas (registrar, editar, excluir) é feita numa única transação: uma
+leitura, os deltas de estatística dos jogadores envolvidos e uma gravação de
+cada arquivo. As transações de todos os processos são serializadas por uma
+trava de arquivo (fcntl.flock em `<historico>.lock`); leitores não usam a
+trava, pois sempre veem um arquivo completo graças ao os.replace. O histórico
+é mantido em ordem cronológica no disco para que novas partidas sejam
+anexadas ao final em O(1).
+
+Com gravação adiada (`ArmazemAdiado`) as alterações vão primeiro para a
+memória e são gravadas em lote por uma thread em segundo plano.
+
+No modo 'log' (`ArmazemLog`) as alterações são anexadas a um log de eventos
+em JSON Lines e os arquivos JSON viram um snapshot compactado periodicamente.
+"""
+import atexit
+import bisect
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, suppress
+from itertools import islice
+from operator import itemgetter
+from typing import TypedDict
+
+import serializacao
+from estatisticas import (
+    Confrontos,
+    EstatisticasAvancadas,
+    RankingPeriodos,
+    VersoesJogadores,
+    aplicar_partida,
+    data_da_partida,
+    data_ordenavel,
+    diferencas_estatisticas,
+    recalcular_jogadores,
+)
+from metricas import medir
+from modelo import Partida
+from rating import Elo
+
+log = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: só há serialização entre threads do processo
+    fcntl = None
+
+
+class JogadorDict(TypedDict, total=False):
+    vitorias: int
+    derrotas: int
+    saldo: int
+    aproveitamento: float
+    rank: str
+    imagem: str
+
+
+class PartidaDict(TypedDict, total=False):
+    id: int
+    data: str
+    jogador1: str
+    jogador2: str
+    vencedor: str
+    placar: str
+    valor: int
+    dobro_nada: bool
+    tipo: str
+
+
+def carregar_dados(arquivo):
+    """Carrega dados de um arquivo JSON (ver serializacao.py)"""
+    if os.path.exists(arquivo):
+        try:
+            with medir('carregar_dados', alvo=os.path.basename(arquivo)):
+                return serializacao.ler_arquivo(arquivo)
+        except (OSError, ValueError):
+            return {}
+    return {}
+
+
+def _gravar_atomico(arquivo, escrever):
+    """Chama `escrever(f)` num arquivo temporário (binário) e o move sobre `arquivo`
+
+    O arquivo original só é substituído (os.replace) depois que o conteúdo
+    novo foi totalmente escrito e sincronizado, de modo que uma queda no meio
+    da escrita nunca deixa o arquivo pela metade.
+    """
+    diretorio = os.path.dirname(os.path.abspath(arquivo))
+    fd, temporario = tempfile.mkstemp(
+        dir=diretorio, prefix='.' + os.path.basename(arquivo), suffix='.tmp'
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            escrever(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, arquivo)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(temporario)
+        raise
+
+
+def salvar_dados(dados, arquivo):
+    """Salva dados em um arquivo JSON de forma atômica"""
+    with medir('salvar_dados', alvo=os.path.basename(arquivo)):
+        conteudo = serializacao.para_bytes(dados)
+        _gravar_atomico(arquivo, lambda f: f.write(conteudo))
+
+
+def salvar_linhas(eventos, arquivo):
+    """Salva eventos em um arquivo JSON Lines de forma atômica"""
+    def escrever(f):
+        for evento in eventos:
+            f.write(serializacao.linha(evento))
+    _gravar_atomico(arquivo, escrever)
+
+
+def resumo_jogadores(jogadores):
+    """Resumo do conteúdo de `jogadores`, independente do motor JSON e da formatação"""
+    canonico = json.dumps(jogadores, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(canonico.encode(), digest_size=16).hexdigest()
+
+
+def normalizar_historico(historico):
+    """Garante a chave 'partidas' em ordem cronológica (mais antiga primeiro)
+
+    Versões anteriores gravavam a partida mais recente no início da lista;
+    esses arquivos são invertidos uma única vez ao serem carregados.
+    """
+    partidas = historico.setdefault('partidas', [])
+    if historico.get('ordem') != 'cronologica':
+        partidas.reverse()
+        historico['ordem'] = 'cronologica'
+    # Históricos anteriores aos ids estáveis são numerados em ordem cronológica
+    if any('id' not in partida for partida in partidas):
+        for numero, partida in enumerate(partidas, start=1):
+            partida['id'] = numero
+        historico['proximo_id'] = len(partidas) + 1
+    historico.setdefault('proximo_id', partidas[-1]['id'] + 1 if partidas else 1)
+    # Data ordenável ('aaaa-mm-dd hh:mm') usada em filtros e rankings por período
+    for partida in partidas:
+        if 'data_iso' not in partida:
+            partida['data_iso'] = data_ordenavel(partida.get('data'))
+    return historico
+
+
+def com_data_iso(partida):
+    """Cópia de `partida` com 'data_iso' calculada a partir de 'data'"""
+    return {**partida, 'data_iso': data_ordenavel(partida.get('data'))}
+
+
+def posicao_por_id(partidas, id_partida):
+    """Índice cronológico da partida com `id_partida` (ids são crescentes)"""
+    posicao = bisect.bisect_left(partidas, id_partida, key=itemgetter('id'))
+    if posicao < len(partidas) and partidas[posicao]['id'] == id_partida:
+        return posicao
+    return None
+
+
+def filtrar_partidas(partidas, antes=None, jogador=None, tipo=None, desde=None,
+                     ate=None):
+    """Gera as partidas da mais recente para a mais antiga, aplicando filtros
+
+    `partidas` está em ordem cronológica (ids crescentes). `antes` é o
+    cursor de paginação: apenas partidas com id menor são geradas. `desde`
+    e `ate` são datas 'aaaa-mm-dd' (inclusivas).
+    """
+    if antes is None:
+        fim = len(partidas)
+    else:
+        fim = bisect.bisect_left(partidas, antes, key=itemgetter('id'))
+    for posicao in range(fim - 1, -1, -1):
+        partida = partidas[posicao]
+        lados = (partida['jogador1'], partida['jogador2'])
+        if jogador is not None and jogador not in lados:
+            continue
+        if tipo is not None and partida.get('tipo') != tipo:
+            continue
+        if desde is not None or ate is not None:
+            dia = (data_da_partida(partida) or '')[:10]
+            if desde is not None and dia < desde:
+                continue
+            if ate is not None and dia > ate:
+                continue
+        yield partida
+
+
+def paginar(partidas, limite):
+    """Separa até `limite` partidas de um gerador e o cursor da próxima página"""
+    pagina = list(islice(partidas, limite + 1))
+    proximo = pagina[limite - 1]['id'] if len(pagina) > limite else None
+    return pagina[:limite], proximo
+
+
+class TravaArquivo:
+    """Trava exclusiva entre processos sobre um arquivo .lock (fcntl.flock)
+
+    Reentrante no mesmo processo: as threads são serializadas por `lock`
+    (um RLock) e apenas o uso mais externo toma e solta a trava do arquivo.
+    O arquivo é aberto a cada aquisição, então a trava não é herdada por
+    processos criados com fork (workers do gunicorn com --preload).
+
+    `reter()` mantém a trava do arquivo depois do uso mais externo, até
+    `soltar()` (gravação adiada: ver `ArmazemAdiado`).
+    """
+
+    def __init__(self, caminho, lock=None):
+        self.caminho = caminho
+        self._lock = lock if lock is not None else threading.RLock()
+        self._profundidade = 0
+        self._fd = None
+        self._retida = False
+        self._pid = os.getpid()
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            if self._pid != os.getpid():
+                # Processo criado com fork durante uma retenção: a trava é do pai
+                if self._fd is not None:
+                    os.close(self._fd)
+                self._fd = None
+                self._retida = False
+                self._pid = os.getpid()
+            if self._profundidade == 0 and self._fd is None and fcntl is not None:
+                fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+        except BaseException:
+            self._lock.release()
+            raise
+        self._profundidade += 1
+        return self
+
+    def __exit__(self, *excecao):
+        self._profundidade -= 1
+        if self._profundidade == 0 and self._fd is not None and not self._retida:
+            fd, self._fd = self._fd, None
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        self._lock.release()
+
+    def reter(self):
+        """Mantém a trava do arquivo ao sair do uso mais externo (já tomada)"""
+        self._retida = True
+
+    def soltar(self):
+        """Encerra a retenção; a trava é solta ao sair do uso mais externo"""
+        with self:
+            self._retida = False
+
+    @contextmanager
+    def compartilhada(self):
+        """Trava compartilhada: espera gravações em andamento de outros processos
+
+        Se este processo já tem a trava exclusiva, não faz nada.
+        """
+        with self._lock:
+            if self._profundidade or self._fd is not None or fcntl is None:
+                yield self
+                return
+            fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                yield self
+            finally:
+                os.close(fd)  # Fechar o descritor solta a trava
+
+
+class ArquivoJSON:
+    """Conteúdo de um arquivo JSON em cache, invalidado por mtime/tamanho"""
+
+    def __init__(self, caminho, preparar=None):
+        self.caminho = caminho
+        self._preparar = preparar
+        self.versao = 0
+        self._dados = None
+        self._assinatura = None
+        self._lock = threading.Lock()
+
+    def _assinatura_atual(self):
+        try:
+            st = os.stat(self.caminho)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def ler(self):
+        """Retorna o conteúdo em cache, recarregando se o arquivo mudou"""
+        assinatura = self._assinatura_atual()
+        if self._dados is None or assinatura != self._assinatura:
+            with self._lock:
+                if self._dados is None or assinatura != self._assinatura:
+                    dados = carregar_dados(self.caminho)
+                    if self._preparar is not None:
+                        dados = self._preparar(dados)
+                    self._dados = dados
+                    self._assinatura = assinatura
+                    self.versao += 1
+        return self._dados
+
+    def alterado(self):
+        """Indica (só com os.stat) se o próximo `ler()` vai recarregar o arquivo"""
+        return self._dados is None or self._assinatura_atual() != self._assinatura
+
+    def gravar(self, dados):
+        """Grava no disco e atualiza o cache sem precisar reler o arquivo"""
+        with self._lock:
+            salvar_dados(dados, self.caminho)
+            self._dados = dados
+            self._assinatura = self._assinatura_atual()
+            self.versao += 1
+
+    def definir(self, dados):
+        """Atualiza só o cache; o arquivo é gravado depois por `persistir()`
+
+        O cache precisa ter sido lido antes, para que a assinatura continue
+        sendo a do arquivo no disco.
+        """
+        with self._lock:
+            self._dados = dados
+            self.versao += 1
+
+    def persistir(self):
+        """Grava no disco o conteúdo em cache, sem mudar a versão"""
+        with self._lock:
+            salvar_dados(self._dados, self.caminho)
+            self._assinatura = self._assinatura_atual()
+
+    def invalidar(self):
+        with self._lock:
+            self._dados = None
+            self._assinatura = None
+
+
+def _posicao(partidas, evento):
+    if 'posicao' in evento:
+        return evento['posicao']
+    return posicao_por_id(partidas, evento['id'])
+
+
+def aplicar_evento(jogadores, partidas, evento):
+    """Aplica um evento de alteração sobre `jogadores` e `partidas`
+
+    Eventos: {'op': 'add', 'partida': ...}, {'op': 'edit', 'id': ...,
+    'partida': ...}, {'op': 'delete', 'id': ...}, {'op': 'jogadores',
+    'jogadores': ...} e {'op': 'renomear', 'nome': ..., 'novo_nome': ...}.
+    Logs gravados antes dos ids estáveis identificam a partida por 'posicao'
+    (índice cronológico).
+
+    Retorna a partida substituída ou removida (None nos demais casos).
+    """
+    op = evento['op']
+    antiga = None
+    if op == 'add':
+        aplicar_partida(jogadores, evento['partida'])
+        partidas.append(evento['partida'])
+    elif op == 'edit':
+        posicao = _posicao(partidas, evento)
+        antiga = partidas[posicao]
+        aplicar_partida(jogadores, antiga, sinal=-1)
+        aplicar_partida(jogadores, evento['partida'])
+        partidas[posicao] = evento['partida']
+    elif op == 'delete':
+        posicao = _posicao(partidas, evento)
+        antiga = partidas.pop(posicao)
+        aplicar_partida(jogadores, antiga, sinal=-1)
+    elif op == 'jogadores':
+        jogadores.clear()
+        jogadores.update(evento['jogadores'])
+    elif op == 'renomear':
+        # O histórico é a fonte das estatísticas: as partidas passam a usar o
+        # nome novo, senão um recálculo traria o nome antigo de volta
+        nome, novo_nome = evento['nome'], evento['novo_nome']
+        jogadores[novo_nome] = {**jogadores.pop(nome), 'nome': novo_nome}
+        for posicao, partida in enumerate(partidas):
+            if nome in (partida['jogador1'], partida['jogador2']):
+                partidas[posicao] = {**partida, **{
+                    campo: novo_nome
+                    for campo in ('jogador1', 'jogador2', 'vencedor')
+                    if partida[campo] == nome
+                }}
+    else:
+        raise ValueError(f'Evento desconhecido: {op}')
+    return antiga
+
+
+def _acompanhar_ratings(elo, evento, _antiga):
+    """Novas partidas atualizam o Elo; edições/exclusões exigem reprocessar"""
+    if evento['op'] == 'add':
+        elo.registrar_partida(evento['partida'])
+    elif evento['op'] in ('edit', 'delete'):
+        return False
+    return True
+
+
+# Agregados derivados do histórico mantidos em memória pelos armazenamentos:
+# nome -> (construir(partidas), acompanhar(agregado, evento, antiga)). Se
+# `acompanhar` retornar False o agregado é reconstruído no próximo acesso.
+AGREGADOS = {
+    'confrontos': (Confrontos.construir, Confrontos.aplicar_evento),
+    'ratings': (Elo.reprocessar, _acompanhar_ratings),
+    'periodos': (RankingPeriodos.construir, RankingPeriodos.aplicar_evento),
+    'avancadas': (
+        EstatisticasAvancadas.construir, EstatisticasAvancadas.aplicar_evento
+    ),
+    'versoes': (VersoesJogadores.construir, VersoesJogadores.aplicar_evento),
+}
+
+
+class _CopiaSobDemanda(dict):
+    """Cópia rasa de `jogadores` que copia cada jogador ao ser acessado
+
+    Evita copiar todos os jogadores numa transação que altera apenas dois.
+    """
+
+    def __init__(self, original):
+        super().__init__(original)
+        self._copiados = set()
+
+    def __getitem__(self, nome):
+        if nome not in self._copiados and dict.__contains__(self, nome):
+            dict.__setitem__(self, nome, dict(dict.__getitem__(self, nome)))
+            self._copiados.add(nome)
+        return dict.__getitem__(self, nome)
+
+
+class Armazem:
+    """Acesso tipado e compartilhado aos jogadores e ao histórico de partidas
+
+    Os objetos retornados por `jogadores()` e `partidas()` são o próprio cache
+    e não devem ser alterados; alterações passam por `registrar_partida`,
+    `editar_partida`, `excluir_partida`, `alterar_jogadores` e
+    `salvar_jogadores`, sempre sob a trava entre processos (`_trava`).
+
+    `partidas()` está em ordem cronológica. Cada partida tem um 'id' estável
+    e crescente, usado pelas rotas de edição/exclusão e como cursor de
+    paginação em `pagina_partidas`.
+    """
+
+    def __init__(self, jogadores_file, historico_file):
+        self._jogadores = ArquivoJSON(jogadores_file)
+        self._historico = ArquivoJSON(historico_file, preparar=normalizar_historico)
+        self._escrita = threading.RLock()
+        self._trava = TravaArquivo(historico_file + '.lock', self._escrita)
+        self._agregados = {}  # nome -> [agregado, versão do histórico]
+
+    @property
+    def versao(self):
+        """Muda sempre que algum dos arquivos é recarregado ou gravado"""
+        return (self._jogadores.versao, self._historico.versao)
+
+    def jogadores(self) -> dict[str, JogadorDict]:
+        return self._jogadores.ler()
+
+    def jogador(self, nome) -> JogadorDict | None:
+        return self.jogadores().get(nome)
+
+    def partidas(self) -> list[PartidaDict]:
+        return self._historico.ler()['partidas']
+
+    def partida(self, id_partida) -> PartidaDict | None:
+        partidas = self.partidas()
+        posicao = posicao_por_id(partidas, id_partida)
+        return None if posicao is None else partidas[posicao]
+
+    def _proximo_id(self):
+        return self._historico.ler()['proximo_id']
+
+    def iterar_partidas(self, antes=None, jogador=None, tipo=None, desde=None,
+                        ate=None):
+        """Partidas da mais recente para a mais antiga, geradas sob demanda
+
+        Com `jogador`, percorre apenas as partidas dele (via confrontos).
+        """
+        if jogador is not None:
+            partidas = self.partidas_do_jogador(jogador)
+            jogador = None  # Já filtrado
+        else:
+            partidas = self.partidas()
+        return filtrar_partidas(partidas, antes, jogador, tipo, desde, ate)
+
+    def pagina_partidas(self, limite, **filtros):
+        """Uma página de partidas e o cursor ('antes') da página seguinte"""
+        return paginar(self.iterar_partidas(**filtros), limite)
+
+    def iterar_cronologico(self):
+        """Todas as partidas, da mais antiga para a mais recente (exportação)"""
+        return iter(self.partidas())
+
+    def _versao_partidas(self):
+        return self._historico.versao
+
+    def _agregado(self, nome):
+        """Agregado de `AGREGADOS`, reconstruído só se o histórico mudou por fora
+
+        Alterações feitas por esta instância atualizam os agregados de forma
+        incremental; uma releitura do arquivo (ex.: gravação de outro worker)
+        faz com que sejam reconstruídos no próximo acesso. Agregados nunca
+        consultados não custam nada.
+        """
+        with self._escrita:
+            partidas = self.partidas()
+            versao = self._versao_partidas()
+            atual = self._agregados.get(nome)
+            if atual is None or atual[1] != versao:
+                atual = self._agregados[nome] = [AGREGADOS[nome][0](partidas), versao]
+            return atual[0]
+
+    def _acompanhar_agregados(self, versao_anterior, alteracoes):
+        """Aplica os pares (evento, antiga) aos agregados que estavam em dia"""
+        if any(evento['op'] == 'renomear' for evento, _ in alteracoes):
+            self._agregados.clear()  # Agregados indexados pelo nome antigo
+            return
+        versao = self._versao_partidas()
+        for nome, atual in list(self._agregados.items()):
+            if atual[1] != versao_anterior:
+                continue
+            for evento, antiga in alteracoes:
+                if AGREGADOS[nome][1](atual[0], evento, antiga) is False:
+                    del self._agregados[nome]
+                    break
+            else:
+                atual[1] = versao
+
+    def _renovar_agregados(self, versao_anterior):
+        """Marca como em dia os agregados após uma mudança só de versão"""
+        versao = self._versao_partidas()
+        for atual in self._agregados.values():
+            if atual[1] == versao_anterior:
+                atual[1] = versao
+
+    def confrontos(self) -> Confrontos:
+        """Confrontos diretos (ver `estatisticas.Confrontos`)"""
+        return self._agregado('confrontos')
+
+    def ratings(self) -> Elo:
+        """Ratings Elo: incrementais a cada partida nova, reprocessados após
+        edição ou exclusão"""
+        return self._agregado('ratings')
+
+    def estatisticas_avancadas(self, nome):
+        """Sequências, placares, Dobro ou Nada e forma recente de `nome`"""
+        return self._agregado('avancadas').do_jogador(nome)
+
+    def versao_jogador(self, nome):
+        """Muda sempre que uma partida de `nome` é registrada, editada ou excluída"""
+        return self._agregado('versoes').do_jogador(nome)
+
+    def periodos(self):
+        """Meses ('aaaa-mm') e anos ('aaaa') com partidas, mais recentes primeiro"""
+        return self._agregado('periodos').listar()
+
+    def ranking_periodo(self, periodo):
+        """Lista (nome, estatísticas) do mês ou ano `periodo`, por saldo"""
+        return self._agregado('periodos').classificacao(periodo)
+
+    def aquecer(self, *nomes):
+        """Lê os dados e constrói os agregados `nomes` antes do primeiro uso
+
+        Chamado na inicialização (ver `main.preflight`) para que a primeira
+        requisição de um worker recém-iniciado não pague as reconstruções.
+        """
+        for nome in nomes:
+            self._agregado(nome)
+
+    def verificar_confrontos(self):
+        """Diferenças entre os confrontos incrementais e uma reconstrução"""
+        with self._escrita:
+            return self.confrontos().divergencias(self.partidas())
+
+    def partidas_do_jogador(self, nome) -> list[PartidaDict]:
+        """Partidas em que `nome` jogou, em ordem cronológica"""
+        return self.confrontos().partidas_do_jogador(nome)
+
+    def partidas_compactas(self, nome) -> list[Partida]:
+        """Partidas de `nome` como `modelo.Partida`, em ordem cronológica"""
+        return self.confrontos().compactas_do_jogador(nome)
+
+    def recalcular_estatisticas(self, gravar=True):
+        """Recalcula as estatísticas dos jogadores a partir do histórico
+
+        Retorna as diferenças encontradas (ver `diferencas_estatisticas`) e,
+        com `gravar`, substitui as estatísticas armazenadas pelas recalculadas.
+        """
+        with self._trava:
+            atuais = self.jogadores()
+            recalculados = recalcular_jogadores(self.partidas(), atuais)
+            diferencas = diferencas_estatisticas(atuais, recalculados)
+            if gravar and diferencas:
+                self.salvar_jogadores(recalculados)
+            return diferencas
+
+    def confrontos_do_jogador(self, nome):
+        """Vitórias, derrotas e total de `nome` contra cada oponente"""
+        return self.confrontos().contra(nome)
+
+    def copia_jogadores(self) -> dict[str, JogadorDict]:
+        return {nome: dict(dados) for nome, dados in self.jogadores().items()}
+
+    def salvar_jogadores(self, jogadores):
+        with self._trava:
+            self._jogadores.gravar(jogadores)
+
+    def alterar_jogadores(self, alterar):
+        """Chama `alterar(jogadores)` sobre uma cópia atual e grava o resultado
+
+        A leitura e a gravação acontecem sob a mesma trava, de modo que
+        partidas registradas por outros workers no meio não são perdidas.
+        Retorna o valor de `alterar`; se ele retornar False nada é gravado.
+        """
+        with self._trava:
+            jogadores = self.copia_jogadores()
+            resultado = alterar(jogadores)
+            if resultado is not False:
+                self.salvar_jogadores(jogadores)
+            return resultado
+
+    def renomear_jogador(self, nome, novo_nome):
+        """Renomeia o jogador nos jogadores e nas suas partidas, numa única gravação
+
+        Retorna False se `nome` não existe ou se `novo_nome` já está em uso.
+        """
+        with self._trava:
+            jogadores = self.jogadores()
+            if nome not in jogadores or novo_nome in jogadores:
+                return False
+            return self._executar(
+                {'op': 'renomear', 'nome': nome, 'novo_nome': novo_nome}
+            )
+
+    def migrar_datas(self):
+        """Grava no disco a 'data_iso' das partidas antigas
+
+        Ela já é calculada ao carregar o histórico (`normalizar_historico`);
+        aqui apenas passa a ficar salva no arquivo. Retorna o total de partidas.
+        """
+        with self._trava:
+            historico = self._historico.ler()
+            self._historico.gravar(dict(historico))
+            return len(historico['partidas'])
+
+    def substituir(self, jogadores, partidas):
+        """Substitui todos os dados (usado na conversão entre armazenamentos)"""
+        with self._trava:
+            historico = {'partidas': list(partidas), 'ordem': 'cronologica'}
+            self._historico.gravar(normalizar_historico(historico))
+            self._jogadores.gravar(dict(jogadores))
+
+    def _executar(self, *eventos):
+        """Aplica eventos (ver `aplicar_evento`) e grava os dois arquivos uma vez
+
+        `jogadores` e `partidas` são cópias do cache (jogadores copiados sob
+        demanda), de modo que o cache só muda quando a gravação é concluída.
+        O histórico é gravado primeiro por ser a fonte de verdade das
+        estatísticas. A trava garante que a leitura é a mais recente e que
+        nenhum outro processo grava entre a leitura e a gravação.
+        """
+        with self._trava:
+            jogadores = _CopiaSobDemanda(self.jogadores())
+            historico = dict(self._historico.ler())
+            versao_anterior = self._versao_partidas()
+            partidas = list(historico['partidas'])
+            alteracoes = [
+                (evento, aplicar_evento(jogadores, partidas, evento))
+                for evento in eventos
+            ]
+            historico['partidas'] = partidas
+            ids_novos = [
+                evento['partida']['id'] for evento in eventos if evento['op'] == 'add'
+            ]
+            if ids_novos:
+                historico['proximo_id'] = max(ids_novos) + 1
+            self._gravar(historico, dict(jogadores))
+            self._acompanhar_agregados(versao_anterior, alteracoes)
+            return True
+
+    def _gravar(self, historico, jogadores):
+        """Grava os dois arquivos, o histórico primeiro (fonte de verdade)"""
+        self._historico.gravar(historico)
+        self._jogadores.gravar(jogadores)
+
+    def registrar_partida(self, partida):
+        """Registra uma nova partida e atualiza os dois jogadores
+
+        Retorna o id atribuído à partida.
+        """
+        return self.registrar_partidas([partida])[0]
+
+    def registrar_partidas(self, partidas):
+        """Registra várias partidas em ordem numa única gravação (importação)
+
+        Retorna os ids atribuídos, na mesma ordem.
+        """
+        with self._trava:
+            proximo = self._proximo_id()
+            eventos = [
+                {'op': 'add', 'partida': {'id': proximo + i, **com_data_iso(partida)}}
+                for i, partida in enumerate(partidas)
+            ]
+            if eventos:
+                self._executar(*eventos)
+            return [evento['partida']['id'] for evento in eventos]
+
+    def editar_partida(self, id_partida, nova, verificar=None):
+        """Substitui a partida `id_partida`, revertendo a original
+
+        `verificar(original)` roda sob a mesma trava da gravação e pode
+        lançar ValueError para impedir a edição.
+        """
+        with self._trava:
+            original = self.partida(id_partida)
+            if original is None:
+                return False
+            if verificar is not None:
+                verificar(original)
+            partida = {'id': id_partida, **com_data_iso(nova)}
+            return self._executar({'op': 'edit', 'id': id_partida, 'partida': partida})
+
+    def excluir_partida(self, id_partida, verificar=None):
+        """Remove a partida `id_partida`, revertendo suas estatísticas
+
+        `verificar(original)` como em `editar_partida`.
+        """
+        with self._trava:
+            original = self.partida(id_partida)
+            if original is None:
+                return False
+            if verificar is not None:
+                verificar(original)
+            return self._executar({'op': 'delete', 'id': id_partida})
+
+    def invalidar(self):
+        """Descarta o cache, forçando a releitura dos arquivos"""
+        self._jogadores.invalidar()
+        self._historico.invalidar()
+
+
+class ArmazemAdiado(Armazem):
+    """Modo json com gravação adiada (write-behind)
+
+    As alterações são aplicadas ao cache em memória na hora e gravadas por
+    uma thread em segundo plano até `intervalo_ms` depois da primeira
+    alteração pendente, de modo que uma rajada de alterações vira uma única
+    gravação de cada arquivo. Com `intervalo_ms=None` só há gravação ao
+    encerrar o processo ou em `descarregar()`.
+
+    Enquanto houver alterações pendentes a trava entre processos fica retida:
+    outros workers esperam a gravação antes de alterar os arquivos e nunca
+    sobrescrevem o que ainda não foi gravado; as leituras deles veem os dados
+    com até `intervalo_ms` de atraso. Ao encerrar (atexit; o SIGTERM é
+    tratado em main.py) as pendências são gravadas. Uma queda do processo
+    perde no máximo as alterações pendentes; se ela acontecer entre a
+    gravação do histórico e a dos jogadores, as estatísticas são recalculadas
+    a partir do histórico na próxima abertura (`recuperar`).
+    """
+
+    def __init__(self, jogadores_file, historico_file, intervalo_ms=200):
+        super().__init__(jogadores_file, historico_file)
+        self.intervalo_ms = intervalo_ms
+        self._marcador = historico_file + '.pendente'
+        self._pendente_desde = None  # time.monotonic() da primeira alteração pendente
+        self._incompleto = False
+        self._condicao = threading.Condition(self._escrita)
+        self._gravador = None
+        self.recuperar()
+        atexit.register(self.descarregar)
+
+    def recuperar(self):
+        """Recalcula as estatísticas se uma gravação anterior foi interrompida
+
+        O marcador `<historico>.pendente` existe do início ao fim de cada
+        gravação. Retorna as diferenças corrigidas.
+        """
+        if not os.path.exists(self._marcador):
+            return []
+        with self._trava:
+            if not os.path.exists(self._marcador):
+                return []
+            diferencas = self.recalcular_estatisticas()
+            if not self.descarregar():
+                os.unlink(self._marcador)
+            return diferencas
+
+    def _gravar(self, historico, jogadores):
+        self._marcar_pendente()
+        # Uma exceção assíncrona (SIGINT, SIGTERM -> SystemExit) entre as duas
+        # atribuições deixaria os jogadores defasados do histórico; nesse caso
+        # `descarregar` os recalcula antes de gravar
+        self._incompleto = True
+        self._historico.definir(historico)
+        self._jogadores.definir(jogadores)
+        self._incompleto = False
+        self._agendar()
+
+    def salvar_jogadores(self, jogadores):
+        with self._trava:
+            self._jogadores.ler()  # Assinatura atual do arquivo, antes de definir
+            self._marcar_pendente()
+            self._jogadores.definir(jogadores)
+            self._agendar()
+
+    def _marcar_pendente(self):
+        self._trava.reter()
+        if self._pendente_desde is None:
+            self._pendente_desde = time.monotonic()
+
+    def _agendar(self):
+        """Acorda (ou inicia) a thread de gravação"""
+        if self.intervalo_ms is None:
+            return
+        # Também recriada após um fork, que não copia a thread
+        if self._gravador is None or not self._gravador.is_alive():
+            self._gravador = threading.Thread(
+                target=self._gravar_em_segundo_plano, daemon=True,
+                name='gravacao-adiada'
+            )
+            self._gravador.start()
+        self._condicao.notify()
+
+    def _gravar_em_segundo_plano(self):
+        intervalo = self.intervalo_ms / 1000
+        with self._condicao:
+            while True:
+                if self._pendente_desde is None:
+                    self._condicao.wait()
+                    continue
+                espera = self._pendente_desde + intervalo - time.monotonic()
+                if espera > 0:
+                    self._condicao.wait(espera)
+                    continue
+                try:
+                    self.descarregar()
+                except OSError:
+                    # Disco cheio, permissão...: as alterações continuam
+                    # pendentes e a gravação é tentada de novo
+                    self._pendente_desde = time.monotonic()
+
+    def pendente(self):
+        """Indica se há alterações ainda não gravadas"""
+        return self._pendente_desde is not None
+
+    def descarregar(self):
+        """Grava as alterações pendentes e solta a trava; retorna se gravou"""
+        if self._pendente_desde is None:
+            return False
+        with self._trava:
+            if self._pendente_desde is None:
+                return False
+            if self._incompleto:
+                jogadores = recalcular_jogadores(self.partidas(), self._jogadores.ler())
+                self._jogadores.definir(jogadores)
+                self._incompleto = False
+            with open(self._marcador, 'w'):
+                pass
+            self._historico.persistir()
+            self._jogadores.persistir()
+            os.unlink(self._marcador)
+            self._pendente_desde = None
+            self._trava.soltar()
+            return True
+
+    def migrar_datas(self):
+        self.descarregar()
+        return super().migrar_datas()
+
+    def substituir(self, jogadores, partidas):
+        self.descarregar()
+        super().substituir(jogadores, partidas)
+
+    def invalidar(self):
+        self.descarregar()
+        super().invalidar()
+
+
+class ArmazemLog(Armazem):
+    """Armazenamento com log de eventos (JSON Lines) e snapshot compactado
+
+    Cada alteração é anexada como uma linha em `log_file`, sem reescrever o
+    histórico. jogadores.json e historico.json passam a ser um snapshot que
+    registra em 'seq' o último evento já incorporado; ao carregar, apenas os
+    eventos posteriores do log são reaplicados. Leituras seguintes consomem
+    só os bytes novos do log, inclusive os anexados por outros workers.
+
+    `compactar()` incorpora o log ao snapshot e o esvazia. Ele é chamado
+    automaticamente a cada `compactar_a_cada` eventos (0 desativa).
+    """
+
+    def __init__(self, jogadores_file, historico_file, log_file, compactar_a_cada=1000):
+        super().__init__(jogadores_file, historico_file)
+        self.log_file = log_file
+        self.compactar_a_cada = compactar_a_cada
+        self._estado = None
+        self._versao_snapshot = None
+        self._seq = 0
+        self._seq_snapshot = 0
+        self._offset = 0
+        self._id_log = None
+        self._proximo = 1
+
+    @property
+    def versao(self):
+        return (self._versao_snapshot, self._seq)
+
+    def _versao_partidas(self):
+        return self.versao
+
+    def _estado_log(self):
+        """(inode, tamanho) do log; o inode muda quando a compactação o troca"""
+        try:
+            st = os.stat(self.log_file)
+        except FileNotFoundError:
+            return None, 0
+        return st.st_ino, st.st_size
+
+    def _sincronizar(self):
+        """Recarrega o snapshot se mudou e aplica os eventos novos do log
+
+        No caso comum (só eventos novos) bastam três os.stat e a leitura do
+        fim do log, sem trava. Quando o snapshot ou o log foram trocados, a
+        releitura é feita sob a trava compartilhada, para nunca combinar
+        arquivos de antes e de depois de uma compactação em andamento.
+        """
+        with self._escrita:
+            id_log, tamanho_log = self._estado_log()
+            if (self._estado is None or id_log != self._id_log
+                    or tamanho_log < self._offset
+                    or self._jogadores.alterado() or self._historico.alterado()):
+                with self._trava.compartilhada():
+                    id_log, tamanho_log = self._estado_log()
+                    historico = self._historico.ler()
+                    jogadores = self._jogadores.ler()
+                    versao_snapshot = (self._jogadores.versao, self._historico.versao)
+                    if (self._estado is None or versao_snapshot != self._versao_snapshot
+                            or id_log != self._id_log or tamanho_log < self._offset):
+                        resumo = historico.get('resumo_jogadores')
+                        if resumo is not None and resumo != resumo_jogadores(jogadores):
+                            # Compactação interrompida entre as duas gravações:
+                            # jogadores.json já inclui eventos que o log ainda
+                            # vai reaplicar, então as estatísticas são refeitas
+                            # a partir das partidas do snapshot
+                            jogadores = recalcular_jogadores(
+                                historico['partidas'], jogadores
+                            )
+                        self._estado = (
+                            {nome: dict(dados) for nome, dados in jogadores.items()},
+                            list(historico['partidas'])
+                        )
+                        self._versao_snapshot = versao_snapshot
+                        self._seq = self._seq_snapshot = historico.get('seq', 0)
+                        self._proximo = historico['proximo_id']
+                        self._offset = 0
+                        self._id_log = id_log
+
+            if tamanho_log > self._offset:
+                self._ler_log()
+            return self._estado
+
+    def _ler_log(self):
+        with open(self.log_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_ino != self._id_log:
+                return  # Log trocado por uma compactação; relido no próximo acesso
+            f.seek(self._offset)
+            for linha in f:
+                if not linha.endswith(b'\n'):
+                    break  # Linha ainda sendo escrita por outro processo
+                self._offset += len(linha)
+                if not linha.strip():
+                    continue
+                try:
+                    evento = serializacao.de_bytes(linha)
+                except ValueError:
+                    # Só acontece com logs gravados antes de `_cortar_linha_incompleta`
+                    log.warning('Linha inválida ignorada no log %s: %.80r',
+                                self.log_file, linha)
+                    continue
+                if evento['seq'] > self._seq:
+                    self._aplicar(evento)
+
+    def _aplicar(self, evento):
+        versao_anterior = self._versao_partidas()
+        antiga = aplicar_evento(*self._estado, evento)
+        self._seq = evento['seq']
+        if evento['op'] == 'add':
+            self._proximo = max(self._proximo, evento['partida']['id'] + 1)
+        self._acompanhar_agregados(versao_anterior, [(evento, antiga)])
+
+    def jogadores(self) -> dict[str, JogadorDict]:
+        return self._sincronizar()[0]
+
+    def partidas(self) -> list[PartidaDict]:
+        return self._sincronizar()[1]
+
+    def _proximo_id(self):
+        self._sincronizar()
+        return self._proximo
+
+    def _executar(self, *eventos):
+        """Anexa os eventos ao log (uma linha cada, um fsync) e os aplica em memória
+
+        Sob a trava, `_sincronizar` consome antes os eventos anexados por
+        outros workers, então o 'seq' dos novos eventos nunca se repete.
+        """
+        with self._trava:
+            self._sincronizar()
+            self._cortar_linha_incompleta()
+            eventos = [
+                {'seq': self._seq + i, **evento}
+                for i, evento in enumerate(eventos, start=1)
+            ]
+            linhas = b''.join(serializacao.linha(evento) for evento in eventos)
+            alvo = os.path.basename(self.log_file)
+            with medir('anexar_log', alvo=alvo), open(self.log_file, 'ab') as f:
+                f.write(linhas)
+                f.flush()
+                os.fsync(f.fileno())
+                if self._id_log is None:  # Log criado por esta gravação
+                    self._id_log = os.fstat(f.fileno()).st_ino
+            for evento in eventos:
+                self._aplicar(evento)
+            self._offset += len(linhas)
+
+            pendentes = self._seq - self._seq_snapshot
+            if self.compactar_a_cada and pendentes >= self.compactar_a_cada:
+                self.compactar()
+            return True
+
+    def _cortar_linha_incompleta(self):
+        """Remove do fim do log uma linha sem '\n' (gravação interrompida)
+
+        Chamado sob a trava exclusiva antes de anexar: sem isso o próximo
+        evento seria emendado à linha pela metade, corrompendo os dois.
+        """
+        # Sem log ainda: nada a cortar
+        with suppress(FileNotFoundError), open(self.log_file, 'rb+') as f:
+            tamanho = f.seek(0, os.SEEK_END)
+            if tamanho == 0:
+                return
+            f.seek(tamanho - 1)
+            if f.read(1) == b'\n':
+                return
+            fim = tamanho
+            while fim > 0:
+                inicio = max(fim - 65536, 0)
+                f.seek(inicio)
+                posicao = f.read(fim - inicio).rfind(b'\n')
+                if posicao != -1:
+                    fim = inicio + posicao + 1
+                    break
+                fim = inicio
+            log.warning(
+                'Log %s terminava numa linha incompleta (%d bytes); linha removida',
+                self.log_file, tamanho - fim
+            )
+            f.truncate(fim)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def salvar_jogadores(self, jogadores):
+        self._executar({'op': 'jogadores', 'jogadores': jogadores})
+
+    def substituir(self, jogadores, partidas):
+        with self._trava:
+            self._sincronizar()  # Consome o log atual antes de descartá-lo
+            historico = normalizar_historico(
+                {'partidas': list(partidas), 'ordem': 'cronologica'}
+            )
+            self._estado = (
+                {nome: dict(dados) for nome, dados in jogadores.items()},
+                historico['partidas']
+            )
+            self._proximo = historico['proximo_id']
+            self._agregados.clear()
+            self.compactar()
+
+    def migrar_datas(self):
+        """Grava 'data_iso' em todas as partidas, incorporando o log ao snapshot"""
+        with self._trava:
+            self.compactar()
+            return len(self.partidas())
+
+    def compactar(self):
+        """Incorpora o log ao snapshot (jogadores.json / historico.json)
+
+        O snapshot de jogadores é gravado antes do histórico, que carrega o
+        'seq' e o resumo dos jogadores gravados junto; se o processo parar
+        entre as duas gravações, o resumo não confere e `_sincronizar` refaz
+        as estatísticas. O log só é esvaziado depois que os dois foram gravados.
+        """
+        with self._trava:
+            jogadores, partidas = self._sincronizar()
+            versao_anterior = self.versao
+            snapshot = {nome: dict(dados) for nome, dados in jogadores.items()}
+            self._jogadores.gravar(snapshot)
+            self._historico.gravar({
+                'partidas': list(partidas),
+                'ordem': 'cronologica',
+                'proximo_id': self._proximo,
+                'seq': self._seq,
+                'resumo_jogadores': resumo_jogadores(snapshot)
+            })
+            salvar_linhas([], self.log_file)
+            self._versao_snapshot = (self._jogadores.versao, self._historico.versao)
+            self._seq_snapshot = self._seq
+            self._offset = 0
+            self._id_log = self._estado_log()[0]
+            self._renovar_agregados(versao_anterior)  # O conteúdo não mudou
+
+    def invalidar(self):
+        with self._escrita:
+            super().invalidar()
+            self._estado = None
+
+
+def migrar_para_log(historico_file, log_file):
+    """Converte historico.json no formato antigo em snapshot do modo log
+
+    Retorna o número de partidas no snapshot. O log é criado vazio se ainda
+    não existir.
+    """
+    historico = normalizar_historico(carregar_dados(historico_file))
+    historico.setdefault('seq', 0)
+    salvar_dados(historico, historico_file)
+    if not os.path.exists(log_file):
+        salvar_linhas([], log_file)
+    return len(historico['partidas'])
+
+
+def criar_armazem(modo, jogadores_file=None, historico_file=None, log_file=None,
+                  sqlite_file=None, **opcoes):
+    """Cria o armazenamento configurado ('json', 'log' ou 'sqlite')"""
+    if modo == 'json':
+        if 'intervalo_ms' in opcoes:
+            return ArmazemAdiado(jogadores_file, historico_file, **opcoes)
+        return Armazem(jogadores_file, historico_file)
+    if modo == 'log':
+        return ArmazemLog(jogadores_file, historico_file, log_file, **opcoes)
+    if modo == 'sqlite':
+        from armazenamento_sqlite import ArmazemSQLite
+        return ArmazemSQLite(sqlite_file)
+    raise ValueError(f'Modo de armazenamento desconhecido: {modo}')
+
+
+def converter(origem, destino):
+    """Copia jogadores e partidas de um armazenamento para outro"""
+    jogadores = origem.copia_jogadores()
+    partidas = list(origem.partidas())
+    destino.substituir(jogadores, partidas)
+    return len(jogadores), len(partidas)
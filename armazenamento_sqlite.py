@@ -0,0 +1,597 @@
+"""Armazenamento em SQLite (SINUCA_ARMAZENAMENTO=sqlite)
+
+Jogadores e partidas ficam em tabelas próprias, com índices em jogador1,
+jogador2, vencedor e data, de modo que o perfil de um jogador é uma consulta
+indexada em vez de uma varredura do histórico. Cada processo (worker do
+gunicorn) abre uma única conexão, em modo WAL, para que leitores não sejam
+bloqueados pelas gravações de outros workers.
+
+Oferece a mesma interface de `armazenamento.Armazem`.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+from armazenamento import AGREGADOS, JogadorDict, PartidaDict, paginar
+from estatisticas import (
+    RankingPeriodos,
+    aplicar_partida,
+    atualizar_aproveitamento,
+    data_da_partida,
+    diferencas_estatisticas,
+    periodos_da_partida,
+    recalcular_jogadores,
+)
+from metricas import medir
+from modelo import Partida
+from rating import Elo
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS jogadores (
+    nome TEXT PRIMARY KEY,
+    vitorias INTEGER NOT NULL DEFAULT 0,
+    derrotas INTEGER NOT NULL DEFAULT 0,
+    saldo INTEGER NOT NULL DEFAULT 0,
+    aproveitamento REAL NOT NULL DEFAULT 0,
+    rank TEXT NOT NULL DEFAULT 'D',
+    extras TEXT
+);
+CREATE TABLE IF NOT EXISTS partidas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT,
+    data_iso TEXT,
+    jogador1 TEXT NOT NULL,
+    jogador2 TEXT NOT NULL,
+    vencedor TEXT NOT NULL,
+    placar TEXT,
+    valor INTEGER NOT NULL,
+    dobro_nada INTEGER NOT NULL DEFAULT 0,
+    tipo TEXT,
+    extras TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_partidas_jogador1 ON partidas (jogador1);
+CREATE INDEX IF NOT EXISTS idx_partidas_jogador2 ON partidas (jogador2);
+CREATE INDEX IF NOT EXISTS idx_partidas_vencedor ON partidas (vencedor);
+CREATE INDEX IF NOT EXISTS idx_partidas_data ON partidas (data_iso);
+CREATE TABLE IF NOT EXISTS periodos (
+    periodo TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    vitorias INTEGER NOT NULL DEFAULT 0,
+    derrotas INTEGER NOT NULL DEFAULT 0,
+    saldo INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (periodo, nome)
+);
+"""
+
+CAMPOS_JOGADOR = ('vitorias', 'derrotas', 'saldo', 'aproveitamento', 'rank')
+CAMPOS_PARTIDA = (
+    'data', 'jogador1', 'jogador2', 'vencedor', 'placar', 'valor', 'dobro_nada', 'tipo'
+)
+COLUNAS_PARTIDA = 'id, ' + ', '.join(CAMPOS_PARTIDA) + ', extras, data_iso'
+
+INSERIR_JOGADOR = 'INSERT INTO jogadores VALUES (?, ?, ?, ?, ?, ?, ?)'
+GRAVAR_JOGADOR = INSERIR_JOGADOR + (
+    ' ON CONFLICT (nome) DO UPDATE SET vitorias = excluded.vitorias,'
+    ' derrotas = excluded.derrotas, saldo = excluded.saldo,'
+    ' aproveitamento = excluded.aproveitamento, rank = excluded.rank,'
+    ' extras = excluded.extras'
+)
+INSERIR_PARTIDA = (
+    'INSERT INTO partidas (id, data, data_iso, jogador1, jogador2, vencedor, placar,'
+    ' valor, dobro_nada, tipo, extras)'
+    ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+)
+ACUMULAR_PERIODO = (
+    'INSERT INTO periodos (periodo, nome, vitorias, derrotas, saldo)'
+    ' VALUES (?, ?, ?, ?, ?)'
+    ' ON CONFLICT (periodo, nome) DO UPDATE'
+    ' SET vitorias = vitorias + excluded.vitorias,'
+    ' derrotas = derrotas + excluded.derrotas, saldo = saldo + excluded.saldo'
+)
+ATUALIZAR_PARTIDA = (
+    'UPDATE partidas SET data = ?, data_iso = ?, jogador1 = ?, jogador2 = ?,'
+    ' vencedor = ?, placar = ?, valor = ?, dobro_nada = ?, tipo = ?, extras = ?'
+    ' WHERE id = ?'
+)
+
+
+def _linha_jogador(nome, dados):
+    extras = {k: v for k, v in dados.items() if k not in CAMPOS_JOGADOR}
+    return (nome, dados.get('vitorias', 0), dados.get('derrotas', 0),
+            dados.get('saldo', 0), dados.get('aproveitamento', 0),
+            dados.get('rank', 'D'),
+            json.dumps(extras, ensure_ascii=False) if extras else None)
+
+
+def _jogador(linha):
+    dados = dict(zip(CAMPOS_JOGADOR, linha[1:6], strict=True))
+    if linha[6]:
+        dados.update(json.loads(linha[6]))
+    return linha[0], dados
+
+
+def _linha_partida(partida):
+    """Valores para INSERIR_PARTIDA; sem id, o SQLite atribui o próximo"""
+    extras = {
+        k: v for k, v in partida.items()
+        if k not in CAMPOS_PARTIDA and k not in ('id', 'data_iso')
+    }
+    return (partida.get('id'), partida.get('data'), data_da_partida(partida),
+            partida['jogador1'], partida['jogador2'], partida['vencedor'],
+            partida.get('placar'), partida['valor'],
+            int(bool(partida.get('dobro_nada'))), partida.get('tipo'),
+            json.dumps(extras, ensure_ascii=False) if extras else None)
+
+
+def _partida(linha):
+    partida = {'id': linha[0]}
+    for campo, valor in zip(CAMPOS_PARTIDA, linha[1:9], strict=True):
+        if valor is not None:
+            partida[campo] = valor
+    partida['dobro_nada'] = bool(partida.get('dobro_nada'))
+    if linha[9]:
+        partida.update(json.loads(linha[9]))
+    partida['data_iso'] = linha[10]
+    return partida
+
+
+class _PartidasSobDemanda:
+    """Iterável que só lê o histórico (`ArmazemSQLite.partidas`) ao ser percorrido
+
+    Agregados que não precisam das partidas para serem construídos (ex.:
+    `VersoesJogadores`) não carregam a tabela inteira.
+    """
+
+    def __init__(self, armazem):
+        self._armazem = armazem
+
+    def __iter__(self):
+        return iter(self._armazem.partidas())
+
+
+class ArmazemSQLite:
+    """Jogadores e partidas num banco SQLite, com cache de leitura em memória
+
+    O cache de `jogadores()` e `partidas()` é invalidado por `PRAGMA
+    data_version` (gravações de outras conexões) e pelas gravações feitas
+    por esta instância.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._conn = None
+        self._pid = None
+        self._escrita = threading.RLock()
+        self._escritas = 0
+        self._cache = {}
+        self._versao_cache = None
+        self._agregados = {}  # nome -> [agregado, versão] (ver armazenamento.AGREGADOS)
+
+    def _conexao(self):
+        """Conexão única do processo, recriada após um fork"""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.caminho, check_same_thread=False, isolation_level=None
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            conn.executescript(ESQUEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+            self._cache = {}
+            # Bancos criados antes dos rankings por período
+            sem_periodos = conn.execute(
+                'SELECT EXISTS (SELECT 1 FROM partidas)'
+                ' AND NOT EXISTS (SELECT 1 FROM periodos)').fetchone()[0]
+            if sem_periodos:
+                self._transacao(self._reconstruir_periodos)
+        return self._conn
+
+    @property
+    def versao(self):
+        versao_banco = self._conexao().execute('PRAGMA data_version').fetchone()[0]
+        return (versao_banco, self._escritas)
+
+    def _em_cache(self, chave, carregar):
+        versao = self.versao
+        if versao != self._versao_cache:
+            self._cache = {}
+            self._versao_cache = versao
+        if chave not in self._cache:
+            alvo = chave if isinstance(chave, str) else chave[0]
+            with medir('carregar_dados', alvo=alvo):
+                self._cache[chave] = carregar()
+        return self._cache[chave]
+
+    def jogadores(self) -> dict[str, JogadorDict]:
+        return self._em_cache('jogadores', lambda: self._ler_jogadores(self._conexao()))
+
+    def jogador(self, nome) -> JogadorDict | None:
+        return self.jogadores().get(nome)
+
+    def partidas(self) -> list[PartidaDict]:
+        def carregar():
+            linhas = self._conexao().execute(
+                f'SELECT {COLUNAS_PARTIDA} FROM partidas ORDER BY id'
+            )
+            return [_partida(linha) for linha in linhas]
+        return self._em_cache('partidas', carregar)
+
+    def partida(self, id_partida) -> PartidaDict | None:
+        linha = self._conexao().execute(
+            f'SELECT {COLUNAS_PARTIDA} FROM partidas WHERE id = ?', (id_partida,)
+        ).fetchone()
+        return None if linha is None else _partida(linha)
+
+    def iterar_partidas(self, antes=None, jogador=None, tipo=None, desde=None,
+                        ate=None):
+        """Partidas da mais recente para a mais antiga, lidas sob demanda do cursor"""
+        condicoes, parametros = [], []
+        if antes is not None:
+            condicoes.append('id < ?')
+            parametros.append(antes)
+        if jogador is not None:
+            condicoes.append('(jogador1 = ? OR jogador2 = ?)')
+            parametros += [jogador, jogador]
+        if tipo is not None:
+            condicoes.append('tipo = ?')
+            parametros.append(tipo)
+        if desde is not None:
+            condicoes.append('data_iso >= ?')
+            parametros.append(desde)
+        if ate is not None:
+            condicoes.append('data_iso < ?')
+            parametros.append(ate + '~')  # Inclui qualquer horário do dia final
+        onde = ' WHERE ' + ' AND '.join(condicoes) if condicoes else ''
+        cursor = self._conexao().execute(
+            f'SELECT {COLUNAS_PARTIDA} FROM partidas{onde} ORDER BY id DESC',
+            parametros)
+        return map(_partida, cursor)
+
+    def pagina_partidas(self, limite, **filtros):
+        """Uma página de partidas e o cursor ('antes') da página seguinte"""
+        return paginar(self.iterar_partidas(**filtros), limite)
+
+    def iterar_cronologico(self):
+        """Todas as partidas, da mais antiga para a mais recente, lidas do cursor"""
+        conn = sqlite3.connect(self.caminho)  # Leitura longa numa conexão própria
+        try:
+            linhas = conn.execute(f'SELECT {COLUNAS_PARTIDA} FROM partidas ORDER BY id')
+            for linha in linhas:
+                yield _partida(linha)
+        finally:
+            conn.close()
+
+    def partidas_do_jogador(self, nome) -> list[PartidaDict]:
+        """Partidas em que `nome` jogou, em ordem cronológica (consulta indexada)"""
+        linhas = self._conexao().execute(
+            f'SELECT {COLUNAS_PARTIDA} FROM partidas WHERE jogador1 = ? '
+            f'UNION ALL SELECT {COLUNAS_PARTIDA} FROM partidas WHERE jogador2 = ?'
+            ' ORDER BY id',
+            (nome, nome)
+        )
+        return [_partida(linha) for linha in linhas]
+
+    def partidas_compactas(self, nome) -> list[Partida]:
+        """Partidas de `nome` como `modelo.Partida`, montadas direto das linhas"""
+        colunas = 'id, data, jogador1, jogador2, vencedor, placar, dobro_nada'
+        linhas = self._conexao().execute(
+            f'SELECT {colunas} FROM partidas WHERE jogador1 = ? '
+            f'UNION ALL SELECT {colunas} FROM partidas WHERE jogador2 = ? ORDER BY id',
+            (nome, nome)
+        )
+        return [
+            Partida.com_vencedor(
+                data, jogador1, jogador2, vencedor, placar or '2-0', dobro_nada,
+                id_partida
+            )
+            for id_partida, data, jogador1, jogador2, vencedor, placar, dobro_nada
+            in linhas
+        ]
+
+    def confrontos_do_jogador(self, nome):
+        """Vitórias, derrotas e total de `nome` por oponente (consulta indexada)"""
+        linhas = self._conexao().execute(
+            'SELECT oponente, SUM(vencedor = ?), SUM(vencedor != ?), COUNT(*) FROM ('
+            ' SELECT jogador2 AS oponente, vencedor FROM partidas WHERE jogador1 = ?'
+            ' UNION ALL SELECT jogador1, vencedor FROM partidas WHERE jogador2 = ?'
+            ') GROUP BY oponente',
+            (nome, nome, nome, nome)
+        )
+        return {
+            oponente: {'vitorias': vitorias, 'derrotas': derrotas, 'total': total}
+            for oponente, vitorias, derrotas, total in linhas
+        }
+
+    def _agregado(self, nome):
+        """Agregado de `AGREGADOS`, mantido enquanto as gravações vierem desta conexão
+
+        Partidas novas registradas aqui atualizam os agregados em dia de
+        forma incremental; qualquer outra mudança faz o histórico ser
+        reprocessado no próximo acesso.
+        """
+        with self._escrita:
+            versao = self.versao
+            atual = self._agregados.get(nome)
+            if atual is None or atual[1] != versao:
+                partidas = _PartidasSobDemanda(self)
+                atual = self._agregados[nome] = [AGREGADOS[nome][0](partidas), versao]
+            return atual[0]
+
+    def ratings(self) -> Elo:
+        """Ratings Elo (incrementais a cada partida nova registrada aqui)"""
+        return self._agregado('ratings')
+
+    def estatisticas_avancadas(self, nome):
+        """Sequências, placares, Dobro ou Nada e forma recente de `nome`"""
+        return self._agregado('avancadas').do_jogador(nome)
+
+    def versao_jogador(self, nome):
+        """Muda sempre que uma partida de `nome` é registrada, editada ou excluída"""
+        return self._agregado('versoes').do_jogador(nome)
+
+    def periodos(self):
+        """Meses ('aaaa-mm') e anos ('aaaa') com partidas, mais recentes primeiro"""
+        def carregar():
+            linhas = self._conexao().execute(
+                'SELECT DISTINCT periodo FROM periodos ORDER BY periodo DESC'
+            )
+            return [periodo for periodo, in linhas]
+        return self._em_cache('periodos', carregar)
+
+    def ranking_periodo(self, periodo):
+        """Lista (nome, estatísticas) do mês ou ano `periodo`, por saldo"""
+        def carregar():
+            linhas = self._conexao().execute(
+                'SELECT nome, vitorias, derrotas, saldo FROM periodos WHERE periodo = ?'
+                ' ORDER BY saldo DESC, vitorias DESC, rowid', (periodo,))
+            classificacao = []
+            for nome, vitorias, derrotas, saldo in linhas:
+                dados = {'vitorias': vitorias, 'derrotas': derrotas, 'saldo': saldo}
+                atualizar_aproveitamento(dados)
+                classificacao.append((nome, dados))
+            return classificacao
+        return self._em_cache(('periodo', periodo), carregar)
+
+    def migrar_datas(self):
+        """Recalcula 'data_iso' de todas as partidas e os rankings por período"""
+        def alterar(conn):
+            linhas = conn.execute('SELECT id, data FROM partidas').fetchall()
+            conn.executemany(
+                'UPDATE partidas SET data_iso = ? WHERE id = ?',
+                [(data_da_partida({'data': data}), id_partida)
+                 for id_partida, data in linhas]
+            )
+            self._reconstruir_periodos(conn)
+            return len(linhas)
+        return self._transacao(alterar)
+
+    def _reconstruir_periodos(self, conn):
+        linhas = conn.execute(f'SELECT {COLUNAS_PARTIDA} FROM partidas ORDER BY id')
+        ranking = RankingPeriodos.construir(map(_partida, linhas))
+        conn.execute('DELETE FROM periodos')
+        conn.executemany('INSERT INTO periodos VALUES (?, ?, ?, ?, ?)', [
+            (periodo, nome, dados['vitorias'], dados['derrotas'], dados['saldo'])
+            for periodo, jogadores in ranking.periodos.items()
+            for nome, dados in jogadores.items()
+        ])
+
+    def aquecer(self, *nomes):
+        """Lê os dados e constrói os agregados `nomes` antes do primeiro uso
+
+        Confrontos são consultas indexadas, sem nada a pré-calcular; os
+        períodos ficam na tabela `periodos` e só a lista é carregada.
+        """
+        for nome in nomes:
+            if nome == 'periodos':
+                self.periodos()
+            elif nome != 'confrontos':
+                self._agregado(nome)
+
+    def verificar_confrontos(self):
+        """Os confrontos são calculados por consulta, sem agregados a verificar"""
+        return []
+
+    def copia_jogadores(self) -> dict[str, JogadorDict]:
+        return {nome: dict(dados) for nome, dados in self.jogadores().items()}
+
+    def _transacao(self, alterar):
+        """Executa `alterar(conn)` dentro de BEGIN IMMEDIATE ... COMMIT"""
+        with self._escrita:
+            conn = self._conexao()
+            with medir('transacao_sqlite'):
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    resultado = alterar(conn)
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+                conn.execute('COMMIT')
+            self._escritas += 1
+            return resultado
+
+    def _aplicar(self, conn, partidas, sinais):
+        """Aplica/reverte partidas apenas sobre os jogadores envolvidos"""
+        nomes = {nome for p in partidas for nome in (p['jogador1'], p['jogador2'])}
+        marcadores = ', '.join('?' * len(nomes))
+        jogadores = dict(_jogador(linha) for linha in conn.execute(
+            f'SELECT * FROM jogadores WHERE nome IN ({marcadores})', tuple(nomes)))
+        for partida, sinal in zip(partidas, sinais, strict=True):
+            aplicar_partida(jogadores, partida, sinal=sinal)
+        conn.executemany(GRAVAR_JOGADOR, [
+            _linha_jogador(nome, dados) for nome, dados in jogadores.items()
+        ])
+
+        # Rankings por período (mês e ano de cada partida)
+        acumulados = []
+        for partida, sinal in zip(partidas, sinais, strict=True):
+            vencedor, jogador1 = partida['vencedor'], partida['jogador1']
+            perdedor = partida['jogador2'] if vencedor == jogador1 else jogador1
+            saldo = sinal * partida['valor']
+            for periodo in periodos_da_partida(partida):
+                acumulados.append((periodo, vencedor, sinal, 0, saldo))
+                acumulados.append((periodo, perdedor, 0, sinal, -saldo))
+        conn.executemany(ACUMULAR_PERIODO, acumulados)
+        if -1 in sinais:
+            periodos = sorted({periodo for periodo, *_ in acumulados})
+            marcadores = ', '.join('?' * len(periodos))
+            conn.execute(
+                f'DELETE FROM periodos WHERE periodo IN ({marcadores})'
+                ' AND vitorias = 0 AND derrotas = 0', periodos
+            )
+
+    def registrar_partida(self, partida):
+        """Registra uma nova partida e atualiza os dois jogadores
+
+        Retorna o id atribuído à partida.
+        """
+        return self.registrar_partidas([partida])[0]
+
+    def registrar_partidas(self, partidas):
+        """Registra várias partidas em ordem numa única transação (importação)
+
+        Retorna os ids atribuídos, na mesma ordem.
+        """
+        partidas = list(partidas)
+
+        def alterar(conn):
+            # Dentro da transação nenhuma outra conexão grava, então a versão
+            # lida aqui é exatamente a anterior a estas partidas
+            versao = self.versao
+            em_dia = [
+                nome for nome, atual in self._agregados.items() if atual[1] == versao
+            ]
+            self._aplicar(conn, partidas, [1] * len(partidas))
+            ids = [
+                conn.execute(INSERIR_PARTIDA, _linha_partida(partida)).lastrowid
+                for partida in partidas
+            ]
+            return ids, em_dia, versao
+        if not partidas:
+            return []
+        with self._escrita:
+            ids, em_dia, (versao_banco, escritas) = self._transacao(alterar)
+            for nome in em_dia:
+                atual = self._agregados[nome]
+                for id_partida, partida in zip(ids, partidas, strict=True):
+                    evento = {'op': 'add', 'partida': {'id': id_partida, **partida}}
+                    if AGREGADOS[nome][1](atual[0], evento, None) is False:
+                        del self._agregados[nome]
+                        break
+                else:
+                    # O próprio commit não muda data_version, só o contador local
+                    atual[1] = (versao_banco, escritas + 1)
+            return ids
+
+    def _original(self, conn, id_partida):
+        linha = conn.execute(
+            f'SELECT {COLUNAS_PARTIDA} FROM partidas WHERE id = ?', (id_partida,)
+        ).fetchone()
+        return None if linha is None else _partida(linha)
+
+    def editar_partida(self, id_partida, nova, verificar=None):
+        """Substitui a partida `id_partida`, revertendo a original
+
+        `verificar(original)` roda na mesma transação e pode lançar
+        ValueError para impedir a edição.
+        """
+        def alterar(conn):
+            original = self._original(conn, id_partida)
+            if original is None:
+                return False
+            if verificar is not None:
+                verificar(original)
+            self._aplicar(conn, [original, nova], [-1, 1])
+            conn.execute(ATUALIZAR_PARTIDA, _linha_partida(nova)[1:] + (id_partida,))
+            return True
+        return self._transacao(alterar)
+
+    def excluir_partida(self, id_partida, verificar=None):
+        """Remove a partida `id_partida`, revertendo suas estatísticas
+
+        `verificar(original)` como em `editar_partida`.
+        """
+        def alterar(conn):
+            original = self._original(conn, id_partida)
+            if original is None:
+                return False
+            if verificar is not None:
+                verificar(original)
+            self._aplicar(conn, [original], [-1])
+            conn.execute('DELETE FROM partidas WHERE id = ?', (id_partida,))
+            return True
+        return self._transacao(alterar)
+
+    def _ler_jogadores(self, conn):
+        linhas = conn.execute('SELECT * FROM jogadores ORDER BY rowid')
+        return dict(_jogador(linha) for linha in linhas)
+
+    def _gravar_jogadores(self, conn, jogadores):
+        conn.execute('DELETE FROM jogadores')
+        conn.executemany(INSERIR_JOGADOR, [
+            _linha_jogador(nome, dados) for nome, dados in jogadores.items()
+        ])
+
+    def recalcular_estatisticas(self, gravar=True):
+        """Recalcula as estatísticas dos jogadores a partir do histórico
+
+        A leitura e a gravação ocorrem na mesma transação, sem que outro
+        worker registre partidas no meio.
+        """
+        def alterar(conn):
+            atuais = self._ler_jogadores(conn)
+            linhas = conn.execute(f'SELECT {COLUNAS_PARTIDA} FROM partidas ORDER BY id')
+            recalculados = recalcular_jogadores(map(_partida, linhas), atuais)
+            diferencas = diferencas_estatisticas(atuais, recalculados)
+            if gravar and diferencas:
+                self._gravar_jogadores(conn, recalculados)
+            return diferencas
+        return self._transacao(alterar)
+
+    def salvar_jogadores(self, jogadores):
+        self._transacao(lambda conn: self._gravar_jogadores(conn, jogadores))
+
+    def alterar_jogadores(self, alterar):
+        """Chama `alterar(jogadores)` e grava o resultado numa única transação"""
+        def transacao(conn):
+            jogadores = self._ler_jogadores(conn)
+            resultado = alterar(jogadores)
+            if resultado is not False:
+                self._gravar_jogadores(conn, jogadores)
+            return resultado
+        return self._transacao(transacao)
+
+    def renomear_jogador(self, nome, novo_nome):
+        """Renomeia o jogador nos jogadores e nas suas partidas, numa única transação
+
+        Retorna False se `nome` não existe ou se `novo_nome` já está em uso.
+        """
+        def alterar(conn):
+            jogadores = self._ler_jogadores(conn)
+            if nome not in jogadores or novo_nome in jogadores:
+                return False
+            jogadores[novo_nome] = {**jogadores.pop(nome), 'nome': novo_nome}
+            self._gravar_jogadores(conn, jogadores)
+            for coluna in ('jogador1', 'jogador2', 'vencedor'):
+                conn.execute(f'UPDATE partidas SET {coluna} = ? WHERE {coluna} = ?',
+                             (novo_nome, nome))
+            self._reconstruir_periodos(conn)
+            return True
+        return self._transacao(alterar)
+
+    def substituir(self, jogadores, partidas):
+        """Substitui todos os dados (usado na conversão entre armazenamentos)"""
+        def alterar(conn):
+            conn.execute('DELETE FROM partidas')
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = 'partidas'")
+            conn.executemany(INSERIR_PARTIDA, map(_linha_partida, partidas))
+            self._gravar_jogadores(conn, jogadores)
+            self._reconstruir_periodos(conn)
+        self._transacao(alterar)
+
+    def invalidar(self):
+        """Descarta o cache de leitura"""
+        self._cache = {}
+        self._versao_cache = None
@@ -0,0 +1,94 @@
+"""Busca de jogadores para autocompletar: índice por prefixo x varredura
+
+Uso:
+    python benchmarks/bench_busca.py [--jogadores 1000 10000 50000] [--consultas 2000]
+
+"varredura" normaliza e testa todos os nomes a cada consulta; "índice" é
+`busca.IndiceJogadores` (busca binária). Confere que os dois encontram os
+mesmos nomes e reporta o tempo de construção do índice e p50/p95 (µs) das
+consultas, com prefixos de 1 a 8 letras sorteados dos próprios nomes.
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from busca import IndiceJogadores, normalizar  # noqa: E402
+
+PRIMEIROS = [
+    'Ana', 'João', 'José', 'Maria', 'Conceição', 'Antônio', 'Luís', 'Sérgio', 'Flávia',
+    'Inês',
+]
+SOBRENOMES = [
+    'Carlão', 'Araújo', 'Gonçalves', 'Simões', 'Brandão', 'Lúcio', 'Peçanha', 'Românio',
+]
+
+
+def gerar_nomes(quantidade, rng):
+    nomes = set()
+    while len(nomes) < quantidade:
+        primeiro, sobrenome = rng.choice(PRIMEIROS), rng.choice(SOBRENOMES)
+        nomes.add(f'{primeiro} {sobrenome} {rng.randrange(100000)}')
+    return sorted(nomes)
+
+
+def varredura(nomes, consulta, limite):
+    prefixo = normalizar(consulta)
+    chaves = ((normalizar(nome), nome) for nome in nomes)
+    encontrados = (par for par in chaves if par[0].startswith(prefixo))
+    return [nome for _, nome in heapq.nsmallest(limite, encontrados)]
+
+
+def percentil(valores, fracao):
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * fracao), len(ordenados) - 1)]
+
+
+def faixa(valores):
+    """p50 / p95 em µs"""
+    return f'{percentil(valores, 0.5) * 1e6:.1f} / {percentil(valores, 0.95) * 1e6:.1f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jogadores', type=int, nargs='+',
+                        default=[1000, 10000, 50000])
+    parser.add_argument('--consultas', type=int, default=2000)
+    parser.add_argument('--limite', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f'{"jogadores":>9} {"construção (ms)":>16} {"índice p50/p95 (µs)":>20}'
+          f' {"varredura p50/p95 (µs)":>23}')
+    for quantidade in args.jogadores:
+        nomes = gerar_nomes(quantidade, rng)
+        inicio = time.perf_counter()
+        indice = IndiceJogadores(nomes)
+        construcao = time.perf_counter() - inicio
+
+        consultas = [
+            rng.choice(nomes)[:rng.randint(1, 8)] for _ in range(args.consultas)
+        ]
+        tempos = {'indice': [], 'varredura': []}
+        for n, consulta in enumerate(consultas):
+            inicio = time.perf_counter()
+            resultado = indice.buscar(consulta, args.limite)
+            tempos['indice'].append(time.perf_counter() - inicio)
+            if n < 50:  # A varredura é lenta demais para todas as consultas
+                inicio = time.perf_counter()
+                esperado = varredura(nomes, consulta, args.limite)
+                tempos['varredura'].append(time.perf_counter() - inicio)
+                assert resultado[:len(esperado)] == esperado, (
+                    consulta, esperado, resultado
+                )
+
+        print(f'{quantidade:>9} {construcao * 1000:>16.1f}'
+              f' {faixa(tempos["indice"]):>20} {faixa(tempos["varredura"]):>23}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Requisições/s em / e /historico com e sem o cache em memória do Armazem
+
+Uso:
+    python benchmarks/bench_cache.py [--partidas 10000 100000]
+
+"antes" descarta o cache a cada requisição (equivalente a reler e parsear os
+arquivos JSON como fazia `carregar_dados`); "depois" usa o cache validado por
+mtime/tamanho.
+"""
+import argparse
+import tempfile
+
+import comum
+from gerador import escrever_liga
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--partidas', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--jogadores', type=int, default=50)
+    parser.add_argument('--duracao', type=float, default=2.0)
+    args = parser.parse_args()
+    
+    print(f'{"partidas":>9} {"rota":<10} {"antes req/s":>12} {"depois req/s":>13}'
+          f' {"ganho":>7}')
+    for num_partidas in args.partidas:
+        with tempfile.TemporaryDirectory() as tmp:
+            arquivos = escrever_liga(tmp, args.jogadores, num_partidas)
+            client = comum.preparar_app(*arquivos)
+            for rota in ['/', '/historico']:
+                def sem_cache(client=client, rota=rota):
+                    comum.main.armazem.invalidar()
+                    client.get(rota)
+                
+                def com_cache(client=client, rota=rota):
+                    client.get(rota)
+                
+                antes = comum.medir_rps(sem_cache, args.duracao)
+                depois = comum.medir_rps(com_cache, args.duracao)
+                print(f'{num_partidas:>9} {rota:<10} {antes:>12.1f} {depois:>13.1f}'
+                      f' {depois / antes:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
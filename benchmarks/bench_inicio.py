@@ -0,0 +1,114 @@
+"""Inicialização de um worker: tempo até ficar pronto e primeiras requisições
+
+Uso:
+    python benchmarks/bench_inicio.py [--partidas 100000] [--modo json log sqlite]
+                                      [--meta-s 5] [--meta-ms 100]
+
+Para cada armazenamento inicia um processo novo, como um worker do gunicorn
+recém-criado, que importa main.py, chama `preparar_app` e faz a primeira
+requisição de cada página (/, /historico, /perfil, /ranking, /api/jogadores).
+Compara o worker sem preflight (SINUCA_AQUECER=0: dados e agregados são
+carregados pela primeira requisição que precisa deles) com o preflight.
+
+"pronto" é o tempo de importação + `preparar_app`; "pior 1ª" é a primeira
+requisição mais lenta depois disso. Com o preflight, o script termina com
+código 1 se "pronto" passar de --meta-s ou "pior 1ª" de --meta-ms.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from gerador import escrever_liga
+from suite import MODOS, preparar_dados
+
+
+def medir_processo(aquecer, nome):
+    """Executado no processo filho (diretório dos dados): tempos em ms"""
+    inicio = time.perf_counter()
+    import comum
+    importar = time.perf_counter() - inicio
+
+    # Só instala os templates mínimos; os dados ainda não foram lidos
+    client = comum.usar_armazem(comum.main.armazem)
+    inicio = time.perf_counter()
+    comum.main.preparar_app(aquecer)
+    pronto = importar + time.perf_counter() - inicio
+
+    primeiras = {}
+    rotas = ['/', '/historico', f'/perfil/{nome}', '/ranking', '/api/jogadores?q=jog']
+    for rota in rotas:
+        inicio = time.perf_counter()
+        assert client.get(rota).status_code == 200, rota
+        primeiras[rota] = (time.perf_counter() - inicio) * 1000
+    return {
+        'importar_ms': importar * 1000,
+        'pronto_ms': pronto * 1000,
+        'primeiras_ms': primeiras,
+    }
+
+
+def executar(modo, arquivos, aquecer, nome):
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__),
+         '--filho', json.dumps({'aquecer': aquecer, 'nome': nome})],
+        cwd=os.path.dirname(arquivos['jogadores_file']),
+        env={**os.environ, 'SINUCA_ARMAZENAMENTO': modo},
+        capture_output=True, text=True
+    )
+    if saida.returncode != 0:
+        raise RuntimeError(f'{modo} falhou:\n{saida.stderr}')
+    return json.loads(saida.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--partidas', type=int, default=100000)
+    parser.add_argument('--jogadores', type=int, default=100)
+    parser.add_argument('--modo', nargs='+', default=list(MODOS), choices=MODOS)
+    parser.add_argument('--meta-s', type=float, default=5.0,
+                        help='Tempo máximo até o worker ficar pronto.')
+    parser.add_argument('--meta-ms', type=float, default=100.0,
+                        help='Primeira requisição mais lenta aceita.')
+    parser.add_argument('--filho', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(medir_processo(**json.loads(args.filho))))
+        return
+
+    acima = []
+    print(f'{"modo":<7} {"preflight":<9} {"importar (ms)":>13} {"pronto (ms)":>12}'
+          f' {"pior 1ª (ms)":>13}  rota')
+    with tempfile.TemporaryDirectory() as base:
+        escrever_liga(base, args.jogadores, args.partidas)
+        with open(os.path.join(base, 'jogadores.json'), encoding='utf-8') as f:
+            nome = next(iter(json.load(f)))
+        for modo in args.modo:
+            with tempfile.TemporaryDirectory() as destino:
+                arquivos = preparar_dados(modo, base, destino)
+                for aquecer in (False, True):
+                    resultado = executar(modo, arquivos, aquecer, nome)
+                    primeiras = resultado['primeiras_ms']
+                    rota, pior = max(primeiras.items(), key=lambda item: item[1])
+                    pronto = resultado['pronto_ms']
+                    print(f'{modo:<7} {"sim" if aquecer else "não":<9}'
+                          f' {resultado["importar_ms"]:>13.0f} {pronto:>12.0f}'
+                          f' {pior:>13.1f}  {rota}')
+                    if aquecer and (pronto > args.meta_s * 1000 or pior > args.meta_ms):
+                        acima.append(modo)
+
+    if acima:
+        print(f'Acima da meta ({args.meta_s:g} s pronto,'
+              f' {args.meta_ms:g} ms na 1ª requisição): {", ".join(acima)}')
+        sys.exit(1)
+    print(f'Dentro da meta com {args.partidas} partidas:'
+          f' pronto em até {args.meta_s:g} s,'
+          f' 1ª requisição em até {args.meta_ms:g} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Gravação e leitura de historico.json por motor e formato
+
+Uso:
+    python benchmarks/bench_json.py [--partidas 100000] [--repeticoes 5]
+
+Compara o formato anterior (json da biblioteca padrão, indent=2) com o
+compacto e o indentado de cada motor disponível (ver serializacao.py): tempo
+de `salvar_dados` (inclui o fsync), de `carregar_dados` (com mmap no orjson
+a partir de 1 MiB) e tamanho do arquivo.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serializacao  # noqa: E402
+from armazenamento import carregar_dados, salvar_dados  # noqa: E402
+from gerador import gerar_liga  # noqa: E402
+
+
+def melhor_tempo(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--partidas', type=int, nargs='+', default=[100000])
+    parser.add_argument('--jogadores', type=int, default=100)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    motores = ['json'] + (['orjson'] if serializacao.orjson else [])
+    if not serializacao.orjson:
+        print('orjson não instalado: apenas a biblioteca padrão')
+    print(f'{"partidas":>9} {"motor":<7} {"formato":<9} {"gravar (ms)":>12}'
+          f' {"ler (ms)":>9} {"tamanho (MiB)":>14}')
+    for num_partidas in args.partidas:
+        _, historico = gerar_liga(args.jogadores, num_partidas)
+        with tempfile.TemporaryDirectory() as diretorio:
+            arquivo = os.path.join(diretorio, 'historico.json')
+            for motor in motores:
+                for legivel in (True, False):
+                    serializacao.configurar(motor, legivel)
+                    gravar = melhor_tempo(
+                        partial(salvar_dados, historico, arquivo), args.repeticoes
+                    )
+                    ler = melhor_tempo(
+                        partial(carregar_dados, arquivo), args.repeticoes
+                    )
+                    assert carregar_dados(arquivo) == historico
+                    formato = 'indentado' if legivel else 'compacto'
+                    tamanho = os.path.getsize(arquivo) / 2 ** 20
+                    print(f'{num_partidas:>9} {motor:<7} {formato:<9}'
+                          f' {gravar * 1000:>12.1f} {ler * 1000:>9.1f}'
+                          f' {tamanho:>14.2f}')
+    serializacao.configurar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Custo da instrumentação: requisições/s com as métricas desativadas e ativadas
+
+Uso:
+    python benchmarks/bench_metricas.py [--partidas 50000] [--jogadores 1000]
+
+Cada modo roda num processo próprio, pois as métricas são ativadas ao
+importar main.py: "desativadas" é o padrão (`medir` devolve um contexto vazio
+e não há hooks de requisição); "ativadas" usa SINUCA_METRICAS=1. Ao final
+mostra as contagens do /metrics gerado.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from functools import partial
+
+ROTAS = ('/', '/historico', '/perfil/jogador 00001', '/api/ranking?periodo=2024')
+
+
+def medir_modo(args):
+    """Executado no processo filho: imprime req/s por rota (e o /metrics) em JSON"""
+    import comum
+    from gerador import escrever_liga
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = comum.preparar_app(*escrever_liga(tmp, args.jogadores, args.partidas))
+        rps = {
+            rota: comum.medir_rps(partial(client.get, rota), args.duracao)
+            for rota in ROTAS
+        }
+        with client.session_transaction() as sessao:
+            sessao['user'] = comum.main.ADMIN_USER
+        resposta = client.get('/metrics')
+        texto = resposta.get_data(as_text=True) if resposta.status_code == 200 else ''
+    print(json.dumps({'rps': rps, 'metricas': texto}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--partidas', type=int, default=50000)
+    parser.add_argument('--jogadores', type=int, default=1000)
+    parser.add_argument('--duracao', type=float, default=2.0)
+    parser.add_argument('--filho', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.filho:
+        medir_modo(args)
+        return
+
+    resultados = {}
+    for modo, valor in (('desativadas', '0'), ('ativadas', '1')):
+        saida = subprocess.run(
+            [sys.executable, __file__, '--filho', '--partidas', str(args.partidas),
+             '--jogadores', str(args.jogadores), '--duracao', str(args.duracao)],
+            env={**os.environ, 'SINUCA_METRICAS': valor},
+            capture_output=True, text=True, check=True
+        ).stdout
+        resultados[modo] = json.loads(saida.splitlines()[-1])
+
+    desativadas = resultados['desativadas']['rps']
+    ativadas = resultados['ativadas']['rps']
+    print(f'{"rota":<28} {"desativadas req/s":>18} {"ativadas req/s":>15} {"custo":>7}')
+    for rota in ROTAS:
+        custo = (desativadas[rota] - ativadas[rota]) / desativadas[rota] * 100
+        print(f'{rota:<28} {desativadas[rota]:>18.1f} {ativadas[rota]:>15.1f}'
+              f' {custo:>6.1f}%')
+    print()
+    metricas = resultados['ativadas']['metricas'].splitlines()
+    print('\n'.join(linha for linha in metricas if '_count' in linha))
+
+
+if __name__ == '__main__':
+    main()
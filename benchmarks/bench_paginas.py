@@ -0,0 +1,67 @@
+"""Requisições/s em /, /historico e /perfil com e sem o cache de páginas
+
+Uso:
+    python benchmarks/bench_paginas.py [--partidas 10000 100000]
+
+"sem cache" renderiza a página a cada requisição (SINUCA_CACHE_PAGINAS=0);
+"com cache" reaproveita o HTML enquanto a versão dos dados não muda. Ao fim
+registra uma partida e confere que só os perfis dos dois jogadores envolvidos
+(e as páginas gerais) são renderizados de novo.
+"""
+import argparse
+import tempfile
+from functools import partial
+
+import comum
+from gerador import escrever_liga
+
+
+def registrar_partida(client, jogador1, jogador2):
+    with client.session_transaction() as sessao:
+        sessao['user'] = comum.main.ADMIN_USER
+    client.post('/add', data={
+        'jogador1': jogador1, 'jogador2': jogador2,
+        'vencedor_partida1': 'jogador1', 'vencedor_partida2': 'jogador1',
+    })
+    with client.session_transaction() as sessao:
+        sessao.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--partidas', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--jogadores', type=int, default=50)
+    parser.add_argument('--duracao', type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f'{"partidas":>9} {"rota":<24} {"sem cache req/s":>16}'
+          f' {"com cache req/s":>16} {"ganho":>7}')
+    for num_partidas in args.partidas:
+        with tempfile.TemporaryDirectory() as tmp:
+            arquivos = escrever_liga(tmp, args.jogadores, num_partidas)
+            client = comum.preparar_app(*arquivos)
+            nomes = sorted(comum.main.armazem.jogadores())
+            for rota in ['/', '/historico', f'/perfil/{nomes[0]}']:
+                comum.main.CACHE_PAGINAS = False
+                antes = comum.medir_rps(partial(client.get, rota), args.duracao)
+                comum.main.CACHE_PAGINAS = True
+                depois = comum.medir_rps(partial(client.get, rota), args.duracao)
+                print(f'{num_partidas:>9} {rota:<24} {antes:>16.1f} {depois:>16.1f}'
+                      f' {depois / antes:>6.1f}x')
+
+            paginas = comum.main.paginas
+            perfis = [f'/perfil/{nome}' for nome in nomes]
+            for rota in perfis:
+                client.get(rota)
+            faltas = paginas.faltas
+            registrar_partida(client, nomes[0], nomes[1])
+            for rota in perfis:
+                client.get(rota)
+            refeitos = paginas.faltas - faltas
+            assert refeitos == 2, refeitos
+            print(f'{num_partidas:>9} após registrar uma partida:'
+                  f' {refeitos} de {len(perfis)} perfis renderizados')
+
+
+if __name__ == '__main__':
+    main()
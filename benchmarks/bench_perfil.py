@@ -0,0 +1,116 @@
+"""Montagem das partidas do perfil: dicts do histórico x `modelo.Partida`
+
+Uso:
+    python benchmarks/bench_perfil.py [--partidas 10000 100000] [--jogadores 20]
+
+"dicts" é o laço do perfil sobre as partidas de historico.json (busca por
+chave, inversão do placar comparando strings); "compacta" é o mesmo laço
+sobre `Partida.para`. Confere que as duas listas são idênticas e mede também
+a memória das partidas de um jogador em cada formato.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gerador import gerar_liga  # noqa: E402
+from modelo import Partida  # noqa: E402
+
+
+def perfil_dicts(nome, partidas):
+    """Laço do perfil anterior ao modelo compacto"""
+    resultado = []
+    for partida in reversed(partidas):
+        if partida['jogador1'] == nome:
+            oponente = partida['jogador2']
+        else:
+            oponente = partida['jogador1']
+        vitoria = partida['vencedor'] == nome
+        placar = partida.get('placar', '2-0')
+        if not vitoria:
+            if placar == '2-0':
+                placar = '0-2'
+            elif placar == '2-1':
+                placar = '1-2'
+        resultado.append({
+            'id': partida['id'],
+            'data': partida['data'],
+            'oponente': oponente,
+            'vitoria': vitoria,
+            'placar': placar,
+            'dobro_nada': partida.get('dobro_nada', False),
+            'valor': partida['valor']
+        })
+    return resultado
+
+
+def perfil_compacto(nome, partidas):
+    resultado = []
+    for partida in reversed(partidas):
+        oponente, vitoria, placar, dobro_nada, valor = partida.para(nome)
+        resultado.append({
+            'id': partida.id,
+            'data': partida.data,
+            'oponente': oponente,
+            'vitoria': vitoria,
+            'placar': placar,
+            'dobro_nada': dobro_nada,
+            'valor': valor
+        })
+    return resultado
+
+
+def medir(funcao, *args, repeticoes=20):
+    """Melhor tempo (s) de `repeticoes` execuções"""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def memoria(construir):
+    """Bytes alocados por `construir()` (mantendo o resultado vivo)"""
+    tracemalloc.start()
+    objeto = construir()
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objeto
+    return atual
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--partidas', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--jogadores', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f'{"partidas":>9} {"do jogador":>11} {"dicts (ms)":>11}'
+          f' {"compacta (ms)":>14} {"ganho":>6} {"dicts (KiB)":>12}'
+          f' {"compacta (KiB)":>15}')
+    for num_partidas in args.partidas:
+        _, historico = gerar_liga(args.jogadores, num_partidas)
+        nome = historico['partidas'][0]['jogador1']
+        dicts = [
+            p for p in historico['partidas'] if nome in (p['jogador1'], p['jogador2'])
+        ]
+        compactas = [Partida.de_dict(p) for p in dicts]
+        assert perfil_dicts(nome, dicts) == perfil_compacto(nome, compactas)
+
+        antes = medir(perfil_dicts, nome, dicts)
+        depois = medir(perfil_compacto, nome, compactas)
+        kib_dicts = memoria(lambda dicts=dicts: [dict(p) for p in dicts]) / 1024
+        kib_compactas = memoria(
+            lambda dicts=dicts: [Partida.de_dict(p) for p in dicts]
+        ) / 1024
+        print(f'{num_partidas:>9} {len(dicts):>11} {antes * 1000:>11.2f}'
+              f' {depois * 1000:>14.2f} {antes / depois:>5.1f}x'
+              f' {kib_dicts:>12,.0f} {kib_compactas:>15,.0f}')
+
+
+if __name__ == '__main__':
+    main()
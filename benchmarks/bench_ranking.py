@@ -0,0 +1,52 @@
+"""Requisições/s em / com o ranking ordenado em cache e respostas condicionais
+
+Uso:
+    python benchmarks/bench_ranking.py [--jogadores 1000 5000]
+
+"antes" descarta a visão do ranking a cada requisição (reordena todos os
+jogadores, como antes do cache); "depois" reaproveita a ordenação calculada;
+"304" envia If-None-Match com o ETag recebido, como faz um navegador que já
+tem a página.
+"""
+import argparse
+import tempfile
+
+import comum
+from gerador import escrever_liga
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jogadores', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--partidas', type=int, default=50000)
+    parser.add_argument('--duracao', type=float, default=2.0)
+    args = parser.parse_args()
+    
+    print(f'{"jogadores":>9} {"antes req/s":>12} {"depois req/s":>13}'
+          f' {"304 req/s":>10} {"ganho":>7}')
+    for num_jogadores in args.jogadores:
+        with tempfile.TemporaryDirectory() as tmp:
+            arquivos = escrever_liga(tmp, num_jogadores, args.partidas)
+            client = comum.preparar_app(*arquivos)
+            etag = client.get('/').headers['ETag']
+            
+            def sem_cache(client=client):
+                comum.main.ranking.invalidar()
+                client.get('/')
+            
+            def com_cache(client=client):
+                client.get('/')
+            
+            def condicional(client=client, etag=etag):
+                resposta = client.get('/', headers={'If-None-Match': etag})
+                assert resposta.status_code == 304
+            
+            antes = comum.medir_rps(sem_cache, args.duracao)
+            depois = comum.medir_rps(com_cache, args.duracao)
+            nao_modificado = comum.medir_rps(condicional, args.duracao)
+            print(f'{num_jogadores:>9} {antes:>12.1f} {depois:>13.1f}'
+                  f' {nao_modificado:>10.1f} {depois / antes:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
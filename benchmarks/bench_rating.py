@@ -0,0 +1,45 @@
+"""Tempo de reprocessamento do Elo por tamanho de histórico
+
+Uso:
+    python benchmarks/bench_rating.py [--partidas 1000 10000 100000 1000000]
+
+Mede também o custo de uma atualização incremental (uma partida nova).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gerador import gerar_liga  # noqa: E402
+from rating import Elo  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--partidas', type=int, nargs='+',
+                        default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--jogadores', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f'{"partidas":>9} {"reprocessar (s)":>16} {"partidas/s":>12}'
+          f' {"incremental (µs)":>17}')
+    for num_partidas in args.partidas:
+        _, historico = gerar_liga(args.jogadores, num_partidas)
+        partidas = historico['partidas']
+        inicio = time.perf_counter()
+        elo = Elo.reprocessar(partidas)
+        decorrido = time.perf_counter() - inicio
+
+        amostra = partidas[:1000]
+        inicio = time.perf_counter()
+        for partida in amostra:
+            elo.registrar_partida(partida)
+        incremental = (time.perf_counter() - inicio) / len(amostra) * 1e6
+        print(f'{num_partidas:>9} {decorrido:>16.3f} {num_partidas / decorrido:>12,.0f}'
+              f' {incremental:>17.2f}')
+
+
+if __name__ == '__main__':
+    main()
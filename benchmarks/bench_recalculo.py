@@ -0,0 +1,36 @@
+"""Tempo de recálculo completo das estatísticas por tamanho de histórico
+
+Uso:
+    python benchmarks/bench_recalculo.py [--partidas 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from estatisticas import diferencas_estatisticas, recalcular_jogadores  # noqa: E402
+from gerador import gerar_liga  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--partidas', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--jogadores', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f'{"partidas":>9} {"recalcular (s)":>15} {"partidas/s":>12}'
+          f' {"diferenças":>11}')
+    for num_partidas in args.partidas:
+        jogadores, historico = gerar_liga(args.jogadores, num_partidas)
+        inicio = time.perf_counter()
+        recalculados = recalcular_jogadores(historico['partidas'], jogadores)
+        decorrido = time.perf_counter() - inicio
+        diferencas = diferencas_estatisticas(jogadores, recalculados)
+        print(f'{num_partidas:>9} {decorrido:>15.3f} {num_partidas / decorrido:>12,.0f}'
+              f' {len(diferencas):>11}')
+
+
+if __name__ == '__main__':
+    main()
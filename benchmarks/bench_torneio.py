@@ -0,0 +1,86 @@
+"""Geração e resolução de torneios de 256 jogadores
+
+Uso:
+    python benchmarks/bench_torneio.py [--jogadores 256]
+                                       [--formato eliminatoria dupla_eliminatoria]
+
+Para cada formato gera o torneio e registra todos os confrontos, rodada a
+rodada, com o favorito vencendo 75% das vezes. Reporta o tempo de geração,
+o custo médio de registrar um resultado (classificação incremental), o de
+ordenar a classificação e, para comparação, o de refazê-la percorrendo todos
+os confrontos (`Torneio.de_dict`), que seria pago a cada resultado sem o
+cálculo incremental.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo import Partida  # noqa: E402
+from torneios import FORMATOS, Torneio  # noqa: E402
+
+
+def resolver(torneio, rng):
+    """Registra todos os confrontos; retorna (resultados, segundos registrando)"""
+    cabeca = {nome: posicao for posicao, nome in enumerate(torneio.jogadores)}
+    resultados = 0
+    decorrido = 0.0
+    while True:
+        pendentes = torneio.pendentes()
+        if not pendentes:
+            return resultados, decorrido
+        for confronto in pendentes:
+            jogador1, jogador2 = confronto['jogadores']
+            favorito, azarao = sorted((jogador1, jogador2), key=cabeca.get)
+            vencedor = favorito if rng.random() < 0.75 else azarao
+            partida = Partida.com_vencedor(
+                '01/02/2025 20:00', jogador1, jogador2, vencedor,
+                rng.choice(('2-0', '2-1')), rng.random() < 0.15
+            )
+            inicio = time.perf_counter()
+            torneio.registrar_resultado(confronto['id'], partida, resultados)
+            decorrido += time.perf_counter() - inicio
+            resultados += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jogadores', type=int, default=256)
+    parser.add_argument('--formato', nargs='+', default=list(FORMATOS),
+                        choices=FORMATOS)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    nomes = [f'jogador {i:03d}' for i in range(args.jogadores)]
+    print(f'{"formato":<19} {"confrontos":>10} {"gerar (ms)":>11}'
+          f' {"resultado (µs)":>15} {"ordenar (ms)":>13} {"refazer (ms)":>13}'
+          '  campeão')
+    for formato in args.formato:
+        inicio = time.perf_counter()
+        torneio = Torneio.criar(1, 'bench', formato, nomes, '01/02/2025')
+        gerar = time.perf_counter() - inicio
+
+        resultados, registrando = resolver(torneio, rng)
+        assert torneio.encerrado
+
+        inicio = time.perf_counter()
+        classificacao = torneio.classificacao.ordenada()
+        ordenar = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        refeito = Torneio.de_dict(torneio.como_dict())
+        refazer = time.perf_counter() - inicio
+        assert refeito.classificacao.ordenada() == classificacao
+
+        por_resultado = registrando / resultados
+        print(f'{formato:<19} {resultados:>10} {gerar * 1000:>11.1f}'
+              f' {por_resultado * 1e6:>15.1f} {ordenar * 1000:>13.2f}'
+              f' {refazer * 1000:>13.1f}  {torneio.campeao}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Utilitários compartilhados pelos benchmarks"""
+import os
+import sys
+import time
+
+from jinja2 import ChoiceLoader, DictLoader
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from armazenamento import Armazem  # noqa: E402
+
+# Templates mínimos usados apenas quando a pasta templates/ não está presente,
+# para que o benchmark meça leitura de dados + renderização de forma realista.
+TEMPLATES_MINIMOS = {
+    'index.html': (
+        '{% for nome, j in jogadores.items() %}'
+        '<tr><td>{{ nome }}</td><td>{{ j.rank }}</td><td>{{ j.saldo }}</td></tr>'
+        '{% endfor %}'
+    ),
+    'historico.html': (
+        '{% for p in partidas %}'
+        '<tr><td>{{ p.data }}</td><td>{{ p.jogador1 }}</td><td>{{ p.jogador2 }}</td>'
+        '<td>{{ p.vencedor }}</td><td>{{ p.placar }}</td><td>{{ p.tipo }}</td></tr>'
+        '{% endfor %}'
+    ),
+    'perfil_jogador.html': (
+        '{{ nome }}{% for p in partidas_jogador %}'
+        '<tr><td>{{ p.data }}</td><td>{{ p.oponente }}</td><td>{{ p.placar }}</td></tr>'
+        '{% endfor %}'
+    ),
+    'graficos.html': '{% for nome in jogadores %}{{ nome }}{% endfor %}',
+    'add_partida.html': '{% for nome in jogadores %}{{ nome }}{% endfor %}',
+    'editar_partida.html': '{{ partida }}',
+    'editar_jogador.html': '{{ nome }}',
+    'login.html': 'login',
+}
+
+
+def preparar_app(jogadores_file, historico_file):
+    """Aponta a aplicação para os arquivos gerados e retorna um test client"""
+    return usar_armazem(Armazem(jogadores_file, historico_file))
+
+
+def usar_armazem(armazem):
+    """Troca o armazenamento da aplicação e retorna um test client"""
+    main.armazem = armazem
+    main.ranking.invalidar()
+    main.dados_graficos.invalidar()
+    main.series_jogadores.invalidar()
+    main.paginas.invalidar()
+    # As rotas de leitura medem dados e renderização, não o cache de HTML
+    # (bench_paginas.py o liga explicitamente)
+    main.CACHE_PAGINAS = False
+    if not os.path.isdir(os.path.join(main.app.root_path, 'templates')):
+        main.app.jinja_loader = ChoiceLoader(
+            [main.app.jinja_loader, DictLoader(TEMPLATES_MINIMOS)]
+        )
+    main.app.config['TESTING'] = True
+    return main.app.test_client()
+
+
+def medir_rps(funcao, duracao=2.0):
+    """Executa `funcao` repetidamente por `duracao` segundos e retorna req/s"""
+    funcao()  # Aquecimento
+    n = 0
+    inicio = time.perf_counter()
+    while True:
+        funcao()
+        n += 1
+        decorrido = time.perf_counter() - inicio
+        if decorrido >= duracao:
+            return n / decorrido
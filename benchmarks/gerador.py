@@ -0,0 +1,102 @@
+"""Gerador de ligas sintéticas para os benchmarks
+
+Uso:
+    python benchmarks/gerador.py DIRETORIO --jogadores 50 --partidas 10000
+                                 [--dobro 0.15] [--placar-2-1 0.4]
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from armazenamento import salvar_dados  # noqa: E402
+
+RANKS = ['S', 'A', 'B', 'C', 'D']
+
+
+def gerar_liga(num_jogadores, num_partidas, seed=42, proporcao_dobro=0.15,
+               proporcao_2_1=0.4):
+    """Gera (jogadores, historico) com estatísticas coerentes com as partidas"""
+    rng = random.Random(seed)
+    nomes = [f'jogador {i:05d}' for i in range(num_jogadores)]
+    jogadores = {
+        nome: {
+            'vitorias': 0,
+            'derrotas': 0,
+            'saldo': 0,
+            'aproveitamento': 0,
+            'rank': rng.choice(RANKS),
+            'imagem': nome.replace(' ', '_') + '.png'
+        }
+        for nome in nomes
+    }
+    
+    partidas = []
+    inicio = datetime(2024, 1, 1, 19, 0)
+    for i in range(num_partidas):
+        jogador1, jogador2 = rng.sample(nomes, 2)
+        vencedor = jogador1 if rng.random() < 0.5 else jogador2
+        perdedor = jogador2 if vencedor == jogador1 else jogador1
+        dobro_nada = rng.random() < proporcao_dobro
+        valor = 20 if dobro_nada else 10
+        placar = '2-1' if rng.random() < proporcao_2_1 else '2-0'
+        
+        jogadores[vencedor]['vitorias'] += 1
+        jogadores[vencedor]['saldo'] += valor
+        jogadores[perdedor]['derrotas'] += 1
+        jogadores[perdedor]['saldo'] -= valor
+        
+        data = inicio + timedelta(minutes=15 * i)
+        partidas.append({
+            'id': i + 1,
+            'data': data.strftime('%d/%m/%Y %H:%M'),
+            'jogador1': jogador1,
+            'jogador2': jogador2,
+            'vencedor': vencedor,
+            'placar': placar,
+            'valor': valor,
+            'dobro_nada': dobro_nada,
+            'tipo': 'Dobro ou Nada' if dobro_nada else 'Normal'
+        })
+    
+    for dados in jogadores.values():
+        total_jogos = dados['vitorias'] + dados['derrotas']
+        if total_jogos > 0:
+            dados['aproveitamento'] = round((dados['vitorias'] / total_jogos) * 100, 1)
+    
+    historico = {
+        'partidas': partidas, 'ordem': 'cronologica', 'proximo_id': num_partidas + 1
+    }
+    return jogadores, historico
+
+
+def escrever_liga(diretorio, num_jogadores, num_partidas, seed=42, **proporcoes):
+    """Gera uma liga e grava jogadores.json / historico.json em `diretorio`"""
+    os.makedirs(diretorio, exist_ok=True)
+    jogadores, historico = gerar_liga(
+        num_jogadores, num_partidas, seed=seed, **proporcoes
+    )
+    jogadores_file = os.path.join(diretorio, 'jogadores.json')
+    historico_file = os.path.join(diretorio, 'historico.json')
+    salvar_dados(jogadores, jogadores_file)
+    salvar_dados(historico, historico_file)
+    return jogadores_file, historico_file
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('diretorio')
+    parser.add_argument('--jogadores', type=int, default=50)
+    parser.add_argument('--partidas', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dobro', type=float, default=0.15,
+                        help='Proporção de partidas Dobro ou Nada.')
+    parser.add_argument('--placar-2-1', type=float, default=0.4,
+                        help='Proporção de partidas decididas por 2-1.')
+    args = parser.parse_args()
+    arquivos = escrever_liga(args.diretorio, args.jogadores, args.partidas, args.seed,
+                             proporcao_dobro=args.dobro, proporcao_2_1=args.placar_2_1)
+    print(*arquivos, sep='\n')
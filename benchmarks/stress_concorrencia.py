@@ -0,0 +1,192 @@
+"""Teste de estresse: vários processos registrando, editando e excluindo partidas
+
+Uso:
+    python benchmarks/stress_concorrencia.py [--processos 8] [--operacoes 40]
+                                             [--modo json adiado log sqlite]
+
+Cada processo simula um worker do gunicorn: tem o seu próprio armazenamento
+sobre os mesmos arquivos e envia POSTs para /add, /editar_partida e
+/excluir_partida. Todos os processos jogam contra o mesmo jogador ('casa'),
+cujas estatísticas são alteradas concorrentemente. Ao final verifica-se que
+nenhuma alteração se perdeu:
+
+- cada processo tem exatamente as partidas que registrou e não excluiu;
+- as partidas editadas têm o novo vencedor;
+- os ids são únicos e crescentes;
+- as estatísticas dos jogadores batem com o recálculo a partir do histórico.
+
+O modo "adiado" é o json com gravação adiada (`ArmazemAdiado`, 20 ms): cada
+worker retém a trava até gravar as suas pendências.
+
+Com --sem-trava a trava entre processos é desativada (apenas a trava entre
+threads continua), para reproduzir as atualizações perdidas.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import comum
+from armazenamento import ArmazemAdiado, criar_armazem
+from estatisticas import novo_jogador
+
+CASA = 'casa'
+
+
+def jogador_do_processo(indice):
+    return f'worker {indice:02d}'
+
+
+def abrir(modo, diretorio):
+    opcoes = {'compactar_a_cada': 25} if modo == 'log' else {}
+    if modo == 'adiado':
+        modo, opcoes = 'json', {'intervalo_ms': 20}
+    return criar_armazem(
+        modo,
+        jogadores_file=os.path.join(diretorio, 'jogadores.json'),
+        historico_file=os.path.join(diretorio, 'historico.json'),
+        log_file=os.path.join(diretorio, 'historico.jsonl'),
+        sqlite_file=os.path.join(diretorio, 'sinuca.db'),
+        **opcoes
+    )
+
+
+def formulario(vencedor):
+    """Formulário de /add e /editar_partida para uma vitória 2-0"""
+    lado = 'jogador1' if vencedor == 1 else 'jogador2'
+    return {'vencedor_partida1': lado, 'vencedor_partida2': lado}
+
+
+def trabalhar(modo, diretorio, indice, operacoes, sem_trava, inicio, fila):
+    """Executa `operacoes` rodadas de add (+ edit / delete) e reporta o esperado"""
+    try:
+        fila.put(_trabalhar(modo, diretorio, indice, operacoes, sem_trava, inicio))
+    except Exception as erro:
+        fila.put((jogador_do_processo(indice), None, repr(erro)))
+
+
+def _trabalhar(modo, diretorio, indice, operacoes, sem_trava, inicio):
+    if sem_trava:
+        import armazenamento
+        armazenamento.fcntl = None
+    comum.main.armazem = abrir(modo, diretorio)
+    comum.main.app.config['TESTING'] = True
+    client = comum.main.app.test_client()
+    with client.session_transaction() as sessao:
+        sessao['user'] = comum.main.ADMIN_USER
+    nome = jogador_do_processo(indice)
+    armazem = comum.main.armazem
+
+    inicio.wait()
+    registradas = excluidas = 0
+    editadas = set()
+    for rodada in range(operacoes):
+        dados = {'jogador1': nome, 'jogador2': CASA, **formulario(1)}
+        resposta = client.post('/add', data=dados)
+        assert resposta.status_code == 302, resposta.status_code
+        registradas += 1
+
+        minhas = [
+            p['id'] for p in armazem.iterar_partidas(jogador=nome)
+            if p['id'] not in editadas
+        ]
+        if rodada % 3 == 1 and minhas:
+            # Edita a mais recente: agora a casa venceu
+            id_partida = minhas[0]
+            dados = {'jogador1': nome, 'jogador2': CASA, **formulario(2)}
+            resposta = client.post(f'/editar_partida/{id_partida}', data=dados)
+            assert resposta.status_code == 302, resposta.status_code
+            editadas.add(id_partida)
+        elif rodada % 3 == 2 and len(minhas) > 1:
+            # Exclui a mais antiga ainda não editada
+            resposta = client.post(f'/excluir_partida/{minhas[-1]}')
+            assert resposta.get_json()['success'], resposta.get_json()
+            excluidas += 1
+    if isinstance(armazem, ArmazemAdiado):
+        # O processo termina com os._exit, sem passar pelo atexit
+        armazem.descarregar()
+    return nome, registradas - excluidas, sorted(editadas)
+
+
+def verificar(modo, diretorio, resultados):
+    """Lista as atualizações perdidas ou inconsistências encontradas"""
+    armazem = abrir(modo, diretorio)
+    partidas = armazem.partidas()
+    erros = []
+    ids = [p['id'] for p in partidas]
+    if ids != sorted(set(ids)):
+        erros.append('ids repetidos ou fora de ordem')
+    for nome, esperadas, editadas in resultados:
+        if esperadas is None:
+            erros.append(f'{nome}: falhou com {editadas}')
+            continue
+        minhas = {
+            p['id']: p for p in partidas if nome in (p['jogador1'], p['jogador2'])
+        }
+        if len(minhas) != esperadas:
+            erros.append(f'{nome}: {len(minhas)} partidas, esperadas {esperadas}')
+        for id_partida in editadas:
+            if id_partida not in minhas or minhas[id_partida]['vencedor'] != CASA:
+                erros.append(f'{nome}: edição da partida {id_partida} perdida')
+    diferencas = armazem.recalcular_estatisticas(gravar=False)
+    for nome, campo, armazenado, recalculado in diferencas:
+        erros.append(f'{nome}: {campo} = {armazenado}, recalculado {recalculado}')
+    return len(partidas), erros
+
+
+def estressar(modo, processos, operacoes, sem_trava):
+    with tempfile.TemporaryDirectory() as diretorio:
+        nomes = [CASA] + [jogador_do_processo(i) for i in range(processos)]
+        abrir(modo, diretorio).substituir({nome: novo_jogador() for nome in nomes}, [])
+
+        contexto = multiprocessing.get_context('fork')
+        inicio = contexto.Event()
+        fila = contexto.Queue()
+        workers = [
+            contexto.Process(
+                target=trabalhar,
+                args=(modo, diretorio, i, operacoes, sem_trava, inicio, fila)
+            )
+            for i in range(processos)
+        ]
+        for worker in workers:
+            worker.start()
+        comeco = time.perf_counter()
+        inicio.set()
+        resultados = [fila.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        duracao = time.perf_counter() - comeco
+        total, erros = verificar(modo, diretorio, resultados)
+        return total, erros, duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processos', type=int, default=8)
+    parser.add_argument('--operacoes', type=int, default=40)
+    parser.add_argument('--modo', nargs='+',
+                        default=['json', 'adiado', 'log', 'sqlite'],
+                        choices=['json', 'adiado', 'log', 'sqlite'])
+    parser.add_argument('--sem-trava', action='store_true',
+                        help='Desativa a trava entre processos.')
+    args = parser.parse_args()
+
+    falhou = False
+    for modo in args.modo:
+        total, erros, duracao = estressar(
+            modo, args.processos, args.operacoes, args.sem_trava
+        )
+        situacao = 'OK' if not erros else f'{len(erros)} ERROS'
+        print(f'{modo:<7} {args.processos} processos, {total} partidas finais,'
+              f' {duracao:.1f}s: {situacao}')
+        for erro in erros[:10]:
+            print(f'    {erro}')
+        falhou = falhou or bool(erros)
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Teste de queda com gravação adiada: mata o processo no meio de uma rajada
+
+Uso:
+    python benchmarks/stress_gravacao_adiada.py [--rodadas 10] [--intervalo-ms 50]
+
+Cada rodada inicia main.py num processo filho (SINUCA_GRAVACAO_ADIADA) sobre
+uma liga pequena, registra partidas sem parar e o interrompe depois de um
+tempo aleatório:
+
+- SIGKILL (queda): os dois arquivos precisam ser JSON válidos, o histórico
+  precisa ser um prefixo das partidas registradas (ids únicos e crescentes,
+  cada partida igual à enviada) e, após a reabertura (`recuperar`), as
+  estatísticas precisam bater com o recálculo a partir do histórico. As
+  partidas perdidas (ainda pendentes na memória) são contadas;
+- SIGTERM (encerramento): além do acima, nenhuma partida confirmada ao
+  processo pai pode ter sido perdida, inclusive com
+  SINUCA_GRAVACAO_ADIADA=encerramento.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from armazenamento import ArmazemAdiado, carregar_dados  # noqa: E402
+from gerador import escrever_liga  # noqa: E402
+from modelo import Partida  # noqa: E402
+
+JOGADORES = 20
+
+
+def partida_enviada(numero):
+    """Partida de número `numero` da rajada (a mesma no filho e na verificação)"""
+    rng = random.Random(numero)
+    jogador1, jogador2 = rng.sample([f'jogador {i:05d}' for i in range(JOGADORES)], 2)
+    data = f'01/02/2025 {numero // 60 % 24:02d}:{numero % 60:02d}'
+    return Partida.com_vencedor(
+        data, jogador1, jogador2, rng.choice((jogador1, jogador2)),
+        rng.choice(('2-0', '2-1')), rng.random() < 0.15
+    ).como_dict()
+
+
+def filho():
+    """Registra partidas pelo armazenamento de main.py e confirma cada id na saída"""
+    sys.path.insert(0, RAIZ)
+    import main
+    numero = 0
+    while True:
+        id_partida = main.armazem.registrar_partida(partida_enviada(numero))
+        print(id_partida, numero, flush=True)
+        numero += 1
+
+
+def rodada(diretorio, sinal, adiada, espera):
+    """Executa uma rodada; retorna (confirmadas, confirmadas perdidas, erros)"""
+    escrever_liga(diretorio, JOGADORES, 200)
+    processo = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--filho'], cwd=diretorio,
+        env={
+            **os.environ,
+            'SINUCA_ARMAZENAMENTO': 'json',
+            'SINUCA_GRAVACAO_ADIADA': adiada,
+        },
+        stdout=subprocess.PIPE, text=True
+    )
+    confirmadas = []
+
+    def ler_confirmacoes():
+        for linha in processo.stdout:
+            if linha.endswith('\n'):  # A última linha pode ter sido cortada
+                confirmadas.append(int(linha.split()[0]))
+
+    leitor = threading.Thread(target=ler_confirmacoes)
+    leitor.start()
+    time.sleep(espera)
+    processo.send_signal(sinal)
+    processo.wait()
+    leitor.join()
+
+    erros = []
+    jogadores_file = os.path.join(diretorio, 'jogadores.json')
+    historico_file = os.path.join(diretorio, 'historico.json')
+    for arquivo in (jogadores_file, historico_file):
+        try:
+            with open(arquivo, encoding='utf-8') as f:
+                json.load(f)
+        except ValueError as erro:
+            erros.append(f'{os.path.basename(arquivo)} corrompido: {erro}')
+    if erros:
+        return len(confirmadas), 0, erros
+
+    partidas = carregar_dados(historico_file)['partidas']
+    novas = [p for p in partidas if p['id'] > 200]
+    ids = [p['id'] for p in partidas]
+    if ids != sorted(set(ids)):
+        erros.append('ids repetidos ou fora de ordem')
+    for posicao, partida in enumerate(novas):
+        esperada = partida_enviada(posicao)
+        if any(partida.get(campo) != valor for campo, valor in esperada.items()):
+            erros.append(f'partida {partida["id"]} diferente da {posicao}ª enviada')
+            break
+    perdidas = len(set(confirmadas) - set(ids))
+    if sinal == signal.SIGTERM and perdidas:
+        erros.append(f'{perdidas} partidas confirmadas perdidas no encerramento')
+
+    # Reabre (recupera)
+    armazem = ArmazemAdiado(jogadores_file, historico_file, intervalo_ms=None)
+    diferencas = armazem.recalcular_estatisticas(gravar=False)
+    for nome, campo, armazenado, recalculado in diferencas:
+        erros.append(f'{nome}: {campo} = {armazenado}, recalculado {recalculado}')
+    return len(confirmadas), perdidas, erros
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rodadas', type=int, default=10)
+    parser.add_argument('--intervalo-ms', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--filho', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.filho:
+        filho()
+        return
+
+    rng = random.Random(args.seed)
+    cenarios = [
+        ('SIGKILL', signal.SIGKILL, str(args.intervalo_ms)),
+        ('SIGTERM', signal.SIGTERM, str(args.intervalo_ms)),
+        ('SIGTERM', signal.SIGTERM, 'encerramento'),
+    ]
+    falhou = False
+    for nome_sinal, sinal, adiada in cenarios:
+        confirmadas_total = perdidas_total = 0
+        erros_cenario = []
+        for _ in range(args.rodadas):
+            with tempfile.TemporaryDirectory() as diretorio:
+                confirmadas, perdidas, erros = rodada(
+                    diretorio, sinal, adiada, rng.uniform(0.8, 2.0)
+                )
+            confirmadas_total += confirmadas
+            perdidas_total += perdidas
+            erros_cenario += erros
+        situacao = 'OK' if not erros_cenario else f'{len(erros_cenario)} ERROS'
+        print(f'{nome_sinal} adiada={adiada:<12} {args.rodadas} rodadas,'
+              f' {confirmadas_total} confirmadas,'
+              f' {perdidas_total} perdidas (pendentes na memória): {situacao}')
+        for erro in erros_cenario[:10]:
+            print(f'    {erro}')
+        falhou = falhou or bool(erros_cenario)
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == '__main__':
+    main()
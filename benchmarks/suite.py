@@ -0,0 +1,260 @@
+"""Suíte de benchmarks das rotas principais sobre ligas sintéticas
+
+Uso:
+    python benchmarks/suite.py [--partidas 1000 10000 100000 1000000]
+                               [--modo json log sqlite] [--jogadores 100]
+                               [--salvar base.json] [--comparar base.json]
+
+Para cada tamanho de histórico gera uma liga (ver gerador.py: ~15% de Dobro
+ou Nada, ~40% de partidas 2-1) e, para cada armazenamento, mede num processo
+próprio, pelo test client do Flask:
+
+- GET / (ranking), GET /historico e GET /perfil/<jogador mais ativo>;
+- POST /add, POST /editar_partida/<id> e POST /excluir_partida/<id>, em
+  partidas sorteadas do histórico (sempre as mesmas, pela seed).
+
+Reporta p50/p95 de cada rota (ms), a carga fria (primeiro GET /, que lê
+os dados do disco), a primeira requisição de cada leitura (agregados ainda
+não construídos, fora dos percentis) e o pico de memória do processo
+(ru_maxrss). Com --salvar os
+resultados são gravados em JSON; com --comparar, cada p50/p95 acima da
+tolerância (e pelo menos --minimo-ms pior) em relação ao arquivo de
+referência é listado como regressão e o script termina com código 1.
+
+Com 1 milhão de partidas no modo json cada gravação reescreve o histórico
+inteiro (segundos por requisição); use --amostras-escrita menor ou --modo
+log sqlite para uma rodada rápida.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from gerador import escrever_liga
+
+MODOS = ('json', 'log', 'sqlite')
+ROTAS = (
+    'home', 'historico', 'perfil_jogador',
+    'adicionar_partida', 'editar_partida', 'excluir_partida',
+)
+ROTAS_LEITURA = ROTAS[:3]
+
+
+def percentil(valores, fracao):
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * fracao), len(ordenados) - 1)]
+
+
+def preparar_dados(modo, origem, destino):
+    """Copia a liga gerada em `origem` para `destino` no formato de `modo`"""
+    from armazenamento import Armazem, converter, criar_armazem, migrar_para_log
+
+    arquivos = {
+        'jogadores_file': os.path.join(destino, 'jogadores.json'),
+        'historico_file': os.path.join(destino, 'historico.json'),
+        'log_file': os.path.join(destino, 'historico.jsonl'),
+        'sqlite_file': os.path.join(destino, 'sinuca.db'),
+    }
+    if modo == 'sqlite':
+        origem_json = Armazem(os.path.join(origem, 'jogadores.json'),
+                              os.path.join(origem, 'historico.json'))
+        converter(origem_json, criar_armazem('sqlite', **arquivos))
+    else:
+        for nome in ('jogadores.json', 'historico.json'):
+            shutil.copy(os.path.join(origem, nome), destino)
+        if modo == 'log':
+            migrar_para_log(arquivos['historico_file'], arquivos['log_file'])
+    return arquivos
+
+
+def medir_processo(modo, arquivos, amostras, amostras_escrita, seed):
+    """Executado no processo filho: latências por rota e pico de memória"""
+    import comum
+    from armazenamento import criar_armazem
+
+    opcoes = {'compactar_a_cada': comum.main.COMPACTAR_A_CADA} if modo == 'log' else {}
+    client = comum.usar_armazem(criar_armazem(modo, **arquivos, **opcoes))
+    with client.session_transaction() as sessao:
+        sessao['user'] = comum.main.ADMIN_USER
+    armazem = comum.main.armazem
+
+    inicio = time.perf_counter()
+    assert client.get('/').status_code == 200
+    carga_fria = time.perf_counter() - inicio
+
+    partidas = armazem.partidas()
+    contagem = {}
+    for partida in partidas:
+        for nome in (partida['jogador1'], partida['jogador2']):
+            contagem[nome] = contagem.get(nome, 0) + 1
+    mais_ativo = max(contagem, key=contagem.get)
+    rng = random.Random(seed)
+    sorteadas = rng.sample([p['id'] for p in partidas],
+                           min(2 * amostras_escrita, len(partidas)))
+    editar, excluir = sorteadas[:amostras_escrita], sorteadas[amostras_escrita:]
+    nomes = list(armazem.jogadores())
+
+    def formulario(jogador1, jogador2, lado):
+        return {'jogador1': jogador1, 'jogador2': jogador2,
+                'vencedor_partida1': lado, 'vencedor_partida2': lado}
+
+    def adicionar(_i):
+        jogador1, jogador2 = rng.sample(nomes, 2)
+        return client.post('/add', data=formulario(jogador1, jogador2, 'jogador1'))
+
+    def editar_partida(i):
+        partida = armazem.partida(editar[i])
+        lado = 'jogador2' if partida['vencedor'] == partida['jogador1'] else 'jogador1'
+        dados = formulario(partida['jogador1'], partida['jogador2'], lado)
+        return client.post(f'/editar_partida/{editar[i]}', data=dados)
+
+    def excluir_partida(i):
+        return client.post(f'/excluir_partida/{excluir[i]}')
+
+    rotas = {
+        'home': (amostras, lambda _i: client.get('/')),
+        'historico': (amostras, lambda _i: client.get('/historico')),
+        'perfil_jogador': (amostras, lambda _i: client.get(f'/perfil/{mais_ativo}')),
+        'adicionar_partida': (amostras_escrita, adicionar),
+        'editar_partida': (len(editar), editar_partida),
+        'excluir_partida': (len(excluir), excluir_partida),
+    }
+    resultados = {}
+    for rota, (quantidade, requisicao) in rotas.items():
+        tempos = []
+        # Nas leituras a primeira requisição (agregados e visões ainda frios)
+        # é reportada à parte
+        primeira = None if rota in ROTAS_LEITURA else 0
+        for i in range(quantidade + (primeira is None)):
+            inicio = time.perf_counter()
+            resposta = requisicao(i)
+            decorrido = time.perf_counter() - inicio
+            assert resposta.status_code in (200, 302), (rota, resposta.status_code)
+            if primeira is None:
+                primeira = decorrido
+            else:
+                tempos.append(decorrido)
+        if tempos:
+            resultados[rota] = {
+                'p50_ms': percentil(tempos, 0.50) * 1000,
+                'p95_ms': percentil(tempos, 0.95) * 1000,
+                'primeira_ms': primeira * 1000 if rota in ROTAS_LEITURA else None,
+                'n': len(tempos),
+            }
+    return {
+        'rotas': resultados,
+        'carga_fria_ms': carga_fria * 1000,
+        'pico_memoria_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def executar(modo, num_partidas, base, args):
+    """Prepara os dados e mede `modo` num processo filho; retorna o resultado"""
+    with tempfile.TemporaryDirectory() as destino:
+        arquivos = preparar_dados(modo, base, destino)
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--filho', json.dumps({
+                'modo': modo, 'arquivos': arquivos, 'amostras': args.amostras,
+                'amostras_escrita': args.amostras_escrita, 'seed': args.seed,
+            })],
+            capture_output=True, text=True
+        )
+    if saida.returncode != 0:
+        raise RuntimeError(
+            f'{modo} com {num_partidas} partidas falhou:\n{saida.stderr}'
+        )
+    return json.loads(saida.stdout.splitlines()[-1])
+
+
+def regressoes(atuais, referencia, tolerancia, minimo_ms):
+    """Lista as latências acima de (1 + tolerancia) x a referência
+
+    Diferenças menores que `minimo_ms` são ignoradas (ruído em rotas rápidas).
+    """
+    encontradas = []
+    for chave, resultado in atuais.items():
+        anterior = referencia.get(chave)
+        if anterior is None:
+            continue
+        for rota, tempos in resultado['rotas'].items():
+            for campo in ('p50_ms', 'p95_ms'):
+                antes = anterior['rotas'].get(rota, {}).get(campo)
+                atual = tempos[campo]
+                if (antes and atual > antes * (1 + tolerancia)
+                        and atual - antes >= minimo_ms):
+                    encontradas.append(
+                        f'{chave} {rota} {campo}: {antes:.2f} -> {atual:.2f}'
+                    )
+    return encontradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--partidas', type=int, nargs='+',
+                        default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--jogadores', type=int, default=100)
+    parser.add_argument('--modo', nargs='+', default=list(MODOS), choices=MODOS)
+    parser.add_argument('--amostras', type=int, default=100,
+                        help='Requisições por rota de leitura.')
+    parser.add_argument('--amostras-escrita', type=int, default=20,
+                        help='Requisições por rota de escrita.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--salvar', help='Grava os resultados neste arquivo JSON.')
+    parser.add_argument('--comparar', help='Arquivo JSON de referência (de --salvar).')
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help='Piora aceita na comparação (0.25 = 25%%).')
+    parser.add_argument('--minimo-ms', type=float, default=1.0,
+                        help='Piora mínima (ms) para contar como regressão.')
+    parser.add_argument('--filho', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        opcoes = json.loads(args.filho)
+        print(json.dumps(medir_processo(**opcoes)))
+        return
+
+    resultados = {}
+    print(f'{"modo":<7} {"partidas":>9} {"rota":<18} {"p50 (ms)":>9}'
+          f' {"p95 (ms)":>9} {"1ª (ms)":>9}')
+    for num_partidas in args.partidas:
+        with tempfile.TemporaryDirectory() as base:
+            escrever_liga(base, args.jogadores, num_partidas, seed=args.seed)
+            for modo in args.modo:
+                resultado = executar(modo, num_partidas, base, args)
+                resultados[f'{modo}/{num_partidas}'] = resultado
+                for rota in ROTAS:
+                    tempos = resultado['rotas'].get(rota)
+                    if tempos:
+                        primeira = tempos['primeira_ms']
+                        primeira = '' if primeira is None else f'{primeira:.2f}'
+                        print(f'{modo:<7} {num_partidas:>9} {rota:<18}'
+                              f' {tempos["p50_ms"]:>9.2f} {tempos["p95_ms"]:>9.2f}'
+                              f' {primeira:>9}')
+                print(f'{modo:<7} {num_partidas:>9}'
+                      f' carga fria {resultado["carga_fria_ms"]:.0f} ms,'
+                      f' pico de memória {resultado["pico_memoria_mib"]:.0f} MiB')
+
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as f:
+            json.dump({'jogadores': args.jogadores, 'resultados': resultados}, f,
+                      indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            referencia = json.load(f)['resultados']
+        encontradas = regressoes(resultados, referencia, args.tolerancia,
+                                 args.minimo_ms)
+        for regressao in encontradas:
+            print(f'REGRESSÃO {regressao}')
+        if encontradas:
+            sys.exit(1)
+        print('Sem regressões em relação a', args.comparar)
+
+
+if __name__ == '__main__':
+    main()
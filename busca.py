@@ -0,0 +1,95 @@
+"""Busca de jogadores por prefixo, sem diferenciar acentos nem maiúsculas
+
+O índice guarda os nomes normalizados ('Ana Carlão' -> 'ana carlao') em
+listas ordenadas: uma com o nome inteiro e outra com o nome a partir de cada
+palavra seguinte ('carlao'), de modo que "ana carl" e "carl" encontram o
+mesmo jogador. Uma consulta é uma busca binária mais a leitura dos `limite`
+primeiros resultados, independente do número de jogadores.
+
+`BuscaJogadores` reconstrói o índice apenas quando o conjunto de nomes muda
+(jogadores criados, renomeados ou removidos), não a cada partida registrada.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+
+# Acentos combinantes (U+0300..U+036F) que sobram da decomposição NFKD
+_ACENTOS = re.compile('[\u0300-\u036f]+')
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples: ' Ana  Carlão' -> 'ana carlao'"""
+    if texto.isascii():
+        return ' '.join(texto.lower().split())
+    sem_acentos = _ACENTOS.sub('', unicodedata.normalize('NFKD', texto))
+    return ' '.join(sem_acentos.casefold().split())
+
+
+class IndiceJogadores:
+    """Nomes ordenados por chave normalizada, para busca por prefixo"""
+
+    def __init__(self, nomes):
+        self.nomes = frozenset(nomes)
+        inicios = []
+        palavras = []
+        for nome in self.nomes:
+            chave = normalizar(nome)
+            inicios.append((chave, nome))
+            posicao = chave.find(' ')
+            while posicao != -1:
+                palavras.append((chave[posicao + 1:], nome))
+                posicao = chave.find(' ', posicao + 1)
+        # Listas paralelas: a busca binária compara só as chaves (str)
+        self._listas = []
+        for pares in (inicios, palavras):
+            pares.sort()
+            chaves = [chave for chave, _ in pares]
+            self._listas.append((chaves, [nome for _, nome in pares]))
+
+    def buscar(self, consulta, limite=10):
+        """Até `limite` nomes: primeiro os que começam pela consulta, depois
+        os que têm uma palavra seguinte começando por ela (ordem alfabética)"""
+        prefixo = normalizar(consulta)
+        encontrados = []
+        for chaves, nomes in self._listas:
+            posicao = bisect.bisect_left(chaves, prefixo)
+            while posicao < len(chaves) and len(encontrados) < limite:
+                if not chaves[posicao].startswith(prefixo):
+                    break
+                if nomes[posicao] not in encontrados:
+                    encontrados.append(nomes[posicao])
+                posicao += 1
+        return encontrados
+
+
+class BuscaJogadores:
+    """`IndiceJogadores` sobre `jogadores()`, reconstruído só quando os nomes mudam
+
+    A cada nova `versao()` do armazenamento os nomes atuais são comparados
+    com os do índice (uma comparação de conjuntos, sem normalizar nada); as
+    consultas entre duas alterações não fazem nenhuma verificação extra.
+    """
+
+    def __init__(self, jogadores, versao):
+        self._jogadores = jogadores
+        self._versao = versao
+        self._versao_atual = None
+        self._indice = None
+        self._lock = threading.Lock()
+        self.reconstrucoes = 0
+
+    def obter(self):
+        versao = self._versao()
+        if versao != self._versao_atual:
+            with self._lock:
+                if versao != self._versao_atual:
+                    nomes = self._jogadores().keys()
+                    if self._indice is None or nomes != self._indice.nomes:
+                        self._indice = IndiceJogadores(nomes)
+                        self.reconstrucoes += 1
+                    self._versao_atual = versao
+        return self._indice
+
+    def buscar(self, consulta, limite=10):
+        return self.obter().buscar(consulta, limite)
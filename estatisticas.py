@@ -0,0 +1,463 @@
+"""Cálculo das estatísticas dos jogadores a partir das partidas"""
+import bisect
+from collections import deque
+from itertools import count
+from operator import itemgetter
+
+from modelo import PLACAR_2_1, Partida
+
+
+def calcular_rank(aproveitamento):
+    """Calcula o rank baseado no aproveitamento (usado apenas como sugestão)"""
+    if aproveitamento >= 85:
+        return 'S'
+    elif aproveitamento >= 70:
+        return 'A'
+    elif aproveitamento >= 55:
+        return 'B'
+    elif aproveitamento >= 40:
+        return 'C'
+    else:
+        return 'D'
+
+
+def data_ordenavel(data):
+    """Converte 'dd/mm/aaaa hh:mm' para 'aaaa-mm-dd hh:mm' sem usar strptime"""
+    if not data or len(data) < 10:
+        return None
+    return f'{data[6:10]}-{data[3:5]}-{data[0:2]}{data[10:]}'
+
+
+def data_da_partida(partida):
+    """Data ordenável da partida ('data_iso', ou calculada de 'data')"""
+    return partida.get('data_iso') or data_ordenavel(partida.get('data'))
+
+
+def periodos_da_partida(partida):
+    """Mês ('aaaa-mm') e ano ('aaaa') da partida; vazio se não tiver data"""
+    data = data_da_partida(partida)
+    return (data[:7], data[:4]) if data else ()
+
+
+def novo_jogador():
+    return {
+        'vitorias': 0,
+        'derrotas': 0,
+        'saldo': 0,
+        'aproveitamento': 0,
+        'rank': 'D'
+    }
+
+
+def atualizar_aproveitamento(dados):
+    total_jogos = dados['vitorias'] + dados['derrotas']
+    if total_jogos > 0:
+        dados['aproveitamento'] = round((dados['vitorias'] / total_jogos) * 100, 1)
+    else:
+        dados['aproveitamento'] = 0
+
+
+def aplicar_partida(jogadores, partida, sinal=1):
+    """Aplica (sinal=1) ou reverte (sinal=-1) o resultado de uma partida
+
+    Altera apenas os dois jogadores envolvidos, criando-os se necessário.
+    """
+    vencedor = partida['vencedor']
+    jogador1 = partida['jogador1']
+    perdedor = partida['jogador2'] if vencedor == jogador1 else jogador1
+    valor = partida['valor']
+
+    for nome in (vencedor, perdedor):
+        if nome not in jogadores:
+            jogadores[nome] = novo_jogador()
+
+    jogadores[vencedor]['vitorias'] += sinal
+    jogadores[vencedor]['saldo'] += sinal * valor
+    jogadores[perdedor]['derrotas'] += sinal
+    jogadores[perdedor]['saldo'] -= sinal * valor
+
+    atualizar_aproveitamento(jogadores[vencedor])
+    atualizar_aproveitamento(jogadores[perdedor])
+
+
+CAMPOS_DERIVADOS = ('vitorias', 'derrotas', 'saldo', 'aproveitamento')
+
+# Número de partidas consideradas na forma recente
+FORMA_RECENTE = 10
+
+
+def recalcular_jogadores(partidas, jogadores=None):
+    """Recalcula as estatísticas de todos os jogadores numa única passada
+
+    Percorre o histórico uma vez acumulando vitórias, derrotas e saldo. Os
+    campos não derivados das partidas (rank, imagem, ...) são preservados de
+    `jogadores`; jogadores sem partidas ficam zerados.
+    """
+    vitorias = {}
+    derrotas = {}
+    saldo = {}
+    vitorias_get = vitorias.get
+    derrotas_get = derrotas.get
+    saldo_get = saldo.get
+    for partida in partidas:
+        vencedor = partida['vencedor']
+        jogador1 = partida['jogador1']
+        perdedor = partida['jogador2'] if vencedor == jogador1 else jogador1
+        valor = partida['valor']
+        vitorias[vencedor] = vitorias_get(vencedor, 0) + 1
+        derrotas[perdedor] = derrotas_get(perdedor, 0) + 1
+        saldo[vencedor] = saldo_get(vencedor, 0) + valor
+        saldo[perdedor] = saldo_get(perdedor, 0) - valor
+
+    recalculados = {}
+    jogadores = jogadores or {}
+    nomes = list(jogadores) + [nome for nome in saldo if nome not in jogadores]
+    for nome in nomes:
+        dados = dict(jogadores[nome]) if nome in jogadores else novo_jogador()
+        dados['vitorias'] = vitorias_get(nome, 0)
+        dados['derrotas'] = derrotas_get(nome, 0)
+        dados['saldo'] = saldo_get(nome, 0)
+        atualizar_aproveitamento(dados)
+        recalculados[nome] = dados
+    return recalculados
+
+
+def diferencas_estatisticas(atuais, recalculados):
+    """Lista (nome, campo, armazenado, recalculado) para cada divergência"""
+    diferencas = []
+    for nome in list(atuais) + [nome for nome in recalculados if nome not in atuais]:
+        armazenado = atuais.get(nome, {})
+        esperado = recalculados.get(nome, {})
+        for campo in CAMPOS_DERIVADOS:
+            if armazenado.get(campo) != esperado.get(campo):
+                diferencas.append(
+                    (nome, campo, armazenado.get(campo), esperado.get(campo))
+                )
+    return diferencas
+
+
+class Confrontos:
+    """Confrontos diretos por jogador, mantidos incrementalmente
+
+    Para cada jogador guarda vitórias/derrotas contra cada oponente e a lista
+    das suas partidas em ordem cronológica, de modo que montar um perfil custa
+    O(partidas do jogador) em vez de O(histórico). As partidas são
+    identificadas pelo próprio objeto (dict) presente no histórico em memória;
+    cada uma é guardada também como `modelo.Partida`, compartilhada pelos dois
+    jogadores, para os laços do perfil.
+    """
+
+    def __init__(self):
+        self.placares = {}   # nome -> {oponente: [vitorias, derrotas]}
+        self._partidas = {}  # nome -> [(ordem, partida, compacta)] em ordem cronológica
+        self._ordem = {}     # id(partida) -> ordem
+        self._proxima = 0
+
+    @classmethod
+    def construir(cls, partidas):
+        """Reconstrói os agregados a partir do histórico completo
+
+        Como o histórico está em ordem cronológica, cada partida vai direto
+        para o fim das listas dos dois jogadores, sem a busca de `_incluir`.
+        """
+        confrontos = cls()
+        placares = confrontos.placares
+        listas = confrontos._partidas
+        ordens = confrontos._ordem
+        de_dict = Partida.de_dict
+        for ordem, partida in enumerate(partidas):
+            ordens[id(partida)] = ordem
+            jogador1, jogador2 = partida['jogador1'], partida['jogador2']
+            vencedor = partida['vencedor']
+            item = (ordem, partida, de_dict(partida))
+            for nome, oponente in ((jogador1, jogador2), (jogador2, jogador1)):
+                contra = placares.get(nome)
+                if contra is None:
+                    contra = placares[nome] = {}
+                    listas[nome] = []
+                placar = contra.get(oponente)
+                if placar is None:
+                    placar = contra[oponente] = [0, 0]
+                placar[0 if vencedor == nome else 1] += 1
+                listas[nome].append(item)
+        confrontos._proxima = len(ordens)
+        return confrontos
+
+    def _incluir(self, partida, ordem):
+        jogador1, jogador2 = partida['jogador1'], partida['jogador2']
+        item = (ordem, partida, Partida.de_dict(partida))
+        for nome, oponente in ((jogador1, jogador2), (jogador2, jogador1)):
+            placar = self.placares.setdefault(nome, {}).setdefault(oponente, [0, 0])
+            placar[0 if partida['vencedor'] == nome else 1] += 1
+            lista = self._partidas.setdefault(nome, [])
+            if not lista or lista[-1][0] < ordem:
+                lista.append(item)
+            else:
+                bisect.insort(lista, item, key=itemgetter(0))
+
+    def _excluir(self, partida, ordem):
+        jogador1, jogador2 = partida['jogador1'], partida['jogador2']
+        for nome, oponente in ((jogador1, jogador2), (jogador2, jogador1)):
+            placares = self.placares[nome]
+            placar = placares[oponente]
+            placar[0 if partida['vencedor'] == nome else 1] -= 1
+            if placar == [0, 0]:
+                del placares[oponente]
+            lista = self._partidas[nome]
+            del lista[bisect.bisect_left(lista, ordem, key=itemgetter(0))]
+
+    def adicionar(self, partida):
+        ordem = self._proxima
+        self._proxima += 1
+        self._ordem[id(partida)] = ordem
+        self._incluir(partida, ordem)
+
+    def remover(self, partida):
+        self._excluir(partida, self._ordem.pop(id(partida)))
+
+    def substituir(self, antiga, nova):
+        """Troca uma partida editada mantendo sua posição cronológica"""
+        ordem = self._ordem.pop(id(antiga))
+        self._excluir(antiga, ordem)
+        self._ordem[id(nova)] = ordem
+        self._incluir(nova, ordem)
+
+    def aplicar_evento(self, evento, antiga=None):
+        """Acompanha um evento de `armazenamento.aplicar_evento`"""
+        op = evento['op']
+        if op == 'add':
+            self.adicionar(evento['partida'])
+        elif op == 'edit':
+            self.substituir(antiga, evento['partida'])
+        elif op == 'delete':
+            self.remover(antiga)
+
+    def partidas_do_jogador(self, nome):
+        """Partidas do jogador em ordem cronológica"""
+        return [partida for _, partida, _ in self._partidas.get(nome, [])]
+
+    def compactas_do_jogador(self, nome):
+        """Partidas do jogador como `modelo.Partida`, em ordem cronológica"""
+        return [compacta for _, _, compacta in self._partidas.get(nome, [])]
+
+    def contra(self, nome):
+        """Vitórias, derrotas e total de `nome` contra cada oponente"""
+        return {
+            oponente: {
+                'vitorias': vitorias, 'derrotas': derrotas, 'total': vitorias + derrotas
+            }
+            for oponente, (vitorias, derrotas) in self.placares.get(nome, {}).items()
+        }
+
+    def divergencias(self, partidas):
+        """Compara com uma reconstrução completa e lista as diferenças"""
+        referencia = Confrontos.construir(partidas)
+        erros = []
+        for nome in sorted(set(self.placares) | set(referencia.placares)):
+            if self.contra(nome) != referencia.contra(nome):
+                erros.append(
+                    f'{nome}: confrontos {self.contra(nome)}'
+                    f' != {referencia.contra(nome)}'
+                )
+            atuais = [id(p) for p in self.partidas_do_jogador(nome)]
+            esperadas = [id(p) for p in referencia.partidas_do_jogador(nome)]
+            if atuais != esperadas:
+                erros.append(
+                    f'{nome}: {len(atuais)} partidas indexadas,'
+                    f' esperadas {len(esperadas)} em ordem'
+                )
+        return erros
+
+
+class RankingPeriodos:
+    """Vitórias, derrotas e saldo de cada jogador por mês e por ano
+
+    Mantido incrementalmente a cada partida registrada, editada ou excluída,
+    de modo que o ranking de um período é uma busca no dicionário (mais a
+    ordenação dos jogadores daquele período, guardada até ele mudar).
+    """
+
+    def __init__(self):
+        self.periodos = {}    # 'aaaa-mm' / 'aaaa' -> {nome: estatísticas}
+        self._ordenados = {}  # período -> classificação em cache
+
+    @classmethod
+    def construir(cls, partidas):
+        """Reconstrói os agregados a partir do histórico completo
+
+        Separa as partidas por período numa passada e soma cada período de
+        uma vez (`recalcular_jogadores`), sem recalcular o aproveitamento a
+        cada partida como `adicionar`.
+        """
+        por_periodo = {}
+        for partida in partidas:
+            for periodo in periodos_da_partida(partida):
+                lista = por_periodo.get(periodo)
+                if lista is None:
+                    lista = por_periodo[periodo] = []
+                lista.append(partida)
+        ranking = cls()
+        ranking.periodos = {
+            periodo: recalcular_jogadores(lista)
+            for periodo, lista in por_periodo.items()
+        }
+        return ranking
+
+    def adicionar(self, partida, sinal=1):
+        for periodo in periodos_da_partida(partida):
+            jogadores = self.periodos.setdefault(periodo, {})
+            aplicar_partida(jogadores, partida, sinal)
+            if sinal < 0:
+                for nome in (partida['jogador1'], partida['jogador2']):
+                    if jogadores[nome]['vitorias'] == jogadores[nome]['derrotas'] == 0:
+                        del jogadores[nome]
+                if not jogadores:
+                    del self.periodos[periodo]
+            self._ordenados.pop(periodo, None)
+
+    def remover(self, partida):
+        self.adicionar(partida, sinal=-1)
+
+    def aplicar_evento(self, evento, antiga=None):
+        """Acompanha um evento de `armazenamento.aplicar_evento`"""
+        op = evento['op']
+        if op in ('edit', 'delete'):
+            self.remover(antiga)
+        if op in ('add', 'edit'):
+            self.adicionar(evento['partida'])
+
+    def listar(self):
+        """Períodos com partidas, do mais recente para o mais antigo"""
+        return sorted(self.periodos, reverse=True)
+
+    def classificacao(self, periodo):
+        """Lista (nome, estatísticas) do período, por saldo e depois vitórias"""
+        if periodo not in self._ordenados:
+            self._ordenados[periodo] = sorted(
+                self.periodos.get(periodo, {}).items(),
+                key=lambda item: (item[1]['saldo'], item[1]['vitorias']),
+                reverse=True
+            )
+        return self._ordenados[periodo]
+
+
+class EstatisticasAvancadas:
+    """Sequências de vitórias/derrotas, placares, Dobro ou Nada e forma recente
+
+    Calculadas numa única passada pelo histórico e atualizadas a cada
+    partida nova. Edições e exclusões podem mudar sequências já encerradas,
+    então fazem o agregado ser reconstruído (ver `armazenamento.AGREGADOS`).
+    """
+
+    def __init__(self, forma=FORMA_RECENTE):
+        self.forma = forma
+        self.jogadores = {}  # nome -> contadores (ver `_novo`)
+
+    def _novo(self):
+        return {
+            'sequencia': 0,  # > 0: vitórias seguidas; < 0: derrotas seguidas
+            'maior_sequencia_vitorias': 0,
+            'maior_sequencia_derrotas': 0,
+            'vitorias_2_0': 0,
+            'vitorias_2_1': 0,
+            'derrotas_2_0': 0,
+            'derrotas_2_1': 0,
+            'dobro_nada_vitorias': 0,
+            'dobro_nada_derrotas': 0,
+            'ultimas': deque(maxlen=self.forma),  # True = vitória, mais recente no fim
+        }
+
+    @classmethod
+    def construir(cls, partidas):
+        """Calcula tudo a partir do histórico completo (ordem cronológica)"""
+        avancadas = cls()
+        for partida in partidas:
+            avancadas.adicionar(partida)
+        return avancadas
+
+    def adicionar(self, partida):
+        if not isinstance(partida, Partida):
+            partida = Partida.de_dict(partida)
+        placar = '2_1' if partida.resultado & PLACAR_2_1 else '2_0'
+        dobro_nada = partida.dobro_nada
+        for nome, venceu in ((partida.vencedor, True), (partida.perdedor, False)):
+            dados = self.jogadores.get(nome)
+            if dados is None:
+                dados = self.jogadores[nome] = self._novo()
+            sequencia = dados['sequencia']
+            if venceu:
+                sequencia = dados['sequencia'] = sequencia + 1 if sequencia > 0 else 1
+                if sequencia > dados['maior_sequencia_vitorias']:
+                    dados['maior_sequencia_vitorias'] = sequencia
+                dados['vitorias_' + placar] += 1
+            else:
+                sequencia = dados['sequencia'] = sequencia - 1 if sequencia < 0 else -1
+                if -sequencia > dados['maior_sequencia_derrotas']:
+                    dados['maior_sequencia_derrotas'] = -sequencia
+                dados['derrotas_' + placar] += 1
+            if dobro_nada:
+                dados['dobro_nada_vitorias' if venceu else 'dobro_nada_derrotas'] += 1
+            dados['ultimas'].append(venceu)
+
+    def aplicar_evento(self, evento, _antiga=None):
+        """Acompanha um evento de `armazenamento.aplicar_evento`
+
+        Retorna False (reconstruir) para edições e exclusões.
+        """
+        if evento['op'] == 'add':
+            self.adicionar(evento['partida'])
+        elif evento['op'] in ('edit', 'delete'):
+            return False
+        return True
+
+    def do_jogador(self, nome):
+        """Estatísticas avançadas de `nome` (zeradas se não tiver partidas)"""
+        dados = self.jogadores.get(nome) or self._novo()
+        ultimas = list(dados['ultimas'])
+        vitorias_forma = sum(ultimas)
+        resultado = {
+            campo: valor for campo, valor in dados.items()
+            if campo not in ('sequencia', 'ultimas')
+        }
+        sequencia = dados['sequencia']
+        tipo = 'vitorias' if sequencia > 0 else 'derrotas' if sequencia < 0 else None
+        resultado['sequencia_atual'] = {'tipo': tipo, 'tamanho': abs(sequencia)}
+        # Mais recente primeiro
+        resultado['forma'] = ['V' if venceu else 'D' for venceu in reversed(ultimas)]
+        resultado['forma_aproveitamento'] = (
+            round(vitorias_forma * 100 / len(ultimas), 1) if ultimas else 0
+        )
+        return resultado
+
+
+class VersoesJogadores:
+    """Contador de alterações nas partidas de cada jogador (cache das páginas de perfil)
+
+    Cada construção começa uma geração nova, então uma reconstrução (ex.:
+    histórico alterado por outro worker) invalida todas as versões anteriores
+    sem precisar percorrer as partidas.
+    """
+
+    _geracoes = count(1)
+
+    def __init__(self):
+        self.geracao = next(VersoesJogadores._geracoes)
+        self.versoes = {}
+
+    @classmethod
+    def construir(cls, _partidas):
+        return cls()
+
+    def _alterar(self, partida):
+        for nome in (partida['jogador1'], partida['jogador2']):
+            self.versoes[nome] = self.versoes.get(nome, 0) + 1
+
+    def aplicar_evento(self, evento, antiga=None):
+        """Acompanha um evento de `armazenamento.aplicar_evento`"""
+        if antiga is not None:
+            self._alterar(antiga)
+        if evento['op'] in ('add', 'edit'):
+            self._alterar(evento['partida'])
+
+    def do_jogador(self, nome):
+        return (self.geracao, self.versoes.get(nome, 0))
@@ -0,0 +1,128 @@
+"""HTML renderizado em cache e páginas públicas pré-renderizadas em disco
+
+`CacheFragmentos` guarda o resultado de uma renderização (ranking, página
+do histórico, perfil de um jogador) junto com a versão dos dados usada; a
+mesma chave só é renderizada de novo quando a versão muda. As rotas usam a
+versão do armazenamento (muda a cada alteração) e, nos perfis, a versão das
+partidas daquele jogador (`Armazem.versao_jogador`), de modo que registrar
+uma partida não invalida o perfil de quem não jogou.
+
+`PaginasEstaticas` grava páginas públicas em uma pasta (`index.html`,
+`historico/index.html`, `perfil/<nome>/index.html`) para que o proxy reverso
+as sirva sem passar pelo Flask; só as páginas cuja versão mudou são
+regravadas.
+"""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import suppress
+
+
+class CacheFragmentos:
+    """HTML por chave, reaproveitado enquanto a versão da chave não mudar
+
+    Guarda no máximo `maximo` entradas, descartando as usadas há mais tempo
+    (o histórico tem uma chave por combinação de filtros).
+    """
+
+    def __init__(self, maximo=1000):
+        self.maximo = maximo
+        self._itens = OrderedDict()  # chave -> (versão, html)
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave, versao, renderizar):
+        """HTML em cache para (chave, versão) ou o resultado de `renderizar()`
+
+        A versão deve ser lida antes de renderizar: se os dados mudarem no
+        meio, o HTML (mais novo) fica com a versão antiga e é refeito na
+        próxima requisição, nunca o contrário.
+        """
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] == versao:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[1]
+        html = renderizar()
+        with self._lock:
+            self.faltas += 1
+            self._itens[chave] = (versao, html)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+        return html
+
+    def invalidar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+def arquivo_da_url(url):
+    """Caminho relativo do arquivo de uma URL ('/perfil/ana' -> 'perfil/ana/index.html')
+
+    Retorna None para URLs que não podem virar um caminho seguro.
+    """
+    partes = [parte for parte in url.split('/') if parte]
+    if any(parte in ('.', '..') or '\0' in parte or '\\' in parte for parte in partes):
+        return None
+    return os.path.join(*partes, 'index.html')
+
+
+class PaginasEstaticas:
+    """Páginas gravadas em `pasta`, regravadas apenas quando a versão muda"""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self._versoes = {}  # url -> versão gravada
+        self._lock = threading.Lock()
+
+    def publicar(self, paginas):
+        """Grava as páginas {url: (versão, gerar)} que mudaram e remove as ausentes
+
+        `gerar()` retorna o conteúdo (bytes) ou None se a página não existe
+        mais. Retorna o número de arquivos gravados.
+        """
+        gravadas = 0
+        with self._lock:
+            for url, (versao, gerar) in paginas.items():
+                if self._versoes.get(url) == versao:
+                    continue
+                relativo = arquivo_da_url(url)
+                if relativo is None:
+                    continue
+                conteudo = gerar()
+                if conteudo is None:
+                    self._remover(url)
+                    continue
+                self._gravar(relativo, conteudo)
+                self._versoes[url] = versao
+                gravadas += 1
+            for url in [url for url in self._versoes if url not in paginas]:
+                self._remover(url)
+        return gravadas
+
+    def _gravar(self, relativo, conteudo):
+        destino = os.path.join(self.pasta, relativo)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # Arquivo temporário + os.replace: o proxy nunca lê uma página pela metade
+        fd, temporario = tempfile.mkstemp(
+            dir=os.path.dirname(destino), prefix='.pagina', suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(conteudo)
+            os.chmod(temporario, 0o644)
+            os.replace(temporario, destino)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+
+    def _remover(self, url):
+        self._versoes.pop(url, None)
+        relativo = arquivo_da_url(url)
+        if relativo is not None:
+            with suppress(FileNotFoundError):
+                os.unlink(os.path.join(self.pasta, relativo))
@@ -0,0 +1,157 @@
+"""Importação e exportação de partidas em CSV ou JSON Lines
+
+Colunas (ou chaves, em JSON Lines) aceitas na importação:
+
+- data (dd/mm/aaaa hh:mm, opcional), jogador1, jogador2 e dobro_nada;
+- o resultado de cada partida da MD3, como no formulário de /add:
+  vencedor_partida1, vencedor_partida2 e vencedor_partida3, com 'jogador1',
+  'jogador2' (ou o nome do jogador) e 'nao_jogada' (ou vazio) na terceira;
+- ou, no formato da exportação, vencedor e placar ('2-0' ou '2-1').
+
+A exportação grava as colunas de `CAMPOS_EXPORTACAO`, uma partida por vez,
+e pode ser importada de volta.
+"""
+import csv
+import json
+from datetime import datetime
+
+from modelo import PLACARES, Partida
+
+CAMPOS_EXPORTACAO = (
+    'id', 'data', 'jogador1', 'jogador2', 'vencedor', 'placar', 'valor', 'dobro_nada',
+    'tipo'
+)
+FORMATOS = ('csv', 'jsonl')
+VERDADEIRO = {'1', 'sim', 's', 'true', 'verdadeiro', 'x'}
+
+
+def formato_do_arquivo(nome, formato=None):
+    """Formato explícito ou deduzido da extensão (.jsonl/.ndjson, senão CSV)"""
+    if formato:
+        return formato
+    return 'jsonl' if nome.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def ler_linhas(arquivo, formato):
+    """Gera (número da linha, dict) de um arquivo CSV (com cabeçalho) ou JSONL"""
+    if formato == 'csv':
+        leitor = csv.DictReader(arquivo)
+        for registro in leitor:
+            yield leitor.line_num, registro
+        return
+    for numero, linha in enumerate(arquivo, start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError as erro:
+            yield numero, ValueError(f'JSON inválido: {erro}')
+            continue
+        if not isinstance(registro, dict):
+            registro = ValueError('Esperado um objeto JSON')
+        yield numero, registro
+
+
+def _texto(registro, campo):
+    valor = registro.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+def _lado(valor, jogador1, jogador2, pode_faltar=False):
+    """Aceita 'jogador1'/'jogador2' ou o nome de um dos jogadores"""
+    if valor in ('jogador1', 'jogador2') or (pode_faltar and valor == 'nao_jogada'):
+        return valor
+    if valor == jogador1:
+        return 'jogador1'
+    if valor == jogador2:
+        return 'jogador2'
+    raise ValueError(f"Vencedor inválido: '{valor}'")
+
+
+def validar_registro(registro, jogadores, criar_jogadores=False):
+    """Converte um registro importado em partida, com as regras de /add
+
+    Lança ValueError com a descrição do problema.
+    """
+    jogador1 = _texto(registro, 'jogador1')
+    jogador2 = _texto(registro, 'jogador2')
+
+    data = _texto(registro, 'data')
+    if data:
+        try:
+            datetime.strptime(data, '%d/%m/%Y %H:%M')
+        except ValueError:
+            mensagem = f"Data inválida: '{data}' (use dd/mm/aaaa hh:mm)"
+            raise ValueError(mensagem) from None
+    else:
+        data = datetime.now().strftime('%d/%m/%Y %H:%M')
+
+    dobro_nada = registro.get('dobro_nada')
+    if not isinstance(dobro_nada, bool):
+        dobro_nada = _texto(registro, 'dobro_nada').lower() in VERDADEIRO
+
+    if _texto(registro, 'vencedor_partida1'):
+        lados = (
+            _lado(_texto(registro, 'vencedor_partida1'), jogador1, jogador2),
+            _lado(_texto(registro, 'vencedor_partida2'), jogador1, jogador2),
+            _lado(
+                _texto(registro, 'vencedor_partida3') or 'nao_jogada',
+                jogador1, jogador2, pode_faltar=True
+            )
+        )
+    else:
+        # Formato da exportação: vencedor e placar viram os lados da MD3
+        vencedor = _texto(registro, 'vencedor')
+        placar = _texto(registro, 'placar')
+        if vencedor not in (jogador1, jogador2):
+            raise ValueError(f"Vencedor '{vencedor}' não é um dos jogadores")
+        if placar not in PLACARES:
+            raise ValueError('Placar inválido para MD3!')
+        lado = 'jogador1' if vencedor == jogador1 else 'jogador2'
+        outro = 'jogador2' if lado == 'jogador1' else 'jogador1'
+        lados = (lado, lado, 'nao_jogada') if placar == '2-0' else (outro, lado, lado)
+
+    # Mesmas regras de /add (jogadores preenchidos e diferentes, placar da
+    # MD3); o ValueError vira o erro da linha em `importar`
+    partida = Partida.do_md3(data, jogador1, jogador2, *lados, dobro_nada)
+
+    if not criar_jogadores:
+        for nome in (jogador1, jogador2):
+            if nome not in jogadores:
+                raise ValueError(f"Jogador desconhecido: '{nome}'")
+
+    return partida.como_dict()
+
+
+def importar(arquivo, formato, jogadores, criar_jogadores=False):
+    """Valida todas as linhas; retorna (partidas válidas, [(linha, erro)])"""
+    partidas = []
+    erros = []
+    for numero, registro in ler_linhas(arquivo, formato):
+        try:
+            if isinstance(registro, Exception):
+                raise registro
+            partidas.append(validar_registro(registro, jogadores, criar_jogadores))
+        except ValueError as erro:
+            erros.append((numero, str(erro)))
+    return partidas, erros
+
+
+def exportar(partidas, arquivo, formato):
+    """Grava `partidas` (qualquer iterável) uma a uma; retorna quantas"""
+    total = 0
+    if formato == 'csv':
+        escritor = csv.DictWriter(
+            arquivo, fieldnames=CAMPOS_EXPORTACAO, extrasaction='ignore'
+        )
+        escritor.writeheader()
+        for partida in partidas:
+            dobro_nada = int(bool(partida.get('dobro_nada')))
+            escritor.writerow({**partida, 'dobro_nada': dobro_nada})
+            total += 1
+    else:
+        for partida in partidas:
+            registro = {campo: partida.get(campo) for campo in CAMPOS_EXPORTACAO}
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            total += 1
+    return total
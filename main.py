@@ -1,9 +1,42 @@
 
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+import gc
+import hmac
 import json
 import os
+import re
+import signal
+import sys
+import threading
+import time
 from datetime import datetime
-import hashlib
+
+import click
+from flask import (
+    Flask,
+    Response,
+    flash,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    session,
+    stream_with_context,
+    url_for,
+)
+from werkzeug.http import is_resource_modified
+
+import serializacao
+from armazenamento import ArmazemLog, converter, criar_armazem, migrar_para_log
+from busca import BuscaJogadores
+from estatisticas import CAMPOS_DERIVADOS
+from fragmentos import CacheFragmentos, PaginasEstaticas
+from importacao import FORMATOS, exportar, formato_do_arquivo, importar
+from metricas import instrumentar, medir, metricas
+from modelo import Partida
+from series import AGRUPAMENTOS, calcular_series, reduzir
+from torneios import ArmazemTorneios
+from visoes import VisaoEmCache
 
 app = Flask(__name__)
 app.secret_key = 'sinuca_ranking_secret_key_2025'
@@ -14,78 +47,280 @@ HISTORICO_FILE = 'historico.json'
 ADMIN_USER = 'admin'
 ADMIN_PASS = 'admin123'
 
-def carregar_dados(arquivo):
-    """Carrega dados de um arquivo JSON"""
-    if os.path.exists(arquivo):
-        try:
-            with open(arquivo, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def salvar_dados(dados, arquivo):
-    """Salva dados em um arquivo JSON"""
-    with open(arquivo, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
-
-def calcular_rank(aproveitamento):
-    """Calcula o rank baseado no aproveitamento (usado apenas como sugestão)"""
-    if aproveitamento >= 85:
-        return 'S'
-    elif aproveitamento >= 70:
-        return 'A'
-    elif aproveitamento >= 55:
-        return 'B'
-    elif aproveitamento >= 40:
-        return 'C'
-    else:
-        return 'D'
-
-def atualizar_estatisticas_jogador(nome, vitoria, valor):
-    """Atualiza as estatísticas de um jogador"""
-    jogadores = carregar_dados(JOGADORES_FILE)
-    
-    if nome not in jogadores:
-        jogadores[nome] = {
-            'vitorias': 0,
-            'derrotas': 0,
-            'saldo': 0,
-            'aproveitamento': 0,
-            'rank': 'D'
-        }
-    
-    if vitoria:
-        jogadores[nome]['vitorias'] += 1
-        jogadores[nome]['saldo'] += valor
-    else:
-        jogadores[nome]['derrotas'] += 1
-        jogadores[nome]['saldo'] -= valor
+# Modo de armazenamento: 'json' (arquivos completos), 'log' (log de eventos
+# em historico.jsonl + snapshot compactado a cada COMPACTAR_A_CADA eventos)
+# ou 'sqlite' (banco SINUCA_DB_FILE com índices por jogador e data)
+ARMAZENAMENTO = os.environ.get('SINUCA_ARMAZENAMENTO', 'json')
+HISTORICO_LOG_FILE = 'historico.jsonl'
+SQLITE_FILE = os.environ.get('SINUCA_DB_FILE', 'sinuca.db')
+COMPACTAR_A_CADA = 1000
+TORNEIOS_FILE = 'torneios.json'
+
+# Gravação adiada no modo json (ver armazenamento.ArmazemAdiado): '200' grava
+# até 200 ms depois da primeira alteração, juntando as rajadas numa gravação;
+# 'encerramento' só grava ao encerrar o processo (apenas com um único worker)
+GRAVACAO_ADIADA = os.environ.get('SINUCA_GRAVACAO_ADIADA')
+
+# Formato dos arquivos JSON (ver serializacao.py): compactos por padrão, com
+# orjson quando instalado; SINUCA_JSON_LEGIVEL=1 grava indentado e
+# SINUCA_JSON=json força a biblioteca padrão
+JSON_LEGIVEL = os.environ.get('SINUCA_JSON_LEGIVEL') == '1'
+MOTOR_JSON = os.environ.get('SINUCA_JSON')
+serializacao.configurar(MOTOR_JSON, JSON_LEGIVEL)
+
+PARTIDAS_POR_PAGINA = 50
+MAX_PONTOS_SERIE = 500
+MAX_RESULTADOS_BUSCA = 50
+
+# HTML das páginas em cache até os dados mudarem (ver fragmentos.py); com
+# SINUCA_PAGINAS_ESTATICAS as páginas públicas são gravadas nessa pasta após
+# cada alteração, para o proxy reverso servir sem passar pelo Flask
+CACHE_PAGINAS = os.environ.get('SINUCA_CACHE_PAGINAS', '1') == '1'
+MAX_PAGINAS_EM_CACHE = 1000
+PASTA_ESTATICA = os.environ.get('SINUCA_PAGINAS_ESTATICAS')
+
+# Inicialização (ver preparar_app): cada worker carrega os dados e aquece os
+# caches antes de aceitar requisições; SINUCA_VERIFICAR_INICIO=1 também
+# confere as estatísticas gravadas contra o histórico
+AQUECER_INICIO = os.environ.get('SINUCA_AQUECER', '1') == '1'
+VERIFICAR_INICIO = os.environ.get('SINUCA_VERIFICAR_INICIO') == '1'
+
+# Rating Elo opcional (ver rating.py), exibido no ranking com o rank sugerido
+RATING_ATIVO = os.environ.get('SINUCA_RATING') == '1'
+
+# Métricas de latência em /metrics (ver metricas.py); com SINUCA_PERFIL_LENTO_MS
+# as requisições mais lentas que o limite têm o cProfile gravado em PASTA_PERFIS
+METRICAS_ATIVAS = os.environ.get('SINUCA_METRICAS') == '1'
+METRICAS_TOKEN = os.environ.get('SINUCA_METRICAS_TOKEN')
+PERFIL_LENTO_MS = int(os.environ.get('SINUCA_PERFIL_LENTO_MS', 0))
+PASTA_PERFIS = 'perfis'
+
+if METRICAS_ATIVAS:
+    instrumentar(app, PERFIL_LENTO_MS, PASTA_PERFIS)
+
+def abrir_armazem(modo):
+    """Cria o armazenamento do modo indicado com os arquivos configurados"""
+    opcoes = {'compactar_a_cada': COMPACTAR_A_CADA} if modo == 'log' else {}
+    if modo == 'json' and GRAVACAO_ADIADA:
+        encerramento = GRAVACAO_ADIADA == 'encerramento'
+        opcoes['intervalo_ms'] = None if encerramento else int(GRAVACAO_ADIADA)
+        # Sem isso o SIGTERM encerra o processo sem passar pelo atexit
+        if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    return criar_armazem(
+        modo, JOGADORES_FILE, HISTORICO_FILE, HISTORICO_LOG_FILE, SQLITE_FILE, **opcoes
+    )
+
+# Dados carregados uma vez e mantidos em memória (ver armazenamento.py)
+armazem = abrir_armazem(ARMAZENAMENTO)
+
+def versao_dados():
+    """Versão atual dos dados, depois de sincronizar o armazenamento"""
+    armazem.jogadores()
+    armazem.partidas()
+    return armazem.versao
+
+def calcular_ranking():
+    """Jogadores ordenados por rank e depois por saldo"""
+    jogadores = armazem.jogadores()
     
-    total_jogos = jogadores[nome]['vitorias'] + jogadores[nome]['derrotas']
-    if total_jogos > 0:
-        jogadores[nome]['aproveitamento'] = round((jogadores[nome]['vitorias'] / total_jogos) * 100, 1)
+    if RATING_ATIVO:
+        elo = armazem.ratings()
+        jogadores = {
+            nome: {
+                **dados,
+                'rating': round(elo.rating(nome)),
+                'rank_rating': elo.rank(nome)
+            }
+            for nome, dados in jogadores.items()
+        }
     
-    # Não atualizar rank automaticamente - apenas manter o atual ou sugerir
-    if 'rank' not in jogadores[nome]:
-        jogadores[nome]['rank'] = calcular_rank(jogadores[nome]['aproveitamento'])
+    # Ordenar por rank e depois por saldo
+    rank_order = {'S': 5, 'A': 4, 'B': 3, 'C': 2, 'D': 1}
+    with medir('ordenar_ranking'):
+        return dict(sorted(
+            jogadores.items(), 
+            key=lambda x: (rank_order.get(x[1]['rank'], 0), x[1]['saldo']), 
+            reverse=True
+        ))
+
+def calcular_dados_graficos():
+    jogadores = armazem.jogadores()
+    nomes = list(jogadores.keys())
+    return {
+        'nomes': nomes,
+        'saldos': [jogadores[nome]['saldo'] for nome in nomes]
+    }
+
+def calcular_series_jogadores():
+    return calcular_series(armazem.partidas(), com_rating=RATING_ATIVO)
+
+# Visões recalculadas apenas quando jogadores/histórico mudam
+ranking = VisaoEmCache(calcular_ranking, versao_dados)
+dados_graficos = VisaoEmCache(calcular_dados_graficos, versao_dados)
+series_jogadores = VisaoEmCache(calcular_series_jogadores, versao_dados, com_etag=False)
+
+# Índice de nomes para autocompletar, reconstruído só quando os nomes mudam
+busca_jogadores = BuscaJogadores(lambda: armazem.jogadores(), versao_dados)
+
+# Torneios (ver torneios.py); as partidas vão para o histórico como as demais
+torneios = ArmazemTorneios(TORNEIOS_FILE)
+
+paginas = CacheFragmentos(MAX_PAGINAS_EM_CACHE)
+paginas_estaticas = PaginasEstaticas(PASTA_ESTATICA) if PASTA_ESTATICA else None
+
+def pagina_em_cache(chave, versao, gerar):
+    """HTML de `gerar()` em cache por chave e versão dos dados (visão de admin à parte)
+
+    Com mensagens flash pendentes a página é sempre renderizada, para que
+    elas sejam exibidas e consumidas.
+    """
+    if not CACHE_PAGINAS or '_flashes' in session:
+        return gerar()
+    return paginas.obter((session.get('user') == ADMIN_USER,) + chave, versao, gerar)
+
+def preflight(verificar=False):
+    """Carrega os dados e aquece os caches antes da primeira requisição
+
+    Os dados são lidos uma vez e, a partir deles, são construídos os
+    agregados das páginas (confrontos, períodos, estatísticas avançadas e,
+    se ativo, o rating), o ranking e o índice de busca. Com `verificar`,
+    compara também as estatísticas gravadas com o histórico. Retorna a lista
+    de (etapa, segundos) e as diferenças encontradas.
+    """
+    agregados = ['confrontos', 'periodos', 'avancadas', 'versoes']
+    if RATING_ATIVO:
+        agregados.append('ratings')
+    etapas = [('dados', versao_dados)]
+    etapas += [(nome, lambda nome=nome: armazem.aquecer(nome)) for nome in agregados]
+    etapas += [
+        ('ranking', ranking.obter),
+        ('graficos', dados_graficos.obter),
+        ('busca', busca_jogadores.obter),
+        ('torneios', torneios.torneios),
+    ]
+    diferencas = []
+    if verificar:
+        etapas.append((
+            'verificar',
+            lambda: diferencas.extend(armazem.recalcular_estatisticas(gravar=False))
+        ))
     
-    salvar_dados(jogadores, JOGADORES_FILE)
+    tempos = []
+    # Milhões de objetos novos e duradouros: as coletas no meio da carga não
+    # teriam nada a liberar. O estado anterior da coleta é restaurado no fim
+    coleta_ativa = gc.isenabled()
+    gc.disable()
+    try:
+        for etapa, executar in etapas:
+            inicio = time.perf_counter()
+            with medir('inicializacao', parte=etapa):
+                executar()
+            tempos.append((etapa, time.perf_counter() - inicio))
+    finally:
+        if coleta_ativa:
+            gc.enable()
+    return tempos, diferencas
+
+app_aquecido = False
+trava_aquecimento = threading.Lock()
+
+def preparar_app(aquecer=None):
+    """Prepara o `app` do módulo, ex.: gunicorn -w 4 'main:preparar_app()'
+
+    Não cria uma aplicação nova: devolve sempre o mesmo `app`. Armazenamento
+    e agregados são criados sob demanda; com SINUCA_AQUECER=1 (padrão) o
+    preflight os carrega aqui, antes de o worker aceitar conexões, em vez de
+    na primeira requisição. Só a primeira chamada que aquece faz o preflight
+    e o gc.freeze; as seguintes apenas devolvem o `app`.
+    """
+    global app_aquecido
+    if not (AQUECER_INICIO if aquecer is None else aquecer):
+        return app
+    with trava_aquecimento:
+        if app_aquecido:
+            return app
+        _, diferencas = preflight(VERIFICAR_INICIO)
+        for nome, campo, armazenado, recalculado in diferencas:
+            app.logger.warning(
+                '%s: %s armazenado=%s recalculado=%s (use "flask recalcular")',
+                nome, campo, armazenado, recalculado
+            )
+        # Os dados carregados saem da coleta de lixo: sem isso cada coleta
+        # completa percorre todo o histórico em memória (centenas de ms com
+        # 200 mil partidas) no meio de uma requisição
+        gc.freeze()
+        app_aquecido = True
+    return app
+
+def resposta_condicional(visao, gerar, variante=''):
+    """Responde 304 se o cliente já tem a versão atual; senão chama `gerar()`
+
+    O ETag vem do conteúdo da visão (mais `variante`, ex.: visão de admin),
+    então é o mesmo em todos os workers.
+    """
+    etag = visao.etag + variante
+    modificado = is_resource_modified(
+        request.environ, etag=etag, last_modified=visao.modificado_em
+    )
+    # Mensagens flash pendentes precisam ser renderizadas, então nunca 304
+    if '_flashes' not in session and not modificado:
+        resposta = make_response('', 304)
+    else:
+        resposta = make_response(gerar())
+    resposta.set_etag(etag)
+    resposta.last_modified = visao.modificado_em
+    resposta.cache_control.no_cache = True  # Sempre revalidar com o ETag
+    resposta.vary.add('Cookie')
+    return resposta
 
 @app.route('/')
 def home():
     """Página principal com ranking"""
-    jogadores = carregar_dados(JOGADORES_FILE)
-    
-    # Ordenar por rank e depois por saldo
-    rank_order = {'S': 5, 'A': 4, 'B': 3, 'C': 2, 'D': 1}
-    jogadores_ordenados = dict(sorted(
-        jogadores.items(), 
-        key=lambda x: (rank_order.get(x[1]['rank'], 0), x[1]['saldo']), 
-        reverse=True
-    ))
+    visao = ranking.obter()
+    variante = '-admin' if session.get('user') == ADMIN_USER else ''
+    return resposta_condicional(
+        visao,
+        lambda: pagina_em_cache(
+            ('index',), visao.etag,
+            lambda: render_template(
+                'index.html', jogadores=visao.valor, session=session
+            )
+        ),
+        variante
+    )
+
+def classificacao_periodo(periodo):
+    """Ranking do período com os dados de cada jogador (rank, imagem, ...)"""
+    jogadores = armazem.jogadores()
+    return {
+        nome: {
+            **jogadores.get(nome, {}),
+            **{campo: dados[campo] for campo in CAMPOS_DERIVADOS}
+        }
+        for nome, dados in armazem.ranking_periodo(periodo)
+    }
+
+def periodo_pedido():
+    """Período da query string ('aaaa-mm' ou 'aaaa'); padrão é o mês atual"""
+    periodo = request.args.get('periodo') or datetime.now().strftime('%Y-%m')
+    return periodo if re.fullmatch(r'\d{4}(-\d{2})?', periodo) else None
+
+@app.route('/ranking')
+def ranking_periodo():
+    """Ranking mensal ou anual (?periodo=2025-10 ou ?periodo=2025)"""
+    periodo = periodo_pedido()
+    if periodo is None:
+        flash('Período inválido! Use aaaa-mm ou aaaa.', 'error')
+        return redirect(url_for('home'))
     
-    return render_template('index.html', jogadores=jogadores_ordenados, session=session)
+    return render_template(
+        'index.html',
+        jogadores=classificacao_periodo(periodo),
+        periodo=periodo,
+        periodos=armazem.periodos(),
+        session=session
+    )
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -117,24 +352,42 @@ def editar_jogador(nome):
         flash('Acesso negado! Apenas admin pode editar jogadores.', 'error')
         return redirect(url_for('home'))
     
-    jogadores = carregar_dados(JOGADORES_FILE)
+    jogador = armazem.jogador(nome)
     
-    if nome not in jogadores:
+    if jogador is None:
         flash('Jogador não encontrado!', 'error')
         return redirect(url_for('home'))
     
     if request.method == 'POST':
+        novo_nome = request.form.get('nome', nome) or nome
+        nova_imagem = request.form.get('imagem')
         novo_rank = request.form['rank']
+        
         if novo_rank in ['S', 'A', 'B', 'C', 'D']:
-            jogadores[nome]['rank'] = novo_rank
-            salvar_dados(jogadores, JOGADORES_FILE)
-            flash(f'Rank de {nome} atualizado para {novo_rank}!', 'success')
+            def alterar(jogadores):
+                # Relido sob a trava de escrita: estatísticas gravadas por
+                # outros workers desde o GET não são sobrescritas
+                if nome not in jogadores:
+                    return False
+                jogadores[nome]['rank'] = novo_rank
+                if nova_imagem is not None:
+                    jogadores[nome]['imagem'] = nova_imagem  # Atualizar imagem
+            
+            if novo_nome != nome and novo_nome in armazem.jogadores():
+                flash(f'Já existe um jogador chamado {novo_nome}!', 'error')
+            elif armazem.alterar_jogadores(alterar) is False:
+                flash('Jogador não encontrado!', 'error')
+            # O nome muda também nas partidas, numa gravação própria
+            elif novo_nome != nome and not armazem.renomear_jogador(nome, novo_nome):
+                flash(f'Não foi possível renomear para {novo_nome}!', 'error')
+            else:
+                flash(f'Informações de {novo_nome} atualizadas!', 'success')
         else:
             flash('Rank inválido!', 'error')
         
         return redirect(url_for('home'))
     
-    return render_template('editar_jogador.html', nome=nome, jogador=jogadores[nome])
+    return render_template('editar_jogador.html', nome=nome, jogador=jogador)
 
 @app.route('/add', methods=['GET', 'POST'])
 def adicionar_partida():
@@ -143,7 +396,7 @@ def adicionar_partida():
         flash('Acesso negado! Apenas admin pode registrar partidas.', 'error')
         return redirect(url_for('home'))
     
-    jogadores = carregar_dados(JOGADORES_FILE)
+    jogadores = armazem.jogadores()
     
     if request.method == 'POST':
         jogador1 = request.form['jogador1']
@@ -153,163 +406,131 @@ def adicionar_partida():
         vencedor_p3 = request.form.get('vencedor_partida3', 'nao_jogada')
         dobro_nada = 'dobro_nada' in request.form
         
-        if not jogador1 or not jogador2:
-            flash('Por favor, selecione ambos os jogadores!', 'error')
-            return render_template('add_partida.html', jogadores=jogadores)
-        
-        if jogador1 == jogador2:
-            flash('Os jogadores devem ser diferentes!', 'error')
+        # Validar jogadores e calcular placar MD3
+        try:
+            partida = Partida.do_md3(
+                datetime.now().strftime('%d/%m/%Y %H:%M'),
+                jogador1, jogador2, vencedor_p1, vencedor_p2, vencedor_p3, dobro_nada
+            )
+        except ValueError as erro:
+            flash(f'Erro: {erro}', 'error')
             return render_template('add_partida.html', jogadores=jogadores)
         
-        # Calcular placar MD3
-        vitorias_j1 = 0
-        vitorias_j2 = 0
-        
-        if vencedor_p1 == 'jogador1':
-            vitorias_j1 += 1
-        else:
-            vitorias_j2 += 1
-            
-        if vencedor_p2 == 'jogador1':
-            vitorias_j1 += 1
-        else:
-            vitorias_j2 += 1
-        
-        # Se não houve partida 3, definir vencedor
-        if vencedor_p3 == 'nao_jogada':
-            if vitorias_j1 == 2:
-                nome_vencedor = jogador1
-                placar = "2-0"
-            elif vitorias_j2 == 2:
-                nome_vencedor = jogador2
-                placar = "2-0"
-            else:
-                flash('Erro: Se não houve terceira partida, alguém deve ter vencido 2-0!', 'error')
-                return render_template('add_partida.html', jogadores=jogadores)
-        else:
-            # Houve partida 3
-            if vencedor_p3 == 'jogador1':
-                vitorias_j1 += 1
-            else:
-                vitorias_j2 += 1
-            
-            if vitorias_j1 == 2:
-                nome_vencedor = jogador1
-                placar = "2-1"
-            elif vitorias_j2 == 2:
-                nome_vencedor = jogador2
-                placar = "2-1"
-            else:
-                flash('Erro: Placar inválido para MD3!', 'error')
-                return render_template('add_partida.html', jogadores=jogadores)
-        
-        # Valor da partida (10 normal, 20 dobro ou nada)
-        valor = 20 if dobro_nada else 10
+        # Atualizar estatísticas e histórico numa única gravação
+        armazem.registrar_partida(partida.como_dict())
         
-        # Atualizar estatísticas
-        if nome_vencedor == jogador1:
-            atualizar_estatisticas_jogador(jogador1, True, valor)
-            atualizar_estatisticas_jogador(jogador2, False, valor)
-        else:
-            atualizar_estatisticas_jogador(jogador1, False, valor)
-            atualizar_estatisticas_jogador(jogador2, True, valor)
-        
-        # Salvar no histórico
-        historico = carregar_dados(HISTORICO_FILE)
-        if 'partidas' not in historico:
-            historico['partidas'] = []
-        
-        partida = {
-            'data': datetime.now().strftime('%d/%m/%Y %H:%M'),
-            'jogador1': jogador1,
-            'jogador2': jogador2,
-            'vencedor': nome_vencedor,
-            'placar': placar,
-            'valor': valor,
-            'dobro_nada': dobro_nada,
-            'tipo': 'Dobro ou Nada' if dobro_nada else 'Normal'
-        }
-        
-        historico['partidas'].insert(0, partida)  # Mais recente primeiro
-        salvar_dados(historico, HISTORICO_FILE)
-        
-        flash(f'Partida registrada com sucesso! {nome_vencedor} venceu por {placar}!', 'success')
+        flash(
+            f'Partida registrada com sucesso! {partida.vencedor} venceu por'
+            f' {partida.placar}!',
+            'success'
+        )
         return redirect(url_for('home'))
     
     return render_template('add_partida.html', jogadores=jogadores)
 
+def filtros_historico():
+    """Lê os filtros de histórico da query string (jogador, tipo, desde, ate, antes)"""
+    filtros = {}
+    for campo in ('jogador', 'tipo'):
+        if request.args.get(campo):
+            filtros[campo] = request.args[campo]
+    for campo in ('desde', 'ate'):
+        valor = request.args.get(campo, '')
+        try:
+            datetime.strptime(valor, '%Y-%m-%d')
+            filtros[campo] = valor
+        except ValueError:
+            pass
+    antes = request.args.get('antes', type=int)
+    if antes is not None:
+        filtros['antes'] = antes
+    return filtros
+
 @app.route('/historico')
 def historico():
-    """Visualizar histórico de partidas"""
-    historico_data = carregar_dados(HISTORICO_FILE)
-    partidas = historico_data.get('partidas', [])
+    """Visualizar histórico de partidas (paginado, mais recentes primeiro)"""
+    filtros = filtros_historico()
+    limite = max(min(request.args.get('limite', PARTIDAS_POR_PAGINA, type=int), 500), 1)
+    
+    def gerar():
+        partidas, proximo = armazem.pagina_partidas(limite, **filtros)
+        return render_template(
+            'historico.html', partidas=partidas, proximo=proximo, filtros=filtros
+        )
+    
+    chave = ('historico', limite, tuple(sorted(filtros.items())))
+    return pagina_em_cache(chave, versao_dados(), gerar)
+
+@app.route('/api/partidas')
+def api_partidas():
+    """Histórico em JSON, gerado em streaming
+
+    Aceita os mesmos filtros de /historico; `limite=0` devolve todas as
+    partidas filtradas sem montar a lista inteira em memória.
+    """
+    filtros = filtros_historico()
+    limite = max(request.args.get('limite', PARTIDAS_POR_PAGINA, type=int), 0)
+    
+    def gerar():
+        partidas = armazem.iterar_partidas(**filtros)
+        yield '{"partidas": ['
+        proximo = ultimo_id = None
+        for n, partida in enumerate(partidas):
+            if limite and n == limite:
+                proximo = ultimo_id
+                break
+            yield (',' if n else '') + json.dumps(partida, ensure_ascii=False)
+            ultimo_id = partida['id']
+        yield f'], "proximo": {json.dumps(proximo)}}}'
     
-    return render_template('historico.html', partidas=partidas)
+    return Response(stream_with_context(gerar()), mimetype='application/json')
 
 @app.route('/graficos')
 def graficos():
     """Página de gráficos"""
-    jogadores = carregar_dados(JOGADORES_FILE)
+    jogadores = armazem.jogadores()
     return render_template('graficos.html', jogadores=jogadores)
 
 @app.route('/perfil/<nome>')
 def perfil_jogador(nome):
     """Página de perfil detalhado do jogador"""
-    jogadores = carregar_dados(JOGADORES_FILE)
-    historico_data = carregar_dados(HISTORICO_FILE)
+    jogador = armazem.jogador(nome)
     
-    if nome not in jogadores:
+    if jogador is None:
         flash('Jogador não encontrado!', 'error')
         return redirect(url_for('home'))
     
-    jogador = jogadores[nome]
-    partidas_todas = historico_data.get('partidas', [])
+    # Só muda quando as partidas ou os dados deste jogador mudam
+    versao = (armazem.versao_jogador(nome), dict(jogador))
+    return pagina_em_cache(
+        ('perfil', nome), versao, lambda: renderizar_perfil(nome, jogador)
+    )
+
+def renderizar_perfil(nome, jogador):
+    """HTML do perfil: partidas, confrontos e estatísticas avançadas do jogador"""
+    # Partidas e confrontos do jogador vêm de agregados mantidos pelo
+    # armazenamento, sem percorrer o histórico inteiro
+    partidas_todas = armazem.partidas_compactas(nome)
+    estatisticas_oponentes = armazem.confrontos_do_jogador(nome)
+    # Sequências, placares 2-0/2-1, Dobro ou Nada e forma recente
+    estatisticas_avancadas = armazem.estatisticas_avancadas(nome)
     
-    # Filtrar partidas do jogador
+    # Montar partidas do jogador
     partidas_jogador = []
-    estatisticas_oponentes = {}
-    
-    for partida in partidas_todas:
-        if partida['jogador1'] == nome or partida['jogador2'] == nome:
-            # Determinar oponente e resultado
-            if partida['jogador1'] == nome:
-                oponente = partida['jogador2']
-                vitoria = partida['vencedor'] == nome
-                placar = partida.get('placar', '2-0')  # Usar placar real se disponível
-            else:
-                oponente = partida['jogador1']
-                vitoria = partida['vencedor'] == nome
-                placar = partida.get('placar', '2-0')  # Usar placar real se disponível
-            
-            # Se perdeu, inverter placar
-            if not vitoria:
-                if placar == "2-0":
-                    placar = "0-2"
-                elif placar == "2-1":
-                    placar = "1-2"
-            
-            partidas_jogador.append({
-                'data': partida['data'],
-                'oponente': oponente,
-                'vitoria': vitoria,
-                'placar': placar,
-                'dobro_nada': partida.get('dobro_nada', False),
-                'valor': partida['valor']
-            })
-            
-            # Estatísticas contra oponentes
-            if oponente not in estatisticas_oponentes:
-                estatisticas_oponentes[oponente] = {
-                    'vitorias': 0,
-                    'derrotas': 0,
-                    'total': 0
-                }
-            
-            if vitoria:
-                estatisticas_oponentes[oponente]['vitorias'] += 1
-            else:
-                estatisticas_oponentes[oponente]['derrotas'] += 1
-            estatisticas_oponentes[oponente]['total'] += 1
+    
+    for partida in reversed(partidas_todas):  # Mais recente primeiro
+        # Oponente, resultado e placar ("1-2" numa derrota) do ponto de vista do jogador
+        oponente, vitoria, placar, dobro_nada, valor = partida.para(nome)
+        
+        partidas_jogador.append({
+            'id': partida.id,
+            'data': partida.data,
+            'oponente': oponente,
+            'vitoria': vitoria,
+            'placar': placar,
+            'dobro_nada': dobro_nada,
+            'valor': valor
+        })
     
     # Calcular aproveitamento contra cada oponente
     estatisticas_detalhadas = {}
@@ -354,55 +575,47 @@ def perfil_jogador(nome):
                          jogador=jogador,
                          partidas_jogador=partidas_jogador,
                          estatisticas_detalhadas=estatisticas_detalhadas,
+                         estatisticas_avancadas=estatisticas_avancadas,
                          estatisticas_oponentes={
                              'fregues': fregues,
                              'arqui_inimigo': arqui_inimigo
                          })
 
-@app.route('/editar_partida/<int:index>', methods=['GET', 'POST'])
-def editar_partida(index):
-    """Editar uma partida específica (apenas admin)"""
+def fora_de_torneio(acao):
+    """Verificação para `armazem.editar_partida`/`excluir_partida`
+
+    A chave do torneio já avançou com o resultado, então as partidas de
+    torneio não podem ser alteradas.
+    """
+    def verificar(partida):
+        if partida.get('torneio') is not None:
+            raise ValueError(f'Partidas de torneio não podem ser {acao}')
+    return verificar
+
+@app.route('/editar_partida/<int:id_partida>', methods=['GET', 'POST'])
+def editar_partida(id_partida):
+    """Editar uma partida específica (apenas admin)
+
+    `id_partida` é o id da partida (partida['id']), não a posição na lista.
+    """
     if 'user' not in session or session['user'] != ADMIN_USER:
         flash('Acesso negado! Apenas admin pode editar partidas.', 'error')
         return redirect(url_for('home'))
     
-    historico_data = carregar_dados(HISTORICO_FILE)
-    partidas = historico_data.get('partidas', [])
+    partida = armazem.partida(id_partida)
     
-    if index >= len(partidas) or index < 0:
+    if partida is None:
         flash('Partida não encontrada!', 'error')
         return redirect(url_for('historico'))
     
-    partida = partidas[index]
-    jogadores = carregar_dados(JOGADORES_FILE)
+    # A chave do torneio já avançou com este resultado
+    if partida.get('torneio') is not None:
+        flash('Partidas de torneio não podem ser editadas!', 'error')
+        return redirect(url_for('historico'))
+    
+    jogadores = armazem.jogadores()
     
     if request.method == 'POST':
-        # Reverter estatísticas da partida original
-        jogador1_original = partida['jogador1']
-        jogador2_original = partida['jogador2']
-        vencedor_original = partida['vencedor']
-        valor_original = partida['valor']
-        
-        # Reverter saldo e estatísticas
-        if vencedor_original == jogador1_original:
-            jogadores[jogador1_original]['vitorias'] -= 1
-            jogadores[jogador1_original]['saldo'] -= valor_original
-            jogadores[jogador2_original]['derrotas'] -= 1
-            jogadores[jogador2_original]['saldo'] += valor_original
-        else:
-            jogadores[jogador1_original]['derrotas'] -= 1
-            jogadores[jogador1_original]['saldo'] += valor_original
-            jogadores[jogador2_original]['vitorias'] -= 1
-            jogadores[jogador2_original]['saldo'] -= valor_original
-        
-        # Recalcular aproveitamento
-        for jogador in [jogador1_original, jogador2_original]:
-            total_jogos = jogadores[jogador]['vitorias'] + jogadores[jogador]['derrotas']
-            if total_jogos > 0:
-                jogadores[jogador]['aproveitamento'] = round((jogadores[jogador]['vitorias'] / total_jogos) * 100, 1)
-            else:
-                jogadores[jogador]['aproveitamento'] = 0
-        
         # Obter novos dados
         novo_jogador1 = request.form['jogador1']
         novo_jogador2 = request.form['jogador2']
@@ -411,170 +624,458 @@ def editar_partida(index):
         vencedor_p3 = request.form.get('vencedor_partida3', 'nao_jogada')
         dobro_nada = 'dobro_nada' in request.form
         
-        # Calcular novo placar
-        vitorias_j1 = 0
-        vitorias_j2 = 0
-        
-        if vencedor_p1 == 'jogador1':
-            vitorias_j1 += 1
-        else:
-            vitorias_j2 += 1
-            
-        if vencedor_p2 == 'jogador1':
-            vitorias_j1 += 1
-        else:
-            vitorias_j2 += 1
-        
-        if vencedor_p3 == 'nao_jogada':
-            if vitorias_j1 == 2:
-                novo_vencedor = novo_jogador1
-                placar = "2-0"
-            elif vitorias_j2 == 2:
-                novo_vencedor = novo_jogador2
-                placar = "2-0"
-            else:
-                flash('Erro: Se não houve terceira partida, alguém deve ter vencido 2-0!', 'error')
-                return render_template('editar_partida.html', partida=partida, jogadores=jogadores, index=index)
-        else:
-            if vencedor_p3 == 'jogador1':
-                vitorias_j1 += 1
-            else:
-                vitorias_j2 += 1
-            
-            if vitorias_j1 == 2:
-                novo_vencedor = novo_jogador1
-                placar = "2-1"
-            elif vitorias_j2 == 2:
-                novo_vencedor = novo_jogador2
-                placar = "2-1"
-            else:
-                flash('Erro: Placar inválido para MD3!', 'error')
-                return render_template('editar_partida.html', partida=partida, jogadores=jogadores, index=index)
-        
-        novo_valor = 20 if dobro_nada else 10
-        
-        # Aplicar novas estatísticas
-        if novo_vencedor == novo_jogador1:
-            atualizar_estatisticas_jogador(novo_jogador1, True, novo_valor)
-            atualizar_estatisticas_jogador(novo_jogador2, False, novo_valor)
-        else:
-            atualizar_estatisticas_jogador(novo_jogador1, False, novo_valor)
-            atualizar_estatisticas_jogador(novo_jogador2, True, novo_valor)
+        # Calcular novo placar (mantendo a data original)
+        try:
+            nova = Partida.do_md3(
+                partida['data'], novo_jogador1, novo_jogador2,
+                vencedor_p1, vencedor_p2, vencedor_p3, dobro_nada
+            )
+        except ValueError as erro:
+            flash(f'Erro: {erro}', 'error')
+            return render_template(
+                'editar_partida.html',
+                partida=partida, jogadores=jogadores, id_partida=id_partida
+            )
         
-        # Atualizar partida no histórico
-        partidas[index] = {
-            'data': partida['data'],  # Manter data original
-            'jogador1': novo_jogador1,
-            'jogador2': novo_jogador2,
-            'vencedor': novo_vencedor,
-            'placar': placar,
-            'valor': novo_valor,
-            'dobro_nada': dobro_nada,
-            'tipo': 'Dobro ou Nada' if dobro_nada else 'Normal'
-        }
+        # Reverter a partida original e aplicar a nova numa única gravação,
+        # mantendo os campos extras (ex.: importados) da original
+        try:
+            editada = armazem.editar_partida(
+                id_partida, {**partida, **nova.como_dict()},
+                verificar=fora_de_torneio('editadas')
+            )
+        except ValueError as erro:
+            flash(f'{erro}!', 'error')
+            return redirect(url_for('historico'))
         
-        historico_data['partidas'] = partidas
-        salvar_dados(historico_data, HISTORICO_FILE)
+        if not editada:
+            flash('Partida não encontrada!', 'error')
+            return redirect(url_for('historico'))
         
         flash('Partida editada com sucesso!', 'success')
         return redirect(url_for('historico'))
     
-    return render_template('editar_partida.html', partida=partida, jogadores=jogadores, index=index)
+    return render_template(
+        'editar_partida.html',
+        partida=partida, jogadores=jogadores, id_partida=id_partida
+    )
 
-@app.route('/excluir_partida/<int:index>', methods=['POST'])
-def excluir_partida(index):
+@app.route('/excluir_partida/<int:id_partida>', methods=['POST'])
+def excluir_partida(id_partida):
     """Excluir uma partida específica (apenas admin)"""
     if 'user' not in session or session['user'] != ADMIN_USER:
         return jsonify({'success': False, 'message': 'Acesso negado'})
     
-    historico_data = carregar_dados(HISTORICO_FILE)
-    partidas = historico_data.get('partidas', [])
+    # Reverter estatísticas e remover a partida numa única gravação; a
+    # verificação do torneio roda sob a mesma trava
+    try:
+        excluida = armazem.excluir_partida(
+            id_partida, verificar=fora_de_torneio('excluídas')
+        )
+    except ValueError as erro:
+        return jsonify({'success': False, 'message': str(erro)})
     
-    if index >= len(partidas) or index < 0:
+    if not excluida:
         return jsonify({'success': False, 'message': 'Partida não encontrada'})
     
-    partida = partidas[index]
-    jogadores = carregar_dados(JOGADORES_FILE)
-    
-    # Reverter estatísticas da partida
-    jogador1 = partida['jogador1']
-    jogador2 = partida['jogador2']
-    vencedor = partida['vencedor']
-    valor = partida['valor']
-    
-    if vencedor == jogador1:
-        jogadores[jogador1]['vitorias'] -= 1
-        jogadores[jogador1]['saldo'] -= valor
-        jogadores[jogador2]['derrotas'] -= 1
-        jogadores[jogador2]['saldo'] += valor
-    else:
-        jogadores[jogador1]['derrotas'] -= 1
-        jogadores[jogador1]['saldo'] += valor
-        jogadores[jogador2]['vitorias'] -= 1
-        jogadores[jogador2]['saldo'] -= valor
-    
-    # Recalcular aproveitamento
-    for jogador in [jogador1, jogador2]:
-        total_jogos = jogadores[jogador]['vitorias'] + jogadores[jogador]['derrotas']
-        if total_jogos > 0:
-            jogadores[jogador]['aproveitamento'] = round((jogadores[jogador]['vitorias'] / total_jogos) * 100, 1)
-        else:
-            jogadores[jogador]['aproveitamento'] = 0
-    
-    # Remover partida do histórico
-    partidas.pop(index)
-    historico_data['partidas'] = partidas
-    
-    # Salvar dados atualizados
-    salvar_dados(jogadores, JOGADORES_FILE)
-    salvar_dados(historico_data, HISTORICO_FILE)
-    
     return jsonify({'success': True})
 
+@app.route('/api/ranking')
+def api_ranking_periodo():
+    """Ranking de um mês ou ano em JSON"""
+    periodo = periodo_pedido()
+    if periodo is None:
+        return jsonify({'erro': 'Período inválido, use aaaa-mm ou aaaa'}), 400
+    
+    return jsonify({
+        'periodo': periodo,
+        'jogadores': [
+            {'nome': nome, **dados}
+            for nome, dados in classificacao_periodo(periodo).items()
+        ]
+    })
+
 @app.route('/api/dados-graficos')
 def api_dados_graficos():
     """API para dados dos gráficos"""
-    jogadores = carregar_dados(JOGADORES_FILE)
+    visao = dados_graficos.obter()
+    return resposta_condicional(visao, lambda: jsonify(visao.valor))
+
+@app.route('/api/series')
+def api_series():
+    """Evolução de saldo, aproveitamento e rating de cada jogador
+
+    Parâmetros: jogador (pode repetir; padrão todos), agrupar (partida, dia,
+    semana ou mes) e pontos (máximo de pontos por jogador).
+    """
+    agrupar = request.args.get('agrupar', 'partida')
+    if agrupar not in AGRUPAMENTOS:
+        agrupar = 'partida'
+    pontos = min(max(request.args.get('pontos', MAX_PONTOS_SERIE, type=int), 1), 5000)
     
-    nomes = list(jogadores.keys())
-    saldos = [jogadores[nome]['saldo'] for nome in nomes]
+    series = series_jogadores.obter().valor
+    nomes = request.args.getlist('jogador') or list(series)
     
     return jsonify({
-        'nomes': nomes,
-        'saldos': saldos
+        'agrupar': agrupar,
+        'series': {
+            nome: reduzir(series[nome], agrupar, pontos)
+            for nome in nomes if nome in series
+        }
     })
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
-@app.route('/editar_jogador/<nome>', methods=['GET', 'POST'])
-def editar_jogador(nome):
-    """Editar informações do jogador (apenas admin)"""
+@app.route('/api/jogadores')
+def api_jogadores():
+    """Nomes de jogadores para autocompletar os formulários
+
+    Parâmetros: q (prefixo do nome ou de uma das suas palavras, sem
+    diferenciar acentos e maiúsculas) e limite (padrão 10).
+    """
+    consulta = request.args.get('q', '')
+    limite = min(max(request.args.get('limite', 10, type=int), 1), MAX_RESULTADOS_BUSCA)
+    
+    return jsonify(
+        {'q': consulta, 'jogadores': busca_jogadores.buscar(consulta, limite)}
+    )
+
+def cabecas_de_chave(nomes):
+    """Participantes na ordem do ranking atual (os fora do ranking por último)"""
+    posicoes = {nome: posicao for posicao, nome in enumerate(ranking.obter().valor)}
+    return sorted(nomes, key=lambda nome: posicoes.get(nome, len(posicoes)))
+
+def resumo_torneio(torneio, completo=False):
+    resumo = {
+        'id': torneio.id,
+        'nome': torneio.nome,
+        'formato': torneio.formato,
+        'data': torneio.data,
+        'jogadores': torneio.jogadores,
+        'encerrado': torneio.encerrado,
+        'campeao': torneio.campeao,
+    }
+    if completo:
+        resumo['classificacao'] = torneio.classificacao.ordenada()
+        resumo['pendentes'] = [confronto['id'] for confronto in torneio.pendentes()]
+        resumo['confrontos'] = torneio.confrontos
+    return resumo
+
+@app.route('/api/torneios', methods=['GET', 'POST'])
+def api_torneios():
+    """Lista os torneios; POST (apenas admin) cria um torneio
+
+    Campos do POST: nome, formato (todos_contra_todos, eliminatoria ou
+    dupla_eliminatoria) e jogadores (campo repetido ou nomes separados por
+    vírgula). Os cabeças de chave seguem o ranking atual.
+    """
+    if request.method == 'GET':
+        return jsonify(
+            {'torneios': [resumo_torneio(torneio) for torneio in torneios.torneios()]}
+        )
+    
     if 'user' not in session or session['user'] != ADMIN_USER:
-        flash('Acesso negado! Apenas admin pode editar jogadores.', 'error')
-        return redirect(url_for('home'))
+        return jsonify({'success': False, 'message': 'Acesso negado'}), 403
+    
+    nomes = request.form.getlist('jogadores')
+    if len(nomes) == 1:
+        nomes = nomes[0].split(',')
+    nomes = [nome.strip() for nome in nomes if nome.strip()]
+    try:
+        torneio = torneios.criar(
+            request.form.get('nome') or 'Torneio',
+            request.form.get('formato', 'eliminatoria'),
+            cabecas_de_chave(nomes), datetime.now().strftime('%d/%m/%Y %H:%M')
+        )
+    except ValueError as erro:
+        return jsonify({'success': False, 'message': str(erro)}), 400
+    
+    resumo = resumo_torneio(torneio, completo=True)
+    return jsonify({'success': True, 'torneio': resumo}), 201
 
-    jogadores = carregar_dados(JOGADORES_FILE)
+@app.route('/api/torneios/<int:id_torneio>')
+def api_torneio(id_torneio):
+    """Confrontos, classificação e confrontos pendentes de um torneio"""
+    torneio = torneios.torneio(id_torneio)
+    if torneio is None:
+        return jsonify({'erro': 'Torneio não encontrado'}), 404
+    
+    return jsonify(resumo_torneio(torneio, completo=True))
 
-    if nome not in jogadores:
-        flash('Jogador não encontrado!', 'error')
-        return redirect(url_for('home'))
+@app.route(
+    '/api/torneios/<int:id_torneio>/confrontos/<int:id_confronto>', methods=['POST']
+)
+def registrar_confronto(id_torneio, id_confronto):
+    """Registra a partida MD3 de um confronto (apenas admin)
 
-    if request.method == 'POST':
-        novo_nome = request.form['nome']
-        nova_imagem = request.form['imagem']
-        novo_rank = request.form['rank']
+    Mesmos campos de /add (vencedor_partida1..3 com 'jogador1'/'jogador2' na
+    ordem do confronto e dobro_nada); a partida entra no histórico e nas
+    estatísticas dos jogadores e o vencedor avança na chave.
+    """
+    if 'user' not in session or session['user'] != ADMIN_USER:
+        return jsonify({'success': False, 'message': 'Acesso negado'}), 403
+    
+    torneio = torneios.torneio(id_torneio)
+    if torneio is None:
+        return jsonify({'success': False, 'message': 'Torneio não encontrado'}), 404
+    
+    try:
+        jogador1, jogador2 = torneio.adversarios(id_confronto)
+        partida = Partida.do_md3(
+            datetime.now().strftime('%d/%m/%Y %H:%M'), jogador1, jogador2,
+            request.form.get('vencedor_partida1'),
+            request.form.get('vencedor_partida2'),
+            request.form.get('vencedor_partida3', 'nao_jogada'),
+            'dobro_nada' in request.form
+        )
+        confronto = torneios.registrar_resultado(
+            id_torneio, id_confronto, partida, armazem.registrar_partida
+        )
+    except ValueError as erro:
+        return jsonify({'success': False, 'message': str(erro)}), 400
+    
+    return jsonify(
+        {'success': True, 'confronto': confronto, 'torneio': resumo_torneio(torneio)}
+    )
 
-        if novo_rank in ['S', 'A', 'B', 'C', 'D']:
-            jogadores[nome]['rank'] = novo_rank
-            jogadores[nome]['imagem'] = nova_imagem  # Atualizar imagem
-            if novo_nome != nome:
-                jogadores[nome]['nome'] = novo_nome  # Atualizar nome
-                jogadores[novo_nome] = jogadores.pop(nome)  # Mover dados para o novo nome
-            salvar_dados(jogadores, JOGADORES_FILE)
-            flash(f'Informações de {novo_nome} atualizadas!', 'success')
-        else:
-            flash('Rank inválido!', 'error')
+@app.route('/metrics')
+def exportar_metricas():
+    """Histogramas de latência no formato do Prometheus (admin ou token)"""
+    if not METRICAS_ATIVAS:
+        return jsonify({'erro': 'Métricas desativadas (SINUCA_METRICAS=1)'}), 404
+    
+    autorizacao = request.headers.get('Authorization', '')
+    com_token = METRICAS_TOKEN and hmac.compare_digest(
+        autorizacao, f'Bearer {METRICAS_TOKEN}'
+    )
+    if session.get('user') != ADMIN_USER and not com_token:
+        return jsonify({'erro': 'Acesso negado'}), 403
+    
+    return Response(metricas.texto(), mimetype='text/plain; version=0.0.4')
 
-        return redirect(url_for('home'))
+def renderizar_pagina(url):
+    """Conteúdo de `url` como um visitante anônimo a vê, ou None se não for 200
 
-    return render_template('editar_jogador.html', nome=nome, jogador=jogadores[nome])
\ No newline at end of file
+    Chama a view num contexto de requisição próprio, sem os hooks de
+    requisição (métricas, cProfile) nem a sessão de quem alterou os dados.
+    """
+    with app.test_request_context(url):
+        view = app.view_functions[request.url_rule.endpoint]
+        resposta = app.make_response(view(**request.view_args))
+    return resposta.get_data() if resposta.status_code == 200 else None
+
+def publicar_paginas():
+    """Grava em PASTA_ESTATICA as páginas públicas cuja versão mudou"""
+    def gerar(url):
+        return lambda: renderizar_pagina(url)
+    
+    versao = versao_dados()
+    publicar = {
+        '/': (versao, gerar('/')),
+        '/historico': (versao, gerar('/historico')),
+    }
+    for nome, jogador in armazem.jogadores().items():
+        url = f'/perfil/{nome}'
+        if '/' not in nome:
+            publicar[url] = ((armazem.versao_jogador(nome), dict(jogador)), gerar(url))
+    return paginas_estaticas.publicar(publicar)
+
+# Publicação numa thread do worker, fora da requisição que alterou os dados;
+# alterações seguidas enquanto ela trabalha viram uma única nova publicação
+publicacao_pendente = threading.Event()
+publicador = None
+trava_publicador = threading.Lock()
+
+def publicar_em_segundo_plano():
+    while True:
+        publicacao_pendente.wait()
+        publicacao_pendente.clear()
+        try:
+            publicar_paginas()
+        except Exception:
+            app.logger.exception('Falha ao publicar as páginas estáticas')
+
+@app.after_request
+def atualizar_paginas_estaticas(resposta):
+    """Após uma alteração bem-sucedida, agenda a regravação das páginas estáticas"""
+    global publicador
+    alterou = request.method == 'POST' and resposta.status_code < 400
+    if paginas_estaticas is not None and alterou:
+        with trava_publicador:
+            # Também recria a thread num worker criado com fork
+            if publicador is None or not publicador.is_alive():
+                publicador = threading.Thread(
+                    target=publicar_em_segundo_plano, daemon=True
+                )
+                publicador.start()
+        publicacao_pendente.set()
+    return resposta
+
+@app.cli.command('compactar')
+def compactar_log():
+    """Incorpora o log de eventos ao snapshot (modo 'log')"""
+    if not isinstance(armazem, ArmazemLog):
+        raise click.ClickException(
+            'Compactação disponível apenas com SINUCA_ARMAZENAMENTO=log'
+        )
+    armazem.compactar()
+    click.echo(f'Log compactado: {len(armazem.partidas())} partidas no snapshot')
+
+@app.cli.command('migrar-log')
+def migrar_log():
+    """Converte historico.json do formato antigo para o modo 'log'"""
+    total = migrar_para_log(HISTORICO_FILE, HISTORICO_LOG_FILE)
+    click.echo(f'{total} partidas migradas; log de eventos em {HISTORICO_LOG_FILE}')
+
+@app.cli.command('migrar-datas')
+def migrar_datas():
+    """Grava a data ordenável (data_iso) nas partidas antigas"""
+    total = armazem.migrar_datas()
+    click.echo(f'Datas gravadas em {total} partidas')
+
+@app.cli.command('verificar-confrontos')
+def verificar_confrontos():
+    """Compara os confrontos incrementais com uma reconstrução completa"""
+    divergencias = armazem.verificar_confrontos()
+    for divergencia in divergencias:
+        click.echo(divergencia)
+    if divergencias:
+        raise click.ClickException(f'{len(divergencias)} divergências encontradas')
+    click.echo('Confrontos consistentes com o histórico')
+
+@app.cli.command('recalcular')
+@click.option(
+    '--verificar', is_flag=True, help='Apenas lista as diferenças, sem gravar.'
+)
+def recalcular(verificar):
+    """Recalcula as estatísticas dos jogadores a partir do histórico"""
+    diferencas = armazem.recalcular_estatisticas(gravar=not verificar)
+    for nome, campo, armazenado, recalculado in diferencas:
+        click.echo(f'{nome}: {campo} armazenado={armazenado} recalculado={recalculado}')
+    if not diferencas:
+        click.echo('Estatísticas consistentes com o histórico')
+    elif verificar:
+        raise click.ClickException(f'{len(diferencas)} diferenças encontradas')
+    else:
+        click.echo(f'{len(diferencas)} diferenças corrigidas')
+
+@app.cli.command('ratings')
+@click.option(
+    '--aplicar-rank', is_flag=True,
+    help='Grava o rank sugerido pelo rating em cada jogador.'
+)
+def ratings(aplicar_rank):
+    """Reprocessa o histórico e mostra o rating Elo de cada jogador"""
+    elo = armazem.ratings()
+    for nome, rating in elo.classificacao():
+        click.echo(f'{rating:7.1f}  {elo.rank(nome)}  {nome}')
+    if aplicar_rank:
+        def alterar(jogadores):
+            for nome, dados in jogadores.items():
+                dados['rank'] = elo.rank(nome)
+            return len(jogadores)
+        total = armazem.alterar_jogadores(alterar)
+        click.echo(f'Rank atualizado para {total} jogadores')
+
+@app.cli.command('converter')
+@click.argument('origem', type=click.Choice(['json', 'log', 'sqlite']))
+@click.argument('destino', type=click.Choice(['json', 'log', 'sqlite']))
+def converter_armazenamento(origem, destino):
+    """Copia jogadores e partidas entre armazenamentos (ex.: json sqlite)"""
+    if origem == destino:
+        raise click.ClickException('Origem e destino devem ser diferentes')
+    total_jogadores, total_partidas = converter(
+        abrir_armazem(origem), abrir_armazem(destino)
+    )
+    click.echo(
+        f'{total_jogadores} jogadores e {total_partidas} partidas copiados'
+        f' de {origem} para {destino}'
+    )
+
+def abrir_texto(caminho, modo):
+    """Abre um arquivo CSV/JSONL em UTF-8; '-' é a entrada/saída padrão"""
+    if caminho == '-':
+        return click.open_file('-', modo)
+    return open(caminho, modo, encoding='utf-8', newline='')
+
+@app.cli.command('importar-partidas')
+@click.argument(
+    'arquivo', type=click.Path(exists=True, dir_okay=False, allow_dash=True)
+)
+@click.option(
+    '--formato', type=click.Choice(FORMATOS),
+    help='Padrão: deduzido da extensão do arquivo.'
+)
+@click.option(
+    '--criar-jogadores', is_flag=True, help='Aceita jogadores que ainda não existem.'
+)
+@click.option(
+    '--ignorar-erros', is_flag=True,
+    help='Importa as linhas válidas mesmo se outras tiverem erro.'
+)
+def importar_partidas(arquivo, formato, criar_jogadores, ignorar_erros):
+    """Importa partidas de um CSV ou JSON Lines numa única gravação"""
+    with abrir_texto(arquivo, 'r') as f:
+        partidas, erros = importar(
+            f, formato_do_arquivo(arquivo, formato), armazem.jogadores(),
+            criar_jogadores
+        )
+    for numero, erro in erros:
+        click.echo(f'Linha {numero}: {erro}', err=True)
+    if erros and not ignorar_erros:
+        raise click.ClickException(
+            f'{len(erros)} linhas com erro, nada foi importado (use --ignorar-erros)'
+        )
+    
+    ids = armazem.registrar_partidas(partidas)
+    if ids:
+        click.echo(f'{len(ids)} partidas importadas (ids {ids[0]} a {ids[-1]})')
+    else:
+        click.echo('Nenhuma partida importada')
+
+@app.cli.command('exportar-partidas')
+@click.argument(
+    'arquivo', type=click.Path(dir_okay=False, allow_dash=True), default='-'
+)
+@click.option(
+    '--formato', type=click.Choice(FORMATOS),
+    help='Padrão: deduzido da extensão do arquivo.'
+)
+def exportar_partidas(arquivo, formato):
+    """Exporta o histórico em ordem cronológica para CSV ou JSON Lines"""
+    with abrir_texto(arquivo, 'w') as f:
+        total = exportar(
+            armazem.iterar_cronologico(), f, formato_do_arquivo(arquivo, formato)
+        )
+    if arquivo != '-':
+        click.echo(f'{total} partidas exportadas para {arquivo}')
+
+@app.cli.command('publicar-paginas')
+def publicar_paginas_estaticas():
+    """Gera as páginas públicas em SINUCA_PAGINAS_ESTATICAS"""
+    if paginas_estaticas is None:
+        raise click.ClickException(
+            'Defina SINUCA_PAGINAS_ESTATICAS com a pasta de destino'
+        )
+    total = publicar_paginas()
+    click.echo(f'{total} páginas gravadas em {PASTA_ESTATICA}')
+
+@app.cli.command('preflight')
+@click.option(
+    '--verificar', is_flag=True,
+    help='Confere também as estatísticas gravadas com o histórico.'
+)
+def executar_preflight(verificar):
+    """Mede o aquecimento feito na inicialização de cada worker"""
+    tempos, diferencas = preflight(verificar)
+    for etapa, segundos in tempos:
+        click.echo(f'{etapa:<12} {segundos * 1000:8.1f} ms')
+    total = sum(segundos for _, segundos in tempos)
+    click.echo(f'{"total":<12} {total * 1000:8.1f} ms')
+    for nome, campo, armazenado, recalculado in diferencas:
+        click.echo(f'{nome}: {campo} armazenado={armazenado} recalculado={recalculado}')
+    if diferencas:
+        raise click.ClickException(
+            f'{len(diferencas)} diferenças encontradas (use "flask recalcular")'
+        )
+
+if __name__ == '__main__':
+    preparar_app().run(host='0.0.0.0', port=5000, debug=True)
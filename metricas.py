@@ -0,0 +1,182 @@
+"""Métricas de latência por rota e por etapa (formato de texto do Prometheus)
+
+Desativadas por padrão. Com `instrumentar(app)` (SINUCA_METRICAS=1) cada
+requisição é medida por rota, e as etapas caras marcadas com `medir(...)`
+(leitura e gravação dos arquivos, anexação ao log, transações do SQLite,
+ordenação do ranking e renderização de templates) alimentam histogramas
+exportados em /metrics. Desativado, `medir` devolve sempre o mesmo contexto
+vazio, sem relógio nem trava.
+
+Cada processo (worker do gunicorn) tem as suas próprias métricas.
+
+Opcionalmente, com `perfil_lento_ms`, cada requisição roda sob o cProfile e
+as que passarem do limite têm o perfil gravado em `pasta_perfis` (um .prof
+por requisição, para abrir com `python -m pstats` ou snakeviz).
+"""
+import bisect
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Limites superiores (segundos) dos baldes dos histogramas
+BALDES = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+AJUDA = {
+    'sinuca_requisicao_segundos': 'Duração das requisições por rota.',
+    'sinuca_etapa_segundos':
+        'Duração das etapas internas (disco, ordenação, templates).',
+}
+
+_NADA = nullcontext()
+
+
+class Histograma:
+    """Contagens por balde, soma e total de observações"""
+
+    __slots__ = ('contagens', 'soma', 'total')
+
+    def __init__(self, baldes):
+        self.contagens = [0] * len(baldes)
+        self.soma = 0.0
+        self.total = 0
+
+
+class Metricas:
+    """Histogramas de latência identificados por nome e rótulos"""
+
+    def __init__(self, baldes=BALDES):
+        self.baldes = baldes
+        self.ativo = False
+        self._histogramas = {}  # (nome, ((rótulo, valor), ...)) -> Histograma
+        self._lock = threading.Lock()
+
+    def observar(self, nome, segundos, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma(self.baldes)
+            posicao = bisect.bisect_left(self.baldes, segundos)
+            if posicao < len(self.baldes):
+                histograma.contagens[posicao] += 1
+            histograma.soma += segundos
+            histograma.total += 1
+
+    @contextmanager
+    def _cronometrar(self, nome, rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def medir(self, etapa, **rotulos):
+        """Contexto que mede uma etapa (não faz nada se desativado)"""
+        if not self.ativo:
+            return _NADA
+        return self._cronometrar('sinuca_etapa_segundos', {'etapa': etapa, **rotulos})
+
+    def zerar(self):
+        with self._lock:
+            self._histogramas.clear()
+
+    def texto(self):
+        """Histogramas no formato de exposição em texto do Prometheus"""
+        with self._lock:
+            itens = sorted(
+                (chave, list(h.contagens), h.soma, h.total)
+                for chave, h in self._histogramas.items()
+            )
+        linhas = []
+        nome_anterior = None
+        for (nome, rotulos), contagens, soma, total in itens:
+            if nome != nome_anterior:
+                linhas.append(f'# HELP {nome} {AJUDA.get(nome, nome)}')
+                linhas.append(f'# TYPE {nome} histogram')
+                nome_anterior = nome
+            acumulado = 0
+            for limite, contagem in zip(self.baldes, contagens, strict=True):
+                acumulado += contagem
+                rotulo = _rotulos(rotulos, le=repr(limite))
+                linhas.append(f'{nome}_bucket{rotulo} {acumulado}')
+            linhas.append(f'{nome}_bucket{_rotulos(rotulos, le="+Inf")} {total}')
+            linhas.append(f'{nome}_sum{_rotulos(rotulos)} {soma:.6f}')
+            linhas.append(f'{nome}_count{_rotulos(rotulos)} {total}')
+        return '\n'.join(linhas) + '\n'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(rotulos, **extras):
+    pares = list(rotulos) + list(extras.items())
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+# Instância do processo, usada pelo armazenamento e pela aplicação
+metricas = Metricas()
+medir = metricas.medir
+
+
+def instrumentar(app, perfil_lento_ms=0, pasta_perfis='perfis'):
+    """Ativa as métricas e registra os hooks de requisição e de templates em `app`"""
+    from flask import before_render_template, g, request, template_rendered
+
+    metricas.ativo = True
+    if perfil_lento_ms:
+        os.makedirs(pasta_perfis, exist_ok=True)
+
+    @app.before_request
+    def _iniciar_medicao():
+        g.inicio_requisicao = time.perf_counter()
+        if perfil_lento_ms:
+            g.perfil = cProfile.Profile()
+            g.perfil.enable()
+
+    @app.after_request
+    def _registrar_medicao(resposta):
+        inicio = g.pop('inicio_requisicao', None)
+        if inicio is None:
+            return resposta
+        duracao = time.perf_counter() - inicio
+        rota = request.url_rule.rule if request.url_rule else 'desconhecida'
+        metricas.observar('sinuca_requisicao_segundos', duracao,
+                          rota=rota, metodo=request.method, status=resposta.status_code)
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.disable()
+            if duracao * 1000 >= perfil_lento_ms:
+                nome = (
+                    f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}'
+                    f'-{request.endpoint}-{duracao * 1000:.0f}ms.prof'
+                )
+                perfil.dump_stats(os.path.join(pasta_perfis, nome))
+        return resposta
+
+    @app.teardown_request
+    def _descartar_perfil(_erro=None):
+        # Requisições que terminaram em exceção não passam por after_request
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.disable()
+
+    def _iniciar_template(_app, **_extras):
+        g.setdefault('inicio_templates', []).append(time.perf_counter())
+
+    def _registrar_template(_app, template, **_extras):
+        inicios = g.get('inicio_templates')
+        if inicios:
+            metricas.observar(
+                'sinuca_etapa_segundos', time.perf_counter() - inicios.pop(),
+                etapa='render_template', alvo=template.name
+            )
+
+    before_render_template.connect(_iniciar_template, app, weak=False)
+    template_rendered.connect(_registrar_template, app, weak=False)
@@ -0,0 +1,192 @@
+"""Modelo compacto de uma partida MD3
+
+`Partida` guarda o resultado (lado vencedor, placar e Dobro ou Nada) num
+único inteiro, em vez dos campos 'vencedor', 'placar', 'valor', 'dobro_nada' e
+'tipo' do dict de historico.json. É o formato usado na validação dos
+formulários e da importação (`Partida.do_md3`) e nos laços que percorrem as
+partidas de um jogador (perfil, estatísticas avançadas); o armazenamento
+continua gravando dicts (`Partida.como_dict`).
+"""
+
+VALOR_NORMAL = 10
+VALOR_DOBRO_NADA = 20
+
+# Bits de `Partida.resultado`
+VENCEU_JOGADOR2 = 1
+PLACAR_2_1 = 2
+DOBRO_NADA = 4
+
+PLACARES = ('2-0', '2-1')
+PLACARES_DERROTA = ('0-2', '1-2')
+
+
+LADOS = ('jogador1', 'jogador2')
+
+
+def resultado_md3(vencedor_partida1, vencedor_partida2, vencedor_partida3='nao_jogada'):
+    """Lado vencedor ('jogador1' ou 'jogador2') e placar de uma melhor de 3
+
+    Cada partida é vencida por 'jogador1' ou 'jogador2'; a terceira pode ser
+    'nao_jogada'. Resultados impossíveis lançam ValueError com a mensagem
+    exibida ao usuário.
+    """
+    if vencedor_partida1 not in LADOS or vencedor_partida2 not in LADOS:
+        raise ValueError('Informe o vencedor das duas primeiras partidas!')
+    if vencedor_partida3 not in LADOS + ('nao_jogada',):
+        raise ValueError('Vencedor da terceira partida inválido!')
+
+    vitorias_j1 = 0
+    vitorias_j2 = 0
+    for vencedor in (vencedor_partida1, vencedor_partida2):
+        if vencedor == 'jogador1':
+            vitorias_j1 += 1
+        else:
+            vitorias_j2 += 1
+
+    # Se não houve partida 3, alguém deve ter vencido 2-0
+    if vencedor_partida3 == 'nao_jogada':
+        if vitorias_j1 == 2:
+            return 'jogador1', '2-0'
+        if vitorias_j2 == 2:
+            return 'jogador2', '2-0'
+        raise ValueError('Se não houve terceira partida, alguém deve ter vencido 2-0!')
+
+    # A terceira partida só existe depois de um 1-1
+    if vitorias_j1 == 2 or vitorias_j2 == 2:
+        raise ValueError('Não há terceira partida depois de um 2-0!')
+    return vencedor_partida3, '2-1'
+
+
+class Partida:
+    """Partida MD3 com o resultado codificado nos bits de `resultado`"""
+
+    __slots__ = ('id', 'data', 'jogador1', 'jogador2', 'resultado')
+
+    def __init__(self, data, jogador1, jogador2, resultado=0, id=None):
+        self.id = id
+        self.data = data
+        self.jogador1 = jogador1
+        self.jogador2 = jogador2
+        self.resultado = resultado
+
+    @classmethod
+    def com_vencedor(cls, data, jogador1, jogador2, vencedor, placar, dobro_nada=False,
+                     id=None):
+        """Partida a partir do vencedor e do placar ('2-0' ou '2-1'), sem validar"""
+        resultado = (
+            (VENCEU_JOGADOR2 if vencedor != jogador1 else 0)
+            | (PLACAR_2_1 if placar == '2-1' else 0)
+            | (DOBRO_NADA if dobro_nada else 0)
+        )
+        return cls(data, jogador1, jogador2, resultado, id)
+
+    @classmethod
+    def do_md3(cls, data, jogador1, jogador2, vencedor_partida1, vencedor_partida2,
+               vencedor_partida3='nao_jogada', dobro_nada=False):
+        """Valida o formulário de /add e /editar_partida (ver `resultado_md3`)"""
+        if not jogador1 or not jogador2:
+            raise ValueError('Por favor, selecione ambos os jogadores!')
+        if jogador1 == jogador2:
+            raise ValueError('Os jogadores devem ser diferentes!')
+        lado, placar = resultado_md3(
+            vencedor_partida1, vencedor_partida2, vencedor_partida3
+        )
+        vencedor = jogador1 if lado == 'jogador1' else jogador2
+        return cls.com_vencedor(data, jogador1, jogador2, vencedor, placar, dobro_nada)
+
+    @classmethod
+    def de_dict(cls, partida):
+        """Converte uma partida de historico.json (placar ausente conta como 2-0)"""
+        jogador1 = partida['jogador1']
+        resultado = 0 if partida['vencedor'] == jogador1 else VENCEU_JOGADOR2
+        if partida.get('placar') == '2-1':
+            resultado |= PLACAR_2_1
+        if partida.get('dobro_nada') or partida.get('valor') == VALOR_DOBRO_NADA:
+            resultado |= DOBRO_NADA
+        return cls(
+            partida.get('data'), jogador1, partida['jogador2'], resultado,
+            partida.get('id')
+        )
+
+    @property
+    def vencedor(self):
+        return self.jogador2 if self.resultado & VENCEU_JOGADOR2 else self.jogador1
+
+    @property
+    def perdedor(self):
+        return self.jogador1 if self.resultado & VENCEU_JOGADOR2 else self.jogador2
+
+    @property
+    def placar(self):
+        return PLACARES[1 if self.resultado & PLACAR_2_1 else 0]
+
+    @property
+    def dobro_nada(self):
+        return bool(self.resultado & DOBRO_NADA)
+
+    @property
+    def valor(self):
+        return VALOR_DOBRO_NADA if self.resultado & DOBRO_NADA else VALOR_NORMAL
+
+    @property
+    def tipo(self):
+        return 'Dobro ou Nada' if self.resultado & DOBRO_NADA else 'Normal'
+
+    def para(self, nome):
+        """(oponente, vitória, placar, dobro_nada, valor) do ponto de vista de `nome`
+
+        O placar fica invertido ('0-2', '1-2') nas derrotas.
+        """
+        if nome == self.jogador1:
+            return (self.jogador2,) + _VISTAS[self.resultado << 1]
+        return (self.jogador1,) + _VISTAS[self.resultado << 1 | 1]
+
+    def como_dict(self):
+        """Partida no formato de historico.json ('id' só se já tiver um)"""
+        partida = {
+            'data': self.data,
+            'jogador1': self.jogador1,
+            'jogador2': self.jogador2,
+            'vencedor': self.vencedor,
+            'placar': self.placar,
+            'valor': self.valor,
+            'dobro_nada': self.dobro_nada,
+            'tipo': self.tipo
+        }
+        if self.id is not None:
+            partida = {'id': self.id, **partida}
+        return partida
+
+    def __eq__(self, outra):
+        if not isinstance(outra, Partida):
+            return NotImplemented
+        return (self.id, self.data, self.jogador1, self.jogador2, self.resultado) == (
+            outra.id, outra.data, outra.jogador1, outra.jogador2, outra.resultado
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (
+            f'Partida({self.id!r}, {self.data!r},'
+            f' {self.vencedor!r} {self.placar} {self.perdedor!r})'
+        )
+
+
+def _vista(resultado, jogador2):
+    vitoria = bool(resultado & VENCEU_JOGADOR2) == jogador2
+    placares = PLACARES if vitoria else PLACARES_DERROTA
+    dobro_nada = bool(resultado & DOBRO_NADA)
+    return (
+        vitoria,
+        placares[1 if resultado & PLACAR_2_1 else 0],
+        dobro_nada,
+        VALOR_DOBRO_NADA if dobro_nada else VALOR_NORMAL
+    )
+
+
+# (vitória, placar, dobro_nada, valor) para cada `resultado` (índice
+# resultado * 2, mais 1 do ponto de vista do jogador2)
+_VISTAS = tuple(
+    _vista(resultado, jogador2) for resultado in range(8) for jogador2 in (False, True)
+)
@@ -0,0 +1,102 @@
+"""Motor de rating Elo para o ranking de sinuca
+
+Módulo independente do Flask: recebe partidas no formato de historico.json
+(dicts com 'vencedor', 'jogador1' e 'jogador2') e pode ser usado em scripts:
+
+    from rating import Elo
+    elo = Elo.reprocessar(partidas)
+    elo.rating('dudu habibs'), elo.rank('dudu habibs')
+"""
+
+RATING_INICIAL = 1500.0
+FATOR_K = 32.0
+
+# Rating mínimo de cada rank (mesmas letras de calcular_rank)
+FAIXAS_RANK = (
+    (1650, 'S'),
+    (1575, 'A'),
+    (1500, 'B'),
+    (1425, 'C'),
+)
+
+
+def rank_por_rating(rating):
+    """Converte um rating na letra de rank (S, A, B, C, D)"""
+    for minimo, rank in FAIXAS_RANK:
+        if rating >= minimo:
+            return rank
+    return 'D'
+
+
+def probabilidade_vitoria(rating, rating_oponente):
+    """Probabilidade esperada de vitória pelo modelo Elo"""
+    return 1.0 / (1.0 + 10.0 ** ((rating_oponente - rating) / 400.0))
+
+
+class Elo:
+    """Ratings Elo por jogador, atualizados partida a partida"""
+
+    def __init__(self, k=FATOR_K, inicial=RATING_INICIAL):
+        self.k = k
+        self.inicial = inicial
+        self.ratings = {}
+        self.partidas = 0
+
+    def rating(self, nome):
+        return self.ratings.get(nome, self.inicial)
+
+    def rank(self, nome):
+        return rank_por_rating(self.rating(nome))
+
+    def registrar(self, vencedor, perdedor):
+        """Atualiza os dois jogadores e retorna os pontos transferidos"""
+        rating_vencedor = self.ratings.get(vencedor, self.inicial)
+        rating_perdedor = self.ratings.get(perdedor, self.inicial)
+        delta = self.k * (1.0 - probabilidade_vitoria(rating_vencedor, rating_perdedor))
+        self.ratings[vencedor] = rating_vencedor + delta
+        self.ratings[perdedor] = rating_perdedor - delta
+        self.partidas += 1
+        return delta
+
+    def registrar_partida(self, partida):
+        vencedor = partida['vencedor']
+        jogador1 = partida['jogador1']
+        perdedor = partida['jogador2'] if vencedor == jogador1 else jogador1
+        return self.registrar(vencedor, perdedor)
+
+    @classmethod
+    def reprocessar(cls, partidas, k=FATOR_K, inicial=RATING_INICIAL):
+        """Recalcula todos os ratings a partir do histórico (ordem cronológica)
+
+        Os nomes são convertidos em índices e o laço trabalha sobre uma lista
+        de floats. O Elo é sequencial por natureza (cada partida depende do
+        resultado das anteriores), então vetorizar com NumPy exigiria dividir
+        o histórico em lotes sem jogadores repetidos, que têm poucas partidas
+        em ligas pequenas; na prática esse laço é mais rápido.
+        """
+        elo = cls(k, inicial)
+        indices = {}
+        vencedores = []
+        perdedores = []
+        for partida in partidas:
+            vencedor = partida['vencedor']
+            jogador1 = partida['jogador1']
+            perdedor = partida['jogador2'] if vencedor == jogador1 else jogador1
+            vencedores.append(indices.setdefault(vencedor, len(indices)))
+            perdedores.append(indices.setdefault(perdedor, len(indices)))
+
+        ratings = [float(inicial)] * len(indices)
+        for v, p in zip(vencedores, perdedores, strict=True):
+            rating_vencedor = ratings[v]
+            rating_perdedor = ratings[p]
+            delta = k / (1.0 + 10.0 ** ((rating_vencedor - rating_perdedor) / 400.0))
+            ratings[v] = rating_vencedor + delta
+            ratings[p] = rating_perdedor - delta
+
+        elo.ratings = dict(zip(indices, ratings, strict=True))
+        elo.partidas = len(vencedores)
+        return elo
+
+    def classificacao(self):
+        """Lista (nome, rating) do maior para o menor rating"""
+        return sorted(self.ratings.items(), key=lambda item: item[1], reverse=True)
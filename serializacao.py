@@ -0,0 +1,76 @@
+"""Serialização dos arquivos de dados (JSON e JSON Lines)
+
+Usa o orjson quando instalado (`pip install orjson`, bem mais rápido e sem
+dependências) e cai para o módulo json da biblioteca padrão caso contrário;
+os dois produzem arquivos equivalentes e leem os arquivos um do outro.
+
+Por padrão os arquivos são gravados compactos (sem indentação), o que reduz
+o tamanho e o tempo de gravação; com `configurar(legivel=True)`
+(SINUCA_JSON_LEGIVEL=1) voltam a ser indentados para leitura humana.
+Arquivos a partir de `LIMITE_MMAP` bytes são lidos por mmap quando o orjson
+está disponível, sem a cópia intermediária para um buffer do Python.
+"""
+import json
+import mmap
+import os
+
+try:
+    import orjson
+except ImportError:  # Sem orjson: biblioteca padrão
+    orjson = None
+
+LIMITE_MMAP = 1 << 20  # 1 MiB
+
+_config = {'motor': 'orjson' if orjson else 'json', 'legivel': False}
+
+
+def configurar(motor=None, legivel=False):
+    """Escolhe o motor ('orjson' ou 'json'; None = o mais rápido disponível)"""
+    if motor == 'orjson' and orjson is None:
+        raise ValueError('orjson não está instalado')
+    if motor not in (None, 'orjson', 'json'):
+        raise ValueError(f'Motor de JSON desconhecido: {motor}')
+    _config['motor'] = motor or ('orjson' if orjson else 'json')
+    _config['legivel'] = legivel
+
+
+def motor():
+    return _config['motor']
+
+
+def para_bytes(dados):
+    """Documento JSON em UTF-8, compacto ou indentado conforme a configuração"""
+    if _config['motor'] == 'orjson':
+        opcoes = orjson.OPT_INDENT_2 if _config['legivel'] else 0
+        return orjson.dumps(dados, option=opcoes)
+    if _config['legivel']:
+        return json.dumps(dados, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def linha(evento):
+    """Uma linha de JSON Lines (sempre compacta), com o '\\n' final"""
+    if _config['motor'] == 'orjson':
+        return orjson.dumps(evento, option=orjson.OPT_APPEND_NEWLINE)
+    texto = json.dumps(evento, ensure_ascii=False, separators=(',', ':'))
+    return (texto + '\n').encode('utf-8')
+
+
+def de_bytes(conteudo):
+    if _config['motor'] == 'orjson':
+        return orjson.loads(conteudo)
+    return json.loads(conteudo)
+
+
+def ler_arquivo(caminho):
+    """Lê um documento JSON; levanta OSError ou ValueError (inclusive se vazio)"""
+    with open(caminho, 'rb') as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        if _config['motor'] == 'orjson' and tamanho >= LIMITE_MMAP:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                visao = memoryview(mapa)
+                try:
+                    return orjson.loads(visao)
+                finally:
+                    visao.release()  # O mmap não fecha com buffers exportados
+        return de_bytes(f.read())
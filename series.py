@@ -0,0 +1,117 @@
+"""Séries temporais da evolução de cada jogador (saldo, aproveitamento, rating)
+
+`calcular_series` percorre o histórico uma única vez separando os resultados
+de cada jogador e calcula os acumulados com `itertools.accumulate`. O
+resultado (um ponto por partida) é mantido em cache pelo chamador; os pontos
+por dia/semana/mês e a redução para um número máximo de pontos são feitos
+sobre ele a cada consulta, em O(pontos do jogador).
+"""
+from datetime import date
+from itertools import accumulate
+
+from estatisticas import data_da_partida
+from rating import Elo
+
+AGRUPAMENTOS = ('partida', 'dia', 'semana', 'mes')
+
+
+def calcular_series(partidas, com_rating=False):
+    """Série acumulada de cada jogador, com um ponto por partida
+
+    Retorna nome -> {'ids', 'datas', 'saldo', 'aproveitamento', 'partidas'}
+    (mais 'rating' com `com_rating`), listas alinhadas em ordem cronológica.
+    `datas` está no formato 'aaaa-mm-dd hh:mm'.
+    """
+    elo = Elo() if com_rating else None
+    resultados = {}  # nome -> (ids, datas, deltas de saldo, vitórias 0/1, ratings)
+    for partida in partidas:
+        vencedor = partida['vencedor']
+        jogador1 = partida['jogador1']
+        perdedor = partida['jogador2'] if vencedor == jogador1 else jogador1
+        valor = partida['valor']
+        data = data_da_partida(partida) or ''
+        if elo is not None:
+            elo.registrar(vencedor, perdedor)
+        for nome, venceu in ((vencedor, 1), (perdedor, 0)):
+            listas = resultados.get(nome)
+            if listas is None:
+                listas = resultados[nome] = ([], [], [], [], [])
+            listas[0].append(partida['id'])
+            listas[1].append(data)
+            listas[2].append(valor if venceu else -valor)
+            listas[3].append(venceu)
+            if elo is not None:
+                listas[4].append(round(elo.ratings[nome], 1))
+
+    series = {}
+    for nome, (ids, datas, deltas, vitorias, ratings) in resultados.items():
+        serie = {
+            'ids': ids,
+            'datas': datas,
+            'saldo': list(accumulate(deltas)),
+            'aproveitamento': [
+                round(total * 100 / jogos, 1)
+                for jogos, total in enumerate(accumulate(vitorias), start=1)
+            ],
+            'partidas': list(range(1, len(ids) + 1)),
+        }
+        if elo is not None:
+            serie['rating'] = ratings
+        series[nome] = serie
+    return series
+
+
+def _periodo(data, agrupar, semanas):
+    """Chave do período de `data` ('aaaa-mm-dd hh:mm'): dia, mês ou semana ISO"""
+    if agrupar == 'dia':
+        return data[:10]
+    if agrupar == 'mes':
+        return data[:7]
+    dia = data[:10]
+    if dia not in semanas:
+        try:
+            ano, semana, _ = date.fromisoformat(dia).isocalendar()
+            semanas[dia] = f'{ano}-S{semana:02d}'
+        except ValueError:
+            semanas[dia] = dia
+    return semanas[dia]
+
+
+def reduzir(serie, agrupar='partida', max_pontos=None):
+    """Pontos de `serie` agrupados por período e limitados a `max_pontos`
+
+    Em cada período fica o último ponto (os valores são acumulados). Acima
+    de `max_pontos` são mantidos pontos igualmente espaçados, sempre
+    incluindo o primeiro e o último.
+    """
+    if agrupar not in AGRUPAMENTOS:
+        raise ValueError(f'Agrupamento desconhecido: {agrupar}')
+    datas = serie['datas']
+    if agrupar == 'partida':
+        rotulos = datas
+        indices = list(range(len(datas)))
+    else:
+        semanas = {}
+        chaves = [_periodo(data, agrupar, semanas) for data in datas]
+        # Último ponto de cada período
+        indices = [
+            i for i in range(len(chaves))
+            if i + 1 == len(chaves) or chaves[i + 1] != chaves[i]
+        ]
+        rotulos = chaves
+
+    if max_pontos and len(indices) > max_pontos:
+        if max_pontos == 1:
+            indices = indices[-1:]
+        else:
+            passo = (len(indices) - 1) / (max_pontos - 1)
+            indices = [indices[round(i * passo)] for i in range(max_pontos)]
+
+    reduzida = {'rotulos': [rotulos[i] for i in indices]}
+    for campo in ('saldo', 'aproveitamento', 'partidas', 'rating'):
+        if campo in serie:
+            valores = serie[campo]
+            reduzida[campo] = [valores[i] for i in indices]
+    if agrupar == 'partida':
+        reduzida['ids'] = [serie['ids'][i] for i in indices]
+    return reduzida
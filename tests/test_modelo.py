@@ -0,0 +1,103 @@
+"""Validação da MD3 (`Partida.do_md3`), conversão de/para dict e `Partida.para`"""
+import pytest
+
+from importacao import validar_registro
+from modelo import Partida
+
+DATA = '01/02/2025 20:00'
+
+
+@pytest.mark.parametrize('lados, vencedor, placar', [
+    (('jogador1', 'jogador1', 'nao_jogada'), 'ana', '2-0'),
+    (('jogador2', 'jogador2', 'nao_jogada'), 'bia', '2-0'),
+    (('jogador1', 'jogador2', 'jogador1'), 'ana', '2-1'),
+    (('jogador2', 'jogador1', 'jogador1'), 'ana', '2-1'),
+    (('jogador1', 'jogador2', 'jogador2'), 'bia', '2-1'),
+    (('jogador2', 'jogador1', 'jogador2'), 'bia', '2-1'),
+])
+def test_resultado_md3(lados, vencedor, placar):
+    partida = Partida.do_md3(DATA, 'ana', 'bia', *lados)
+    assert (partida.vencedor, partida.placar) == (vencedor, placar)
+    assert partida.perdedor == ({'ana', 'bia'} - {vencedor}).pop()
+    assert (partida.valor, partida.tipo) == (10, 'Normal')
+
+
+@pytest.mark.parametrize('lados', [
+    ('jogador1', 'jogador1', 'jogador2'),  # Terceira partida depois de um 2-0
+    ('jogador2', 'jogador2', 'jogador1'),
+    ('jogador1', 'jogador2', 'nao_jogada'),  # 1-1 sem terceira partida
+    ('jogador1', 'jogador2', 'jogador3'),
+    ('jogador1', '', 'nao_jogada'),
+])
+def test_md3_invalida(lados):
+    with pytest.raises(ValueError):
+        Partida.do_md3(DATA, 'ana', 'bia', *lados)
+
+
+@pytest.mark.parametrize('jogador1, jogador2, mensagem', [
+    ('ana', 'ana', 'Os jogadores devem ser diferentes!'),
+    ('ana', '', 'Por favor, selecione ambos os jogadores!'),
+])
+def test_jogadores_invalidos(jogador1, jogador2, mensagem):
+    with pytest.raises(ValueError, match=mensagem):
+        Partida.do_md3(DATA, jogador1, jogador2, 'jogador1', 'jogador1')
+
+
+@pytest.mark.parametrize('dobro_nada', [False, True])
+@pytest.mark.parametrize('lados', [
+    ('jogador1', 'jogador1'),
+    ('jogador2', 'jogador1', 'jogador2'),
+])
+def test_dict_ida_e_volta(lados, dobro_nada):
+    partida = Partida.do_md3(DATA, 'ana', 'bia', *lados, dobro_nada=dobro_nada)
+    partida.id = 7
+    dados = partida.como_dict()
+    assert dados['id'] == 7
+    assert dados['valor'] == (20 if dobro_nada else 10)
+    assert dados['dobro_nada'] is dobro_nada
+    assert Partida.de_dict(dados) == partida
+
+
+def test_de_dict_sem_placar():
+    partida = Partida.de_dict({'jogador1': 'ana', 'jogador2': 'bia', 'vencedor': 'bia'})
+    assert (partida.vencedor, partida.placar) == ('bia', '2-0')
+    assert not partida.dobro_nada
+    assert 'id' not in partida.como_dict()
+
+
+def test_para():
+    partida = Partida.do_md3(
+        DATA, 'ana', 'bia', 'jogador2', 'jogador1', 'jogador1', dobro_nada=True
+    )
+    assert partida.para('ana') == ('bia', True, '2-1', True, 20)
+    assert partida.para('bia') == ('ana', False, '1-2', True, 20)
+
+    partida = Partida.do_md3(DATA, 'ana', 'bia', 'jogador2', 'jogador2')
+    assert partida.para('ana') == ('bia', False, '0-2', False, 10)
+    assert partida.para('bia') == ('ana', True, '2-0', False, 10)
+
+
+@pytest.mark.parametrize('registro', [
+    {'jogador1': 'ana', 'jogador2': 'bia', 'vencedor_partida1': 'bia',
+     'vencedor_partida2': 'ana', 'vencedor_partida3': 'jogador2'},
+    {'jogador1': 'ana', 'jogador2': 'bia', 'vencedor': 'bia', 'placar': '2-1'},
+])
+def test_importar_como_md3(registro):
+    partida = validar_registro({'data': DATA, **registro}, {'ana': {}, 'bia': {}})
+    md3 = Partida.do_md3(DATA, 'ana', 'bia', 'jogador1', 'jogador2', 'jogador2')
+    assert partida == md3.como_dict()
+
+
+@pytest.mark.parametrize('registro, mensagem', [
+    ({'jogador1': 'ana', 'jogador2': 'ana', 'vencedor': 'ana', 'placar': '2-0'},
+     'devem ser diferentes'),
+    ({'jogador1': 'ana', 'jogador2': '', 'vencedor_partida1': 'jogador1'},
+     'selecione ambos'),
+    ({'jogador1': 'ana', 'jogador2': 'bia', 'vencedor_partida1': 'ana',
+      'vencedor_partida2': 'bia'}, '2-0'),
+    ({'jogador1': 'ana', 'jogador2': 'eva', 'vencedor': 'eva', 'placar': '2-0'},
+     'Jogador desconhecido'),
+])
+def test_importar_invalido(registro, mensagem):
+    with pytest.raises(ValueError, match=mensagem):
+        validar_registro(registro, {'ana': {}, 'bia': {}})
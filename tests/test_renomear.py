@@ -0,0 +1,77 @@
+"""Renomear um jogador e depois recalcular as estatísticas a partir do histórico"""
+import pytest
+
+from armazenamento import ArmazemAdiado, criar_armazem
+from estatisticas import novo_jogador
+from modelo import Partida
+
+MODOS = {
+    'json': ('json', {}),
+    'adiado': ('json', {'intervalo_ms': None}),
+    'log': ('log', {'compactar_a_cada': 0}),
+    'sqlite': ('sqlite', {}),
+}
+
+
+def abrir(pasta, nome_modo):
+    modo, opcoes = MODOS[nome_modo]
+    return criar_armazem(
+        modo, str(pasta / 'jogadores.json'), str(pasta / 'historico.json'),
+        str(pasta / 'historico.jsonl'), str(pasta / 'sinuca.db'), **opcoes
+    )
+
+
+def partida(jogador1, jogador2, vencedor):
+    return Partida.com_vencedor(
+        '01/02/2025 20:00', jogador1, jogador2, vencedor, '2-0', False
+    ).como_dict()
+
+
+@pytest.fixture(params=list(MODOS))
+def armazem(request, tmp_path):
+    armazem = abrir(tmp_path, request.param)
+    jogadores = {'ana': {**novo_jogador(), 'rank': 'S'}, 'bia': novo_jogador()}
+    armazem.substituir(jogadores, [])
+    armazem.registrar_partida(partida('ana', 'bia', 'ana'))
+    armazem.registrar_partida(partida('bia', 'ana', 'ana'))
+    armazem.registrar_partida(partida('ana', 'bia', 'bia'))
+    armazem.modo = request.param
+    armazem.pasta = tmp_path
+    return armazem
+
+
+def test_renomear_e_recalcular(armazem):
+    assert armazem.confrontos_do_jogador('ana')  # Agregados construídos antes
+    assert armazem.renomear_jogador('ana', 'ana paula')
+
+    assert armazem.recalcular_estatisticas(gravar=False) == []
+    armazem.recalcular_estatisticas()
+    jogadores = armazem.jogadores()
+    assert 'ana' not in jogadores
+    assert jogadores['ana paula']['vitorias'] == 2
+    assert jogadores['ana paula']['derrotas'] == 1
+    assert jogadores['ana paula']['rank'] == 'S'
+    confronto = armazem.confrontos_do_jogador('ana paula')['bia']
+    assert confronto == {'vitorias': 2, 'derrotas': 1, 'total': 3}
+    assert armazem.confrontos_do_jogador('ana') == {}
+    for p in armazem.partidas():
+        assert 'ana' not in (p['jogador1'], p['jogador2'], p['vencedor'])
+
+
+def test_renomear_visto_por_outro_processo(armazem):
+    outro = abrir(armazem.pasta, armazem.modo)
+    outro.jogadores()  # Worker que já tinha os dados em memória
+    assert armazem.renomear_jogador('ana', 'ana paula')
+    if isinstance(armazem, ArmazemAdiado):
+        armazem.descarregar()
+
+    for leitor in (outro, abrir(armazem.pasta, armazem.modo)):
+        assert leitor.recalcular_estatisticas(gravar=False) == []
+        assert leitor.jogador('ana paula')['vitorias'] == 2
+        assert leitor.jogador('ana') is None
+
+
+def test_renomear_para_nome_existente(armazem):
+    assert armazem.renomear_jogador('ana', 'bia') is False
+    assert armazem.renomear_jogador('carla', 'davi') is False
+    assert armazem.jogador('ana')['vitorias'] == 2
@@ -0,0 +1,74 @@
+"""Partidas de torneio no histórico e gravação de torneios.json"""
+import pytest
+
+from armazenamento import ArquivoJSON
+from estatisticas import novo_jogador
+from modelo import Partida
+from test_renomear import MODOS, abrir
+from torneios import ArmazemTorneios
+
+
+def de_torneio(partida):
+    if partida.get('torneio') is not None:
+        raise ValueError('Partidas de torneio não podem ser excluídas')
+
+
+@pytest.fixture(params=list(MODOS))
+def armazem(request, tmp_path):
+    armazem = abrir(tmp_path, request.param)
+    armazem.substituir({'ana': novo_jogador(), 'bia': novo_jogador()}, [])
+    return armazem
+
+
+@pytest.fixture
+def torneios(tmp_path):
+    return ArmazemTorneios(str(tmp_path / 'torneios.json'))
+
+
+def registrar(torneios, armazem):
+    torneio = torneios.criar('Semanal', 'eliminatoria', ['ana', 'bia'], '01/02/2025')
+    partida = Partida.do_md3('01/02/2025 20:00', 'ana', 'bia', 'jogador1', 'jogador1')
+    confronto = torneio.pendentes()[0]
+    torneios.registrar_resultado(
+        torneio.id, confronto['id'], partida, armazem.registrar_partida
+    )
+    return torneio.id, confronto['id']
+
+
+def test_excluir_partida_de_torneio(armazem, torneios):
+    registrar(torneios, armazem)
+    avulsa = Partida.do_md3('01/02/2025 21:00', 'ana', 'bia', 'jogador2', 'jogador2')
+    armazem.registrar_partida(avulsa.como_dict())
+    do_torneio, livre = armazem.partidas()
+
+    with pytest.raises(ValueError):
+        armazem.excluir_partida(do_torneio['id'], verificar=de_torneio)
+    assert armazem.partida(do_torneio['id']) is not None
+    assert armazem.jogador('ana')['vitorias'] == 1
+
+    assert armazem.excluir_partida(livre['id'], verificar=de_torneio)
+    assert armazem.excluir_partida(livre['id'], verificar=de_torneio) is False
+    assert armazem.recalcular_estatisticas(gravar=False) == []
+
+
+def test_gravacao_que_falha_nao_altera_o_torneio(torneios, monkeypatch):
+    torneio = torneios.criar('Semanal', 'eliminatoria', ['ana', 'bia'], '01/02/2025')
+    confronto = torneio.pendentes()[0]
+    partida = Partida.do_md3('01/02/2025 20:00', 'ana', 'bia', 'jogador1', 'jogador1')
+
+    def falhar(*_):
+        raise OSError('disco cheio')
+
+    def registrar_partida(_dados):
+        return 1
+
+    monkeypatch.setattr(ArquivoJSON, 'gravar', falhar)
+    with pytest.raises(OSError):
+        torneios.registrar_resultado(
+            torneio.id, confronto['id'], partida, registrar_partida
+        )
+    assert torneios.torneio(torneio.id).confronto(confronto['id'])['vencedor'] is None
+
+    with pytest.raises(OSError):
+        torneios.criar('Outro', 'eliminatoria', ['ana', 'bia'], '01/02/2025')
+    assert [t.id for t in torneios.torneios()] == [torneio.id]
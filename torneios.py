@@ -0,0 +1,415 @@
+"""Torneios: chaveamento, resultados e classificação
+
+Módulo independente do Flask (como rating.py). Formatos:
+
+- 'todos_contra_todos': todos os confrontos gerados de uma vez, em rodadas
+  (método do círculo); com número ímpar de jogadores um deles folga a cada
+  rodada;
+- 'eliminatoria': chave simples, com os cabeças de chave distribuídos como de
+  costume (1 x 8, 4 x 5, 2 x 7, 3 x 6) e folgas (byes) para os primeiros
+  quando o número de jogadores não é potência de 2;
+- 'dupla_eliminatoria': chave dos vencedores, chave dos perdedores e final,
+  com desempate se o campeão da chave dos perdedores vencer a final.
+
+A ordem de `jogadores` é a dos cabeças de chave (o ranking atual). Cada
+confronto é decidido por uma partida MD3 (`modelo.Partida`), registrada no
+histórico como qualquer outra. Ao registrar o resultado o vencedor (e, na
+dupla eliminatória, o perdedor) ocupa o seu lugar no confronto seguinte e a
+classificação é atualizada apenas com aquela partida, sem percorrer as
+demais.
+
+    from torneios import Torneio
+    torneio = Torneio.criar(1, 'Semanal', 'eliminatoria', nomes, '01/02/2025')
+    torneio.registrar_resultado(confronto['id'], partida)
+    torneio.classificacao.ordenada()
+"""
+import copy
+from itertools import groupby
+
+from armazenamento import ArquivoJSON, TravaArquivo
+
+FORMATOS = ('todos_contra_todos', 'eliminatoria', 'dupla_eliminatoria')
+
+FOLGA = ''  # Lado de um confronto sem adversário (bye)
+
+
+def ordem_cabecas_de_chave(tamanho):
+    """Posições (0 = primeiro cabeça de chave) na primeira rodada de uma chave
+
+    Para 8: [0, 7, 3, 4, 1, 6, 2, 5], isto é, 1 x 8, 4 x 5, 2 x 7 e 3 x 6; os
+    dois primeiros só se encontram na final.
+    """
+    ordem = [0]
+    while len(ordem) < tamanho:
+        soma = 2 * len(ordem) - 1
+        ordem = [posicao for cabeca in ordem for posicao in (cabeca, soma - cabeca)]
+    return ordem
+
+
+def rodadas_todos_contra_todos(jogadores):
+    """Rodadas de pares (método do círculo); pares com FOLGA ficam de fora"""
+    lista = list(jogadores) + ([FOLGA] if len(jogadores) % 2 else [])
+    total = len(lista)
+    rodadas = []
+    for _ in range(total - 1):
+        pares = [(lista[i], lista[total - 1 - i]) for i in range(total // 2)]
+        rodadas.append([par for par in pares if FOLGA not in par])
+        lista = [lista[0], lista[-1]] + lista[1:-1]
+    return rodadas
+
+
+class Classificacao:
+    """Vitórias, derrotas, saldo e confrontos diretos, atualizados a cada resultado
+
+    Ordem: nas eliminatórias, quem continua vivo e depois quem caiu mais
+    adiante (`eliminado_em`); então vitórias e, entre os empatados, vitórias
+    nos confrontos diretos entre eles e saldo.
+    """
+
+    def __init__(self, jogadores, vidas=None):
+        self.vidas = vidas  # Derrotas até a eliminação (None: todos contra todos)
+        self.linhas = {
+            nome: {
+                'jogos': 0, 'vitorias': 0, 'derrotas': 0, 'saldo': 0,
+                'eliminado_em': None
+            }
+            for nome in jogadores
+        }
+        self._vitorias_sobre = {}  # (vencedor, perdedor) -> vitórias
+
+    def registrar(self, vencedor, perdedor, valor, fase=0):
+        linha = self.linhas[vencedor]
+        linha['jogos'] += 1
+        linha['vitorias'] += 1
+        linha['saldo'] += valor
+        linha = self.linhas[perdedor]
+        linha['jogos'] += 1
+        linha['derrotas'] += 1
+        linha['saldo'] -= valor
+        if self.vidas and linha['derrotas'] >= self.vidas:
+            linha['eliminado_em'] = fase
+        par = (vencedor, perdedor)
+        self._vitorias_sobre[par] = self._vitorias_sobre.get(par, 0) + 1
+
+    def _chave(self, nome):
+        linha = self.linhas[nome]
+        eliminado_em = linha['eliminado_em']
+        return (eliminado_em is None, eliminado_em or 0, linha['vitorias'])
+
+    def ordenada(self):
+        """Linhas da classificação com 'posicao' e 'nome', da primeira à última"""
+        nomes = sorted(self.linhas, key=self._chave, reverse=True)
+        ordem = []
+        for _, grupo in groupby(nomes, key=self._chave):
+            grupo = list(grupo)
+            if len(grupo) > 1:
+                vitorias_sobre = self._vitorias_sobre
+                diretos = {
+                    nome: sum(vitorias_sobre.get((nome, outro), 0) for outro in grupo)
+                    for nome in grupo
+                }
+                grupo.sort(
+                    key=lambda nome: (-diretos[nome], -self.linhas[nome]['saldo'], nome)
+                )
+            ordem.extend(grupo)
+        return [
+            {'posicao': posicao, 'nome': nome, **self.linhas[nome]}
+            for posicao, nome in enumerate(ordem, 1)
+        ]
+
+
+class Torneio:
+    """Confrontos de um torneio (dicts, gravados em torneios.json) e classificação"""
+
+    def __init__(self, id, nome, formato, jogadores, data, confrontos=None):
+        self.id = id
+        self.nome = nome
+        self.formato = formato
+        self.jogadores = list(jogadores)
+        self.data = data
+        self.confrontos = confrontos if confrontos is not None else []
+        vidas = {'eliminatoria': 1, 'dupla_eliminatoria': 2}.get(formato)
+        self.classificacao = Classificacao(self.jogadores, vidas)
+
+    @classmethod
+    def criar(cls, id, nome, formato, jogadores, data):
+        """Novo torneio com os confrontos gerados
+
+        `jogadores` em ordem de cabeça de chave.
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f'Formato de torneio desconhecido: {formato}')
+        if len(jogadores) < 2:
+            raise ValueError('O torneio precisa de pelo menos 2 jogadores!')
+        if len(set(jogadores)) != len(jogadores) or FOLGA in jogadores:
+            raise ValueError('Os jogadores do torneio devem ser diferentes e ter nome!')
+        torneio = cls(id, nome, formato, jogadores, data)
+        if formato == 'todos_contra_todos':
+            rodadas = rodadas_todos_contra_todos(jogadores)
+            for rodada, pares in enumerate(rodadas, start=1):
+                for jogador1, jogador2 in pares:
+                    confronto = torneio._novo_confronto('todos', rodada)
+                    confronto['jogadores'] = [jogador1, jogador2]
+        else:
+            torneio._gerar_chaves(dupla=formato == 'dupla_eliminatoria')
+        return torneio
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Torneio de torneios.json; a classificação é refeita pelos resultados"""
+        torneio = cls(
+            dados['id'], dados['nome'], dados['formato'], dados['jogadores'],
+            dados.get('data'), dados['confrontos']
+        )
+        for confronto in torneio.confrontos:
+            vencedor = confronto['vencedor']
+            if vencedor and FOLGA not in confronto['jogadores']:
+                perdedor = confronto['jogadores'][confronto['jogadores'][0] == vencedor]
+                torneio.classificacao.registrar(
+                    vencedor, perdedor, confronto['valor'], confronto['fase']
+                )
+        return torneio
+
+    def copia(self):
+        """Cópia independente (confrontos e classificação), alterável sem afetar esta"""
+        return copy.deepcopy(self)
+
+    def como_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'formato': self.formato,
+            'jogadores': self.jogadores,
+            'data': self.data,
+            'confrontos': self.confrontos,
+        }
+
+    def _novo_confronto(self, chave, rodada, fase=0):
+        confronto = {
+            'id': len(self.confrontos),
+            'chave': chave,
+            'rodada': rodada,
+            # Ordem de eliminação: quem cai numa fase maior fica à frente
+            'fase': fase,
+            # None: ainda não definido; FOLGA: sem adversário
+            'jogadores': [None, None],
+            'vencedor': None,
+            'placar': None,
+            'valor': None,
+            'partida': None,  # Id da partida no histórico
+            'vencedor_vai': None,  # [id do confronto, lado]
+            'perdedor_vai': None,
+        }
+        self.confrontos.append(confronto)
+        return confronto
+
+    def _nova_rodada(self, chave, rodada, fase, quantidade):
+        return [self._novo_confronto(chave, rodada, fase) for _ in range(quantidade)]
+
+    def _gerar_chaves(self, dupla):
+        """Gera a chave dos vencedores e, na dupla eliminatória, a dos perdedores
+        e a final
+
+        Na chave dos perdedores, a rodada 1 recebe os perdedores da primeira
+        rodada; depois alternam rodadas que recebem os perdedores da rodada
+        seguinte da chave dos vencedores (em ordem invertida, para adiar
+        revanches) e rodadas entre os sobreviventes.
+        """
+        tamanho = 1 << (len(self.jogadores) - 1).bit_length()
+        rodadas = tamanho.bit_length() - 1
+        fases_perdedores = 2 * rodadas - 2 if dupla else 0
+
+        vencedores = [
+            self._nova_rodada(
+                'vencedores', rodada, 0 if dupla else rodada, tamanho >> rodada
+            )
+            for rodada in range(1, rodadas + 1)
+        ]
+        for rodada in range(rodadas - 1):
+            for i, confronto in enumerate(vencedores[rodada]):
+                proximo = vencedores[rodada + 1][i // 2]
+                confronto['vencedor_vai'] = [proximo['id'], i % 2]
+
+        if dupla:
+            perdedores = []
+            if rodadas >= 2:
+                perdedores.append(self._nova_rodada('perdedores', 1, 1, tamanho >> 2))
+                for i, confronto in enumerate(vencedores[0]):
+                    confronto['perdedor_vai'] = [perdedores[0][i // 2]['id'], i % 2]
+                for rodada in range(2, rodadas + 1):
+                    numero = len(perdedores) + 1
+                    recebe = self._nova_rodada(
+                        'perdedores', numero, numero, tamanho >> rodada
+                    )
+                    for i, confronto in enumerate(perdedores[-1]):
+                        confronto['vencedor_vai'] = [recebe[i]['id'], 0]
+                    for i, confronto in enumerate(vencedores[rodada - 1]):
+                        destino = recebe[len(recebe) - 1 - i]
+                        confronto['perdedor_vai'] = [destino['id'], 1]
+                    perdedores.append(recebe)
+                    if rodada < rodadas:
+                        numero += 1
+                        sobreviventes = self._nova_rodada(
+                            'perdedores', numero, numero, tamanho >> (rodada + 1)
+                        )
+                        for i, confronto in enumerate(recebe):
+                            destino = sobreviventes[i // 2]
+                            confronto['vencedor_vai'] = [destino['id'], i % 2]
+                        perdedores.append(sobreviventes)
+            final = self._novo_confronto('final', 1, fases_perdedores + 1)
+            vencedores[-1][0]['vencedor_vai'] = [final['id'], 0]
+            if perdedores:
+                perdedores[-1][0]['vencedor_vai'] = [final['id'], 1]
+            else:  # Dois jogadores: o perdedor da chave vai direto à final
+                vencedores[-1][0]['perdedor_vai'] = [final['id'], 1]
+
+        ordem = ordem_cabecas_de_chave(tamanho)
+        for i, confronto in enumerate(vencedores[0]):
+            for lado in (0, 1):
+                cabeca = ordem[2 * i + lado]
+                nome = self.jogadores[cabeca] if cabeca < len(self.jogadores) else FOLGA
+                self._ocupar(confronto, lado, nome)
+
+    def _ocupar(self, confronto, lado, nome):
+        """Coloca `nome` no confronto; contra FOLGA, o outro lado avança sem jogar"""
+        confronto['jogadores'][lado] = nome
+        jogador1, jogador2 = confronto['jogadores']
+        if jogador1 is None or jogador2 is None or FOLGA not in (jogador1, jogador2):
+            return
+        if jogador1 == FOLGA:
+            vencedor, perdedor = jogador2, jogador1
+        else:
+            vencedor, perdedor = jogador1, jogador2
+        confronto['vencedor'] = vencedor
+        self._avancar(confronto, vencedor, perdedor)
+
+    def _avancar(self, confronto, vencedor, perdedor):
+        destinos = (
+            (confronto['vencedor_vai'], vencedor), (confronto['perdedor_vai'], perdedor)
+        )
+        for destino, nome in destinos:
+            if destino is not None:
+                self._ocupar(self.confrontos[destino[0]], destino[1], nome)
+
+    def confronto(self, id_confronto):
+        if not 0 <= id_confronto < len(self.confrontos):
+            raise ValueError('Confronto não encontrado!')
+        return self.confrontos[id_confronto]
+
+    def pendentes(self):
+        """Confrontos com os dois jogadores definidos e ainda sem resultado"""
+        return [
+            confronto for confronto in self.confrontos
+            if confronto['vencedor'] is None and None not in confronto['jogadores']
+        ]
+
+    @property
+    def encerrado(self):
+        return all(confronto['vencedor'] is not None for confronto in self.confrontos)
+
+    @property
+    def campeao(self):
+        return self.classificacao.ordenada()[0]['nome'] if self.encerrado else None
+
+    def adversarios(self, id_confronto):
+        """(jogador1, jogador2) de um confronto que já pode ser jogado"""
+        confronto = self.confronto(id_confronto)
+        if confronto['vencedor'] is not None:
+            raise ValueError('Este confronto já tem resultado!')
+        if None in confronto['jogadores']:
+            raise ValueError(
+                'Os adversários deste confronto ainda não estão definidos!'
+            )
+        return tuple(confronto['jogadores'])
+
+    def verificar_resultado(self, id_confronto, partida):
+        """Lança ValueError (mensagem ao usuário) se `partida` não decide o confronto"""
+        confronto = self.confronto(id_confronto)
+        if {partida.jogador1, partida.jogador2} != set(self.adversarios(id_confronto)):
+            raise ValueError('Os jogadores da partida não são os deste confronto!')
+        return confronto
+
+    def registrar_resultado(self, id_confronto, partida, id_partida=None):
+        """Registra a partida MD3 que decidiu o confronto e avança os jogadores"""
+        confronto = self.verificar_resultado(id_confronto, partida)
+        vencedor, perdedor = partida.vencedor, partida.perdedor
+        confronto.update(
+            vencedor=vencedor, placar=partida.placar, valor=partida.valor,
+            partida=id_partida
+        )
+        self.classificacao.registrar(
+            vencedor, perdedor, partida.valor, confronto['fase']
+        )
+        self._avancar(confronto, vencedor, perdedor)
+        if confronto['chave'] == 'final' and vencedor == confronto['jogadores'][1]:
+            # Primeira derrota do campeão da chave dos vencedores: nova final
+            desempate = self._novo_confronto('desempate', 1, confronto['fase'] + 1)
+            desempate['jogadores'] = list(confronto['jogadores'])
+        return confronto
+
+
+class ArmazemTorneios:
+    """Torneios em torneios.json, com trava entre processos como o armazenamento
+
+    Os objetos `Torneio` (e as suas classificações) ficam em memória; só são
+    refeitos a partir do arquivo quando outro processo o altera. Cada
+    alteração é feita numa cópia, que substitui a versão em memória só
+    depois de gravada: uma gravação que falha não deixa em memória um estado
+    que não está no arquivo.
+    """
+
+    def __init__(self, caminho):
+        self._arquivo = ArquivoJSON(caminho)
+        self._trava = TravaArquivo(caminho + '.lock')
+        self._torneios = {}
+        self._versao = None
+
+    def _sincronizar(self):
+        dados = self._arquivo.ler()
+        if self._arquivo.versao != self._versao:
+            self._torneios = {
+                item['id']: Torneio.de_dict(item) for item in dados.get('torneios', [])
+            }
+            self._versao = self._arquivo.versao
+        return self._torneios
+
+    def _gravar(self, torneios):
+        self._arquivo.gravar(
+            {'torneios': [torneio.como_dict() for torneio in torneios.values()]}
+        )
+        self._torneios = torneios
+        self._versao = self._arquivo.versao
+
+    def torneios(self):
+        return list(self._sincronizar().values())
+
+    def torneio(self, id_torneio):
+        return self._sincronizar().get(id_torneio)
+
+    def criar(self, nome, formato, jogadores, data):
+        with self._trava:
+            torneios = self._sincronizar()
+            id_torneio = max(torneios, default=0) + 1
+            torneio = Torneio.criar(id_torneio, nome, formato, jogadores, data)
+            self._gravar({**torneios, torneio.id: torneio})
+            return torneio
+
+    def registrar_resultado(self, id_torneio, id_confronto, partida, registrar_partida):
+        """Registra `partida` no histórico e no torneio
+
+        A partida é validada antes de ir para o histórico, onde é gravada com
+        os campos 'torneio' e 'confronto' por `registrar_partida(dict)`, que
+        devolve o id. Retorna o confronto.
+        """
+        with self._trava:
+            torneios = self._sincronizar()
+            if id_torneio not in torneios:
+                raise ValueError('Torneio não encontrado!')
+            torneio = torneios[id_torneio].copia()
+            torneio.verificar_resultado(id_confronto, partida)
+            id_partida = registrar_partida({
+                **partida.como_dict(), 'torneio': id_torneio, 'confronto': id_confronto
+            })
+            confronto = torneio.registrar_resultado(id_confronto, partida, id_partida)
+            self._gravar({**torneios, id_torneio: torneio})
+            return confronto
@@ -0,0 +1,52 @@
+"""Visões derivadas dos dados mantidas em cache até a próxima alteração
+
+Uma visão (ex.: o ranking ordenado) é recalculada apenas quando a versão do
+armazenamento muda. Junto com o valor ficam um ETag, derivado do conteúdo
+(e portanto igual em todos os workers), e o instante em que a versão foi
+observada, usados nas respostas condicionais (304 Not Modified).
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+
+
+class VisaoEmCache:
+    """Valor calculado por `calcular()` e reaproveitado enquanto `versao()` não mudar
+
+    Com `com_etag=False` o ETag não é calculado (visões grandes que não são
+    servidas diretamente em respostas condicionais).
+    """
+
+    def __init__(self, calcular, versao, com_etag=True):
+        self._calcular = calcular
+        self._versao = versao
+        self._com_etag = com_etag
+        self._versao_atual = None
+        self._lock = threading.Lock()
+        self.valor = None
+        self.etag = None
+        self.modificado_em = None
+
+    def obter(self):
+        versao = self._versao()
+        if versao != self._versao_atual:
+            with self._lock:
+                if versao != self._versao_atual:
+                    valor = self._calcular()
+                    if self._com_etag:
+                        conteudo = json.dumps(
+                            valor, ensure_ascii=False, default=str
+                        ).encode('utf-8')
+                        etag = hashlib.sha1(conteudo).hexdigest()
+                        if etag != self.etag:
+                            agora = datetime.now(timezone.utc)
+                            self.modificado_em = agora.replace(microsecond=0)
+                        self.etag = etag
+                    self.valor = valor
+                    self._versao_atual = versao
+        return self
+
+    def invalidar(self):
+        with self._lock:
+            self._versao_atual = None